@@ -0,0 +1,257 @@
+import calendar  # Import calendar module to tell leap years apart
+import datetime  # Import datetime module for working with dates and times
+from bisect import bisect_left, bisect_right, insort  # Sorted lookups
+
+# Days caught up one by one; after a longer gap every record is checked
+MAX_CATCH_UP_DAYS = 31
+# Sorts after every record id in a ((month, day), record id) entry
+_AFTER = float('inf')
+
+
+def birthday_keys(day):
+    """
+    Get the birthdays on which an age goes up on a given day.
+
+    Someone born on 29 February turns a year older on 1 March in the
+    years without a 29 February, as calculate_age() counts.
+
+    Args:
+        day (datetime.date): The day.
+
+    Returns:
+        list: List of (month, day) tuples.
+    """
+    keys = [(day.month, day.day)]
+    if (day.month, day.day) == (3, 1) and not calendar.isleap(day.year):
+        keys.append((2, 29))
+    return keys
+
+
+def _birthday(record):
+    """
+    Get the (month, day) a record is indexed by, or None if it has no
+    valid date of birth.
+    """
+    date_of_birth = record['date_of_birth']
+    if not isinstance(date_of_birth, datetime.date):
+        return None
+    return (date_of_birth.month, date_of_birth.day)
+
+
+class BirthdayIndex:
+    """
+    Index of the records sorted by birthday, month and day.
+
+    Finding whose age goes up on a day is a binary search instead of a
+    pass over every record. Register it with TrackedRecords.add_index()
+    to keep it up to date. Records are dicts and not hashable, so they
+    are tracked by id().
+    """
+
+    fields = ('date_of_birth',)
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """
+        Remove every record from the index.
+        """
+        self._records = {}
+        self._keys = {}
+        self._entries = []
+
+    def rebuild(self, records):
+        """
+        Index a list of records from scratch, sorting the entries once.
+
+        Args:
+            records (list): List of records.
+        """
+        self.clear()
+        for record in records:
+            key = _birthday(record)
+            if key is None:
+                continue
+            record_id = id(record)
+            self._records[record_id] = record
+            self._keys[record_id] = key
+            self._entries.append((key, record_id))
+        self._entries.sort()
+
+    def add(self, record):
+        """
+        Index a record. Records without a valid date of birth are left
+        out.
+
+        Args:
+            record (dict): The record to index.
+        """
+        key = _birthday(record)
+        if key is None:
+            return
+        record_id = id(record)
+        self._records[record_id] = record
+        self._keys[record_id] = key
+        insort(self._entries, (key, record_id))
+
+    def remove(self, record):
+        """
+        Remove a record from the index, using the birthday it was
+        indexed by.
+
+        Args:
+            record (dict): The record to remove.
+        """
+        record_id = id(record)
+        key = self._keys.pop(record_id, None)
+        if key is None:
+            return
+        del self._records[record_id]
+        del self._entries[bisect_left(self._entries, (key, record_id))]
+
+    def update(self, record):
+        """
+        Re-index a record after its fields changed in place.
+
+        Args:
+            record (dict): The changed record.
+        """
+        self.remove(record)
+        self.add(record)
+
+    def having_birthday(self, day):
+        """
+        Find the records whose age goes up on a day.
+
+        Args:
+            day (datetime.date): The day.
+
+        Returns:
+            list: List of records.
+        """
+        found = []
+        for key in birthday_keys(day):
+            low = bisect_left(self._entries, (key,))
+            high = bisect_right(self._entries, (key, _AFTER))
+            found.extend(
+                self._records[record_id]
+                for _, record_id in self._entries[low:high]
+            )
+        return found
+
+
+class AgeRefresher:
+    """
+    Daily job keeping the stored ages of a list of records current.
+
+    Ages are derived from the date of birth when read, but the age
+    column is also stored. Once a day refresh() updates the records
+    whose age went up: the first run compares every record in memory,
+    later runs only look at the birthdays of the days since the last
+    run, found with a BirthdayIndex. The updated records are replaced
+    with copies, never changed in place, so a background save writing
+    them is not affected; the next save writes only their rows and the
+    other indexes are updated.
+
+    Args:
+        records (TrackedRecords): The records. A BirthdayIndex is
+        registered on them as 'birthdays' unless there is one.
+    """
+
+    def __init__(self, records):
+        self.records = records
+        if 'birthdays' not in records.indexes:
+            records.add_index('birthdays', BirthdayIndex())
+        self.last_day = None
+
+    def due(self, today=None):
+        """
+        Check whether the ages were not refreshed today yet.
+
+        Args:
+            today (datetime.date): The current date. Defaults to None,
+            today's date.
+
+        Returns:
+            bool: True if refresh() has work to do.
+        """
+        return self.last_day != (today or datetime.date.today())
+
+    def _candidates(self, today):
+        """
+        Get the records whose age may have changed since the last run.
+        """
+        if self.last_day is None or \
+                (today - self.last_day).days > MAX_CATCH_UP_DAYS:
+            return list(self.records)
+        index = self.records.indexes['birthdays']
+        candidates = []
+        day = self.last_day
+        while day < today:
+            day += datetime.timedelta(days=1)
+            candidates.extend(index.having_birthday(day))
+        return candidates
+
+    def refresh(self, today=None):
+        """
+        Update the stored age of the records whose age changed.
+
+        Args:
+            today (datetime.date): The current date. Defaults to None,
+            today's date.
+
+        Returns:
+            int: Number of records updated, each replaced with a copy.
+        """
+        today = today or datetime.date.today()
+        if not self.due(today):
+            return 0
+        count = 0
+        for record in self._candidates(today):
+            age = record.derived('age', today)
+            if record.age != age:
+                position = self.records.position_of(record)
+                record = record.copy()
+                record['age'] = age
+                self.records[position] = record
+                count += 1
+        self.last_day = today
+        return count
+
+    def seconds_to_next_run(self, now=None):
+        """
+        Get the time left until the next day starts.
+
+        Args:
+            now (datetime.datetime): The current time. Defaults to
+            None, now.
+
+        Returns:
+            float: Seconds until midnight.
+        """
+        now = now or datetime.datetime.now()
+        midnight = datetime.datetime.combine(
+            now.date() + datetime.timedelta(days=1), datetime.time()
+        )
+        return (midnight - now).total_seconds()
+
+
+def main():
+    """
+    Refresh the stored ages of the configured store once, e.g. from a
+    daily cron job.
+    """
+    # Imported here, only the command line saves on its own
+    from journal import open_journal, save
+    from record_store import open_store
+
+    store = open_store()
+    records = store.load()
+    count = AgeRefresher(records).refresh()
+    save(store, records, open_journal())
+    print(f"{count} age(s) updated")
+
+
+if __name__ == '__main__':
+    main()
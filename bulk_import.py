@@ -0,0 +1,163 @@
+import csv  # Import csv module to read and write CSV files
+import datetime  # Import datetime module for working with dates and times
+import os  # Import os module to work with file names
+from duplicates import DuplicateIndex
+from employee import DATE_FORMAT, new_employee_id
+from validators import RecordValidator, format_errors
+
+
+def normalize_header(name):
+    """
+    Turn a column heading into a field name, e.g. "First Name".
+
+    Args:
+        name: The heading cell.
+
+    Returns:
+        str: The field name, e.g. "first_name".
+    """
+    return str(name or '').strip().lower().replace(' ', '_')
+
+
+def read_csv(path):
+    """
+    Stream the rows of a CSV file with a header row.
+
+    Args:
+        path (str): Path of the CSV file.
+
+    Yields:
+        dict: The cells of each row, keyed by field name.
+    """
+    with open(path, newline='', encoding='utf-8-sig') as csv_file:
+        reader = csv.reader(csv_file)
+        header = [normalize_header(name) for name in next(reader, [])]
+        for row in reader:
+            if any(cell.strip() for cell in row):
+                yield dict(zip(header, row))
+
+
+def _cell_text(value):
+    """
+    Convert a spreadsheet cell to the text a user would have typed.
+    """
+    if value is None:
+        return ''
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return value.strftime(DATE_FORMAT)
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value)
+
+
+def read_xlsx(path):
+    """
+    Stream the rows of the first worksheet of an XLSX file.
+
+    Args:
+        path (str): Path of the XLSX file.
+
+    Yields:
+        dict: The cells of each row, keyed by field name.
+    """
+    # Imported here so the app starts without loading openpyxl
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [normalize_header(name) for name in next(rows, ())]
+        for row in rows:
+            cells = [_cell_text(value) for value in row]
+            if any(cell.strip() for cell in cells):
+                yield dict(zip(header, cells))
+    finally:
+        workbook.close()
+
+
+def read_rows(path):
+    """
+    Stream the rows of a CSV or XLSX file, chosen by the file extension.
+
+    Args:
+        path (str): Path of the file.
+
+    Returns:
+        generator: The rows as dicts keyed by field name.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return read_csv(path)
+    if extension in ('.xlsx', '.xlsm'):
+        return read_xlsx(path)
+    raise ValueError(f"Unsupported file type: {extension or path}")
+
+
+def import_file(path, records, reject_path=None):
+    """
+    Validate every row of a file and add the valid ones to the records.
+
+    Rows are streamed and validated one at a time; a row repeating the
+    email, or the name and date of birth, of a record or of an earlier
+    row is invalid too. Invalid rows are written to a reject file, as
+    they were read plus the row number and the errors found. The valid
+    records are added together at the end, so a single save writes them
+    in one batch.
+
+    Args:
+        path (str): Path of the CSV or XLSX file.
+        records (list): List of records to add to.
+        reject_path (str): Path of the reject CSV file. Defaults to None,
+        the file name with "_rejects.csv" appended.
+
+    Returns:
+        tuple: (number of records added, number of rows rejected,
+        path of the reject file or None if nothing was rejected).
+    """
+    if reject_path is None:
+        reject_path = os.path.splitext(path)[0] + '_rejects.csv'
+
+    # One validator for the whole file, so today's date is read once
+    validator = RecordValidator()
+    # Duplicates of the records, and of the rows accepted so far
+    existing = getattr(records, 'indexes', {}).get('duplicates')
+    if existing is None:
+        existing = DuplicateIndex()
+        existing.rebuild(records)
+    accepted = DuplicateIndex()
+    valid_records = []
+    rejected = 0
+    reject_file = None
+    writer = None
+    try:
+        # Row 1 is the header, so data starts on row 2
+        for row_number, row in enumerate(read_rows(path), start=2):
+            record, errors = validator.validate(row)
+            if record is not None:
+                errors = list(dict.fromkeys(
+                    existing.check(record) + accepted.check(record)
+                ))
+            if not errors:
+                # Imported rows are new employees with IDs of their own
+                record['employee_id'] = new_employee_id()
+                accepted.add(record)
+                valid_records.append(record)
+                continue
+
+            rejected += 1
+            if writer is None:
+                reject_file = open(
+                    reject_path, 'w', newline='', encoding='utf-8'
+                )
+                writer = csv.writer(reject_file)
+                writer.writerow(['row', 'errors'] + list(row.keys()))
+            writer.writerow(
+                [row_number, '; '.join(format_errors(errors))]
+                + list(row.values())
+            )
+    finally:
+        if reject_file is not None:
+            reject_file.close()
+
+    records.extend(valid_records)
+    return len(valid_records), rejected, reject_path if rejected else None
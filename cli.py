@@ -0,0 +1,473 @@
+import sys  # Import sys module to write results and errors
+import json  # Import json module for the --json output
+import argparse  # Import argparse module to parse the command line
+from conflicts import ConflictError
+from duplicates import DuplicateIndex, dedupe_report
+from employee import FIELDNAMES, SYSTEM_FIELDS, format_field
+from export import export_file, parse_fields
+from query_engine import QueryEngine, QueryError
+from record_store import open_store
+from search_index import NameIndex
+from sorted_view import SortedView
+from validators import RecordValidator, format_errors
+
+# Fields set by the add and update commands, age follows the birth date
+INPUT_FIELDS = [
+    field for field in FIELDNAMES
+    if field != 'age' and field not in SYSTEM_FIELDS
+]
+
+# Exit codes: success, a rejected command, and a usage error (argparse)
+EXIT_OK = 0
+EXIT_FAILED = 1
+
+
+class CommandError(Exception):
+    """
+    Raised when a command cannot be carried out, e.g. invalid input.
+
+    Args:
+        message (str): What went wrong.
+        errors (list): List of (field, error code) tuples, if any.
+    """
+
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or []
+
+
+def record_data(record, number=None):
+    """
+    Get a record as a JSON-ready dict, dates formatted as (DD-MM-YYYY).
+
+    Args:
+        record (Employee): The record.
+        number (int): The 1-based record number. Defaults to None.
+
+    Returns:
+        dict: The field values, plus 'record' if a number was given.
+    """
+    data = {} if number is None else {'record': number}
+    data.update(
+        (field, format_field(field, record[field])) for field in FIELDNAMES
+    )
+    return data
+
+
+def _get_record(store, key):
+    """
+    Get a record by its 1-based number or its employee ID, raising
+    CommandError if missing.
+
+    Returns:
+        tuple: (0-based index, record).
+    """
+    if key.lstrip('-').isdigit():
+        number = int(key)
+        if number < 1:
+            raise CommandError(f"Invalid record number: {key}")
+        index = number - 1
+    else:
+        index = store.find(key.upper())
+        if index is None:
+            raise CommandError(f"Employee {key} not found")
+    try:
+        record = store.get(index)
+    except IndexError:
+        record = None
+    # Sheets return an empty row past the last record
+    if record is None or not any(record.to_row()):
+        raise CommandError(f"Record {key} not found")
+    return index, record
+
+
+def _validate(values):
+    """
+    Validate raw field values, raising CommandError with the errors.
+    """
+    record, errors = RecordValidator().validate(values)
+    if errors:
+        raise CommandError("Invalid record", errors)
+    return record
+
+
+def _check_duplicates(store, record, allow_person, current=None):
+    """
+    Raise CommandError if a record repeats the email, or the name and
+    date of birth, of a stored record. Only the stored records sharing
+    one of its keys are read, by the store's duplicate_candidates().
+
+    Args:
+        store (RecordStore): The store.
+        record (Employee): The record about to be written.
+        allow_person (bool): Accept the same name and date of birth.
+        current (Employee): The record being replaced, with the same
+        employee ID. Defaults to None, a new record.
+    """
+    index = DuplicateIndex()
+    index.rebuild(store.duplicate_candidates(record))
+    errors = index.check(record, allow_person, current)
+    if errors:
+        raise CommandError("Duplicate record", errors)
+
+
+def cmd_add(store, args):
+    """
+    Add a record from the field options, all fields required.
+    """
+    values = {field: getattr(args, field) for field in INPUT_FIELDS}
+    missing = [field for field, value in values.items() if value is None]
+    if missing:
+        raise CommandError(f"Missing fields: {', '.join(missing)}")
+    record = _validate(values)
+    _check_duplicates(store, record, args.allow_duplicate)
+    try:
+        store.insert(record)
+    except ConflictError as error:
+        raise CommandError(f"Add failed! {error}")
+    return record_data(record)
+
+
+def cmd_get(store, args):
+    """
+    Show one record.
+    """
+    index, record = _get_record(store, args.record)
+    return record_data(record, index + 1)
+
+
+def cmd_update(store, args):
+    """
+    Change the given fields of a record and validate it again.
+
+    The record is only written if nobody changed it since it was read.
+    """
+    index, current = _get_record(store, args.record)
+    values = {
+        field: str(value) for field, value in zip(FIELDNAMES, current.to_row())
+    }
+    changes = {
+        field: getattr(args, field) for field in INPUT_FIELDS
+        if getattr(args, field) is not None
+    }
+    if not changes:
+        raise CommandError("Nothing to update")
+    values.update(changes)
+    record = _validate(values)
+    record['employee_id'] = current['employee_id']
+    _check_duplicates(store, record, args.allow_duplicate, current)
+    try:
+        store.update(index, record, expected=current)
+    except ConflictError as error:
+        raise CommandError(f"Update failed! {error}")
+    return record_data(record, index + 1)
+
+
+def cmd_delete(store, args):
+    """
+    Delete a record and return what it held.
+    """
+    index, record = _get_record(store, args.record)
+    try:
+        store.delete(index, expected=record)
+    except ConflictError as error:
+        raise CommandError(f"Delete failed! {error}")
+    return record_data(record, index + 1)
+
+
+def _numbered(store):
+    """
+    Load the records and number them in storage order.
+    """
+    records = store.load()
+    numbers = {id(record): number
+               for number, record in enumerate(records, start=1)}
+    return records, numbers
+
+
+def cmd_search(store, args):
+    """
+    Find records whose first or last name contains the term.
+    """
+    records, numbers = _numbered(store)
+    index = NameIndex()
+    index.rebuild(records)
+    return [
+        record_data(record, numbers[id(record)])
+        for record in index.search(args.term)
+    ]
+
+
+def cmd_query(store, args):
+    """
+    Find records matching a query, e.g. "department=IT".
+    """
+    records, numbers = _numbered(store)
+    engine = QueryEngine()
+    engine.rebuild(records)
+    try:
+        found_records = engine.query(args.query)
+    except QueryError as error:
+        raise CommandError(f"Invalid query! {error}")
+    return [
+        record_data(record, numbers[id(record)]) for record in found_records
+    ]
+
+
+def parse_sort_fields(text):
+    """
+    Parse sort keys such as "department,salary:desc".
+
+    Args:
+        text (str): Comma-separated fields, each optionally followed by
+        ":desc" or ":asc".
+
+    Returns:
+        list: List of (field, descending) tuples.
+    """
+    sort_fields = []
+    for part in text.split(','):
+        field, _, direction = part.strip().lower().partition(':')
+        if field not in FIELDNAMES:
+            raise CommandError(f"Unknown field: {field}")
+        if direction not in ('', 'asc', 'desc'):
+            raise CommandError(f"Unknown sort direction: {direction}")
+        sort_fields.append((field, direction == 'desc'))
+    return sort_fields
+
+
+def cmd_sort(store, args):
+    """
+    List records sorted by one or more fields.
+    """
+    sort_fields = parse_sort_fields(args.by)
+    records, numbers = _numbered(store)
+    view = SortedView(sort_fields)
+    view.rebuild(records)
+    return [
+        record_data(record, numbers[id(record)])
+        for record in view.records(0, args.limit)
+    ]
+
+
+def cmd_export(store, args):
+    """
+    Stream records from the store to a file.
+    """
+    try:
+        count = export_file(
+            store.iter_records(), args.path,
+            parse_fields(args.fields), args.query
+        )
+    except (OSError, ValueError) as error:
+        raise CommandError(f"Export failed! {error}")
+    return {'exported': count, 'path': args.path}
+
+
+def cmd_duplicates(store, args):
+    """
+    List the pairs of records that look like the same employee.
+    """
+    records = list(store.iter_records())
+    return [
+        {
+            'record': first + 1,
+            'employee_id': records[first]['employee_id'],
+            'duplicate': second + 1,
+            'duplicate_id': records[second]['employee_id'],
+            'reasons': "; ".join(reasons),
+        }
+        for first, second, reasons in dedupe_report(records)
+    ]
+
+
+def _add_field_options(parser):
+    """
+    Add a --first-name style option for every field set by the user,
+    and --allow-duplicate.
+    """
+    for field in INPUT_FIELDS:
+        parser.add_argument(
+            '--' + field.replace('_', '-'), dest=field,
+            help=field.replace('_', ' ')
+        )
+    parser.add_argument(
+        '--allow-duplicate', action='store_true',
+        help="accept another employee with the same name and date of "
+             "birth"
+    )
+
+
+def build_parser():
+    """
+    Build the parser of the headless commands.
+
+    Returns:
+        argparse.ArgumentParser: The parser.
+    """
+    parser = argparse.ArgumentParser(
+        prog='run.py',
+        description="Run one HRIS command without the menus. Records are "
+                    "numbered from 1 in storage order."
+    )
+    parser.add_argument(
+        '--json', action='store_true', help="print the result as JSON"
+    )
+    # --json is also accepted after the command, e.g. "get 3 --json"
+    output = argparse.ArgumentParser(add_help=False)
+    output.add_argument(
+        '--json', action='store_true', default=argparse.SUPPRESS,
+        help="print the result as JSON"
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add = commands.add_parser(
+        'add', parents=[output],
+        help="add a record"
+    )
+    _add_field_options(add)
+    add.set_defaults(handler=cmd_add)
+
+    get = commands.add_parser(
+        'get', parents=[output],
+        help="show a record"
+    )
+    get.add_argument(
+        'record', help="record number or employee ID"
+    )
+    get.set_defaults(handler=cmd_get)
+
+    update = commands.add_parser(
+        'update', parents=[output],
+        help="change fields of a record"
+    )
+    update.add_argument(
+        'record', help="record number or employee ID"
+    )
+    _add_field_options(update)
+    update.set_defaults(handler=cmd_update)
+
+    delete = commands.add_parser(
+        'delete', parents=[output],
+        help="delete a record"
+    )
+    delete.add_argument(
+        'record', help="record number or employee ID"
+    )
+    delete.set_defaults(handler=cmd_delete)
+
+    search = commands.add_parser(
+        'search', parents=[output],
+        help="find records by first or last name"
+    )
+    search.add_argument('term')
+    search.set_defaults(handler=cmd_search)
+
+    query = commands.add_parser(
+        'query', parents=[output],
+        help="find records matching conditions"
+    )
+    query.add_argument('query', help="e.g. 'department=IT and age>30'")
+    query.set_defaults(handler=cmd_query)
+
+    sort = commands.add_parser(
+        'sort', parents=[output],
+        help="list records in sort order"
+    )
+    sort.add_argument(
+        '--by', required=True, help="e.g. 'department,salary:desc'"
+    )
+    sort.add_argument(
+        '--limit', type=int, default=None, help="number of records to list"
+    )
+    sort.set_defaults(handler=cmd_sort)
+
+    export = commands.add_parser(
+        'export', parents=[output],
+        help="write records to a .csv, .jsonl or .hcol file"
+    )
+    export.add_argument('path')
+    export.add_argument(
+        '--fields', default='', help="comma-separated fields, default all"
+    )
+    export.add_argument(
+        '--query', default=None, help="only export matching records"
+    )
+    export.set_defaults(handler=cmd_export)
+
+    duplicates = commands.add_parser(
+        'duplicates', parents=[output],
+        help="list records that look like the same employee"
+    )
+    duplicates.set_defaults(handler=cmd_duplicates)
+    return parser
+
+
+def format_result(result):
+    """
+    Format a command result as plain text: one record per line, tab
+    separated, with a header line.
+
+    Args:
+        result: A dict or a list of dicts.
+
+    Returns:
+        str: The formatted result.
+    """
+    rows = result if isinstance(result, list) else [result]
+    if not rows:
+        return ""
+    columns = list(rows[0])
+    lines = ["\t".join(columns)]
+    lines.extend(
+        "\t".join(str(row[column]) for column in columns) for row in rows
+    )
+    return "\n".join(lines) + "\n"
+
+
+def main(argv=None, store=None):
+    """
+    Run one headless command.
+
+    Nothing is drawn, cleared or waited for: the result is written to
+    stdout and errors to stderr, so scripts can run many commands
+    quickly.
+
+    Args:
+        argv (list): The command line arguments. Defaults to None,
+        sys.argv[1:].
+        store (RecordStore): The store to use. Defaults to None, the
+        store chosen by open_store().
+
+    Returns:
+        int: The exit code, 0 on success.
+    """
+    args = build_parser().parse_args(argv)
+    if store is None:
+        store = open_store()
+    try:
+        result = args.handler(store, args)
+    except CommandError as error:
+        if args.json:
+            sys.stderr.write(json.dumps({
+                'error': str(error),
+                'errors': [
+                    {'field': field, 'code': code}
+                    for field, code in error.errors
+                ],
+            }) + "\n")
+        else:
+            sys.stderr.write(
+                "\n".join([str(error)] + format_errors(error.errors)) + "\n"
+            )
+        return EXIT_FAILED
+
+    if args.json:
+        sys.stdout.write(json.dumps(result) + "\n")
+    else:
+        sys.stdout.write(format_result(result))
+    return EXIT_OK
+
+
+if __name__ == '__main__':
+    sys.exit(main())
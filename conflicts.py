@@ -0,0 +1,319 @@
+from employee import FIELDNAMES, SYSTEM_FIELDS, new_employee_id
+
+# Fields that identify a record without an employee ID yet
+IDENTITY_FIELDS = ('first_name', 'last_name', 'date_of_birth')
+# Times a save is checked and merged again before giving up
+MAX_ATTEMPTS = 5
+
+# Reasons a pending change could not be applied as it was made
+EDITED_BY_OTHER = 'also edited by another user, changes merged'
+DELETED_BY_OTHER = 'deleted by another user'
+KEPT_EDITED = 'not deleted, edited by another user'
+STALE_VERSION = 'changed by another user since it was read'
+
+
+class Conflict:
+    """
+    A pending change that clashed with a change saved by another user.
+
+    Args:
+        record (Employee): The record as it was saved after the merge.
+        reason (str): What happened, e.g. EDITED_BY_OTHER.
+        fields (tuple): Fields both users changed, the other user's
+        values were kept. Defaults to no fields.
+    """
+
+    def __init__(self, record, reason, fields=()):
+        self.record = record
+        self.reason = reason
+        self.fields = tuple(fields)
+
+    def __str__(self):
+        name = f"{self.record['first_name']} {self.record['last_name']}"
+        if self.fields:
+            fields = ", ".join(
+                field.replace('_', ' ') for field in self.fields
+            )
+            return f"{name}: {self.reason}, kept their {fields}"
+        return f"{name}: {self.reason}"
+
+
+class ConflictError(Exception):
+    """
+    Raised when changes cannot be saved without losing another user's.
+
+    Args:
+        message (str): What went wrong.
+        conflicts (list): List of Conflict, if any.
+    """
+
+    def __init__(self, message, conflicts=None):
+        super().__init__(message)
+        self.conflicts = conflicts or []
+
+
+def identity(record):
+    """
+    Get the value that identifies a record when its row has moved.
+
+    Args:
+        record (Employee): The record.
+
+    Returns:
+        The employee ID, or a tuple of the IDENTITY_FIELDS values for a
+        record saved before IDs were given.
+    """
+    if record['employee_id']:
+        return record['employee_id']
+    return tuple(record[field] for field in IDENTITY_FIELDS)
+
+
+def same_values(first, second):
+    """
+    Check whether two records hold the same values, version included.
+
+    Args:
+        first (Employee): A record.
+        second (Employee): Another record.
+
+    Returns:
+        bool: True if every field is equal.
+    """
+    return first.to_row() == second.to_row()
+
+
+def user_values(record):
+    """
+    Get the values users set, leaving out the SYSTEM_FIELDS.
+
+    Args:
+        record (Employee): The record.
+
+    Returns:
+        tuple: The values, to compare records regardless of versions.
+    """
+    return tuple(
+        record[field] for field in FIELDNAMES if field not in SYSTEM_FIELDS
+    )
+
+
+def snapshot(records):
+    """
+    Copy the records as they were loaded or last saved.
+
+    The copies are the common base of a three-way merge: records are
+    changed in place, so the values they were read with are kept here.
+
+    Args:
+        records (iterable): The records.
+
+    Returns:
+        list: A copy of every record.
+    """
+    return [record.copy() for record in records]
+
+
+def advance_snapshot(base, records):
+    """
+    Apply the pending changes of a list of records to its snapshot.
+
+    Call this after the changes are written and before
+    records.mark_synced(), while the changes are still tracked.
+
+    Args:
+        base (list): The snapshot, one copy per row of the last sync.
+        records (TrackedRecords): Records with their pending changes.
+
+    Returns:
+        list: The snapshot of the records as now saved.
+    """
+    for origin in records.dirty:
+        base[origin] = records[records.current_index(origin)].copy()
+    if records.deleted:
+        base = [
+            record for origin, record in enumerate(base)
+            if origin not in records.deleted
+        ]
+    base.extend(
+        records[index].copy() for index in records.inserted_indices()
+    )
+    return base
+
+
+def prepare_update(stored, record):
+    """
+    Set the system fields of a record about to replace a stored one.
+
+    The record keeps the stored employee ID, which never changes, and
+    gets the next version.
+
+    Args:
+        stored (Employee): The record as read from the store.
+        record (Employee): The record about to be written.
+    """
+    record['employee_id'] = (
+        stored['employee_id'] or record['employee_id'] or new_employee_id()
+    )
+    record['version'] = stored['version'] + 1
+
+
+def prepare_insert(record):
+    """
+    Set the system fields of a new record: an ID if it has none yet,
+    and version 1.
+
+    Args:
+        record (Employee): The record about to be added.
+    """
+    if not record['employee_id']:
+        record['employee_id'] = new_employee_id()
+    record['version'] = 1
+
+
+def stamp_changes(base, records):
+    """
+    Set the system fields of every record about to be written.
+
+    Args:
+        base (list): The snapshot the changes were made on.
+        records (TrackedRecords): Records with their pending changes.
+    """
+    for origin in records.dirty:
+        prepare_update(base[origin], records[records.current_index(origin)])
+    for index in records.inserted_indices():
+        prepare_insert(records[index])
+
+
+def merge_records(base, ours, theirs):
+    """
+    Merge two changes made to the same record, field by field.
+
+    A field changed on one side only takes that side's value. A field
+    both sides changed to different values keeps theirs, as they were
+    saved first, and is reported.
+
+    Args:
+        base (Employee): The record both changes started from.
+        ours (Employee): The record with our change.
+        theirs (Employee): The record as saved by the other user.
+
+    Returns:
+        tuple: (merged Employee, tuple of the conflicting fields). The
+        merged record has the version of theirs.
+    """
+    merged = theirs.copy()
+    conflicting = []
+    for field in FIELDNAMES:
+        if field in SYSTEM_FIELDS:
+            continue
+        base_value, our_value = base[field], ours[field]
+        if our_value == base_value:
+            continue
+        if theirs[field] == base_value:
+            merged[field] = our_value
+        elif theirs[field] != our_value:
+            conflicting.append(field)
+    return merged, tuple(conflicting)
+
+
+def _take_values(record, source):
+    """
+    Copy every field value of one record into another.
+    """
+    for field in FIELDNAMES:
+        setattr(record, field, source[field])
+
+
+def resolve(base, ours, theirs):
+    """
+    Merge our change of a record into the other user's saved change.
+
+    Our record is changed in place to the merged values, with the
+    version of theirs.
+
+    Args:
+        base (Employee): The record both changes started from.
+        ours (Employee): The record with our change.
+        theirs (Employee): The record as saved by the other user.
+
+    Returns:
+        Conflict: The merge, to report to the user.
+    """
+    merged, fields = merge_records(base, ours, theirs)
+    _take_values(ours, merged)
+    return Conflict(ours, EDITED_BY_OTHER, fields)
+
+
+def rebase_changes(base, records, fresh):
+    """
+    Work out how the pending changes apply to freshly loaded records.
+
+    Used when rows may have moved, e.g. in a sheet another user deleted
+    rows from. Each changed or deleted row is found again by the
+    identity() of its snapshot, its employee ID:
+
+    - an updated row nobody else changed is written as it is;
+    - an updated row another user changed is merged with theirs;
+    - an updated row another user deleted is added again at the end;
+    - a deleted row another user changed is kept with their change.
+
+    Args:
+        base (list): The snapshot the changes were made on.
+        records (TrackedRecords): Records with their pending changes.
+        fresh (list): The records as now stored.
+
+    Returns:
+        tuple: (updated, deleted, inserted, conflicts) where updated
+        maps positions in fresh to records to write, deleted is a set of
+        positions in fresh, inserted a list of records to add and
+        conflicts a list of Conflict.
+    """
+    positions = {}
+    for position, record in enumerate(fresh):
+        # Rows saved without an ID are found by their fields, also after
+        # another user gave them one
+        positions.setdefault(identity(record), []).append(position)
+        if record['employee_id']:
+            positions.setdefault(
+                tuple(record[field] for field in IDENTITY_FIELDS), []
+            ).append(position)
+    claimed = set()
+
+    def locate(record):
+        # Rows with the same identity are matched in storage order
+        for position in positions.get(identity(record), ()):
+            if position not in claimed:
+                claimed.add(position)
+                return position
+        return None
+
+    updated = {}
+    deleted = set()
+    inserted = []
+    conflicts = []
+    for origin in sorted(records.dirty):
+        ours = records[records.current_index(origin)]
+        position = locate(base[origin])
+        if position is None:
+            inserted.append(ours)
+            conflicts.append(Conflict(ours, DELETED_BY_OTHER))
+            continue
+        theirs = fresh[position]
+        if not same_values(theirs, base[origin]):
+            if user_values(ours) == user_values(base[origin]):
+                # Only our system fields changed, e.g. a new ID
+                continue
+            conflicts.append(resolve(base[origin], ours, theirs))
+        updated[position] = ours
+
+    for origin in sorted(records.deleted):
+        position = locate(base[origin])
+        if position is None:
+            continue
+        if same_values(fresh[position], base[origin]):
+            deleted.add(position)
+        else:
+            conflicts.append(Conflict(fresh[position], KEPT_EDITED))
+
+    inserted.extend(records[index] for index in records.inserted_indices())
+    return updated, deleted, inserted, conflicts
@@ -0,0 +1,396 @@
+import unicodedata  # Import unicodedata module to drop accents
+from difflib import SequenceMatcher  # Similarity of two names
+from employee import format_field
+from validators import DUPLICATE_EMAIL, DUPLICATE_PERSON
+
+# Names at least this similar (0 to 1) with the same date of birth are
+# reported as likely duplicates
+NAME_SIMILARITY = 0.85
+# Leading letters of a name shared by the records of a block
+BLOCK_PREFIX = 3
+
+
+def normalize_email(email):
+    """
+    Normalize an email address for comparison.
+
+    Args:
+        email (str): The email address.
+
+    Returns:
+        str: The address without surrounding spaces, case-folded.
+    """
+    return str(email).strip().casefold()
+
+
+def normalize_name(name):
+    """
+    Normalize a name for comparison: accents, case, spaces and
+    punctuation are dropped, so "José" matches "jose".
+
+    Args:
+        name (str): The name.
+
+    Returns:
+        str: The letters and digits of the name, case-folded.
+    """
+    decomposed = unicodedata.normalize('NFKD', str(name))
+    return ''.join(
+        char for char in decomposed.casefold() if char.isalnum()
+    )
+
+
+def email_key(record):
+    """
+    Get the key a record is unique by on its email address.
+
+    Returns:
+        str: The normalized email, or None if it is empty.
+    """
+    return normalize_email(record['email']) or None
+
+
+def person_key(record):
+    """
+    Get the key a record is unique by on its name and date of birth.
+
+    Returns:
+        tuple: (last name, first name, date of birth) normalized, or
+        None if any of them is empty.
+    """
+    key = (
+        normalize_name(record['last_name']),
+        normalize_name(record['first_name']),
+        record['date_of_birth'],
+    )
+    return key if all(key) else None
+
+
+def _is_same(record, other):
+    """
+    Check whether two records are the same employee, e.g. a record
+    and its edited copy.
+    """
+    return other is record or (
+        bool(record['employee_id'])
+        and other['employee_id'] == record['employee_id']
+    )
+
+
+class DuplicateIndex:
+    """
+    Constraint index catching duplicate employees before they are saved.
+
+    Keeps a hash index on the normalized email, which must be unique,
+    and one on last name, first name and date of birth, which should
+    be. Checking a record is one lookup in each, whatever the number of
+    records.
+
+    Register it with TrackedRecords.add_index() to keep it up to date.
+    Records are dicts and not hashable, so they are tracked by id().
+    """
+
+    fields = ('email', 'first_name', 'last_name', 'date_of_birth')
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """
+        Remove every record from the index.
+        """
+        self._keys = {}
+        self._emails = {}
+        self._people = {}
+
+    def rebuild(self, records):
+        """
+        Index a list of records from scratch.
+
+        Args:
+            records (iterable): The records.
+        """
+        self.clear()
+        for record in records:
+            self.add(record)
+
+    def add(self, record):
+        """
+        Index a record.
+
+        Args:
+            record (dict): The record to index.
+        """
+        record_id = id(record)
+        keys = (email_key(record), person_key(record))
+        self._keys[record_id] = keys
+        for buckets, key in zip((self._emails, self._people), keys):
+            if key is not None:
+                buckets.setdefault(key, {})[record_id] = record
+
+    def remove(self, record):
+        """
+        Remove a record from the index, using the keys it was indexed by.
+
+        Args:
+            record (dict): The record to remove.
+        """
+        record_id = id(record)
+        keys = self._keys.pop(record_id, None)
+        if keys is None:
+            return
+        for buckets, key in zip((self._emails, self._people), keys):
+            if key is None:
+                continue
+            bucket = buckets[key]
+            del bucket[record_id]
+            if not bucket:
+                del buckets[key]
+
+    def update(self, record):
+        """
+        Re-index a record after its fields changed in place.
+
+        Args:
+            record (dict): The changed record.
+        """
+        self.remove(record)
+        self.add(record)
+
+    def matches(self, record, previous=None):
+        """
+        Find the other records a record would duplicate.
+
+        The record itself, and other copies of it with the same
+        employee ID, are not reported.
+
+        Args:
+            record (dict): A new or changed record.
+            previous (dict): The record before the change. Keys the
+            change left as they were are not checked, so an update is
+            not refused for a duplicate that was already there.
+            Defaults to None, a new record.
+
+        Returns:
+            list: List of (error code, record) tuples, email matches
+            first.
+        """
+        found = []
+        keys = (email_key(record), person_key(record))
+        if previous is not None:
+            old_keys = (email_key(previous), person_key(previous))
+            keys = tuple(
+                None if key == old_key else key
+                for key, old_key in zip(keys, old_keys)
+            )
+        checks = zip(
+            (self._emails, self._people), keys,
+            (DUPLICATE_EMAIL, DUPLICATE_PERSON)
+        )
+        for buckets, key, code in checks:
+            if key is None:
+                continue
+            found.extend(
+                (code, other) for other in buckets.get(key, {}).values()
+                if not _is_same(record, other)
+            )
+        return found
+
+    def check(self, record, allow_person=False, previous=None):
+        """
+        Check a record against the uniqueness constraints.
+
+        Args:
+            record (dict): A new or changed record.
+            allow_person (bool): Accept another employee with the same
+            name and date of birth. Defaults to False.
+            previous (dict): The record before the change, as for
+            matches(). Defaults to None, a new record.
+
+        Returns:
+            list: List of (field, error code) tuples, empty if the
+            record is no duplicate.
+        """
+        codes = {code for code, _ in self.matches(record, previous)}
+        errors = []
+        if DUPLICATE_EMAIL in codes:
+            errors.append(('email', DUPLICATE_EMAIL))
+        if DUPLICATE_PERSON in codes and not allow_person:
+            errors.append(('date_of_birth', DUPLICATE_PERSON))
+        return errors
+
+
+def blocking_keys(record):
+    """
+    Get the blocks a record is compared within by dedupe_report().
+
+    Only records sharing a block can be duplicates: the same email, or
+    the same date of birth and the first letters of the last or first
+    name, so a typo in one name is still caught.
+
+    Args:
+        record (dict): The record.
+
+    Returns:
+        list: The block keys.
+    """
+    keys = []
+    email = email_key(record)
+    if email:
+        keys.append(('email', email))
+    dob = record['date_of_birth']
+    if dob:
+        for field in ('last_name', 'first_name'):
+            name = normalize_name(record[field])
+            if name:
+                keys.append((field, name[:BLOCK_PREFIX], dob))
+    return keys
+
+
+def _full_name(record):
+    """
+    Get the normalized "first last" name of a record.
+    """
+    return (
+        f"{normalize_name(record['first_name'])} "
+        f"{normalize_name(record['last_name'])}"
+    )
+
+
+def compare_records(first, second):
+    """
+    Tell why two records look like the same employee.
+
+    Args:
+        first (dict): A record.
+        second (dict): Another record.
+
+    Returns:
+        list: The reasons, empty if they look like different people.
+    """
+    reasons = []
+    email = email_key(first)
+    if email and email == email_key(second):
+        reasons.append("same email")
+    person = person_key(first)
+    if person and person == person_key(second):
+        reasons.append("same name and date of birth")
+    elif first['date_of_birth'] and \
+            first['date_of_birth'] == second['date_of_birth']:
+        similarity = SequenceMatcher(
+            None, _full_name(first), _full_name(second)
+        ).ratio()
+        if similarity >= NAME_SIMILARITY:
+            reasons.append("similar name, same date of birth")
+    return reasons
+
+
+def dedupe_report(records):
+    """
+    Find the pairs of records that look like the same employee.
+
+    Records are grouped by their blocking_keys() in one pass, and only
+    records in the same block are compared, instead of every record
+    with every other.
+
+    Args:
+        records (iterable): The records.
+
+    Returns:
+        list: List of (position, position, reasons) tuples, positions
+        0-based in the order the records were given, sorted.
+    """
+    records = list(records)
+    blocks = {}
+    for position, record in enumerate(records):
+        for key in blocking_keys(record):
+            blocks.setdefault(key, []).append(position)
+
+    pairs = {}
+    for positions in blocks.values():
+        for number, first in enumerate(positions):
+            for second in positions[number + 1:]:
+                if (first, second) in pairs:
+                    continue
+                reasons = compare_records(records[first], records[second])
+                if reasons:
+                    pairs[(first, second)] = reasons
+    return [
+        (first, second, reasons)
+        for (first, second), reasons in sorted(pairs.items())
+    ]
+
+
+def _describe(record):
+    """
+    Describe a record on one line of the dedupe report.
+    """
+    return (
+        f"{record['employee_id'] or '-'}  {record['first_name']} "
+        f"{record['last_name']}, born "
+        f"{format_field('date_of_birth', record['date_of_birth'])}, "
+        f"{record['email']}"
+    )
+
+
+def format_dedupe_report(records, pairs):
+    """
+    Format the result of dedupe_report() for the terminal.
+
+    Args:
+        records (list): The records the report was made from.
+        pairs (list): The result of dedupe_report().
+
+    Returns:
+        str: The formatted report.
+    """
+    if not pairs:
+        return "No duplicates found.\n"
+    lines = [f"{len(pairs)} possible duplicate(s):"]
+    for first, second, reasons in pairs:
+        lines.append("")
+        lines.append(
+            f"Records {first + 1} and {second + 1}: {', '.join(reasons)}"
+        )
+        lines.append(f"  {_describe(records[first])}")
+        lines.append(f"  {_describe(records[second])}")
+    return "\n".join(lines) + "\n"
+
+
+def main():
+    """
+    Print the dedupe report of the configured store from the command
+    line.
+    """
+    import argparse  # Imported here, only the command line needs it
+    import json  # Imported here, only the command line prints JSON
+    from record_store import open_store
+
+    parser = argparse.ArgumentParser(
+        description="List the records that look like the same employee."
+    )
+    parser.add_argument(
+        '--json', action='store_true', help="print the report as JSON"
+    )
+    args = parser.parse_args()
+
+    records = list(open_store().iter_records())
+    pairs = dedupe_report(records)
+    if args.json:
+        print(json.dumps([
+            {
+                'records': [first + 1, second + 1],
+                'employee_ids': [
+                    records[first]['employee_id'],
+                    records[second]['employee_id'],
+                ],
+                'reasons': reasons,
+            }
+            for first, second, reasons in pairs
+        ], indent=2))
+    else:
+        print(format_dedupe_report(records, pairs), end="")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,264 @@
+import sys  # Import sys module to intern repeated strings
+import secrets  # Import secrets module to generate employee IDs
+import datetime  # Import datetime module for working with dates and times
+
+# Column order of the hris worksheet
+FIELDNAMES = [
+    'employee_id',
+    'first_name',
+    'last_name',
+    'date_of_birth',
+    'age',
+    'address',
+    'email',
+    'job_position',
+    'department',
+    'salary',
+    'hire_date',
+    'version',
+]
+
+# Format of the dates in the worksheet and on screen
+DATE_FORMAT = '%d-%m-%Y'
+DATE_FIELDS = ('date_of_birth', 'hire_date')
+# Fields kept by the stores rather than entered by users. The employee
+# ID never changes once given; the version counts the saved changes of a
+# record and is checked before each write.
+SYSTEM_FIELDS = ('employee_id', 'version')
+# Fields computed from the dates when read. Age is also a column, kept
+# current by the birthday refresh (see birthdays.py); tenure is not
+# stored at all.
+DERIVED_FIELDS = ('age', 'tenure')
+# Random bytes in an employee ID, 12 hex digits after the "E"
+EMPLOYEE_ID_BYTES = 6
+# Fields with few distinct values, shared between records when interned
+INTERNED_FIELDS = ('job_position', 'department')
+
+
+def new_employee_id():
+    """
+    Generate an employee ID, e.g. "E3F09A1C27B4D".
+
+    IDs are random rather than counted, so users saving at the same
+    time never hand out the same one.
+
+    Returns:
+        str: The new ID.
+    """
+    return "E" + secrets.token_hex(EMPLOYEE_ID_BYTES).upper()
+
+
+def parse_date(value):
+    """
+    Parse a date in the format (DD-MM-YYYY).
+
+    Args:
+        value: A date, or a string in the format (DD-MM-YYYY).
+
+    Returns:
+        datetime.date: The parsed date.
+    """
+    if isinstance(value, datetime.date):
+        return value
+    return datetime.datetime.strptime(value, DATE_FORMAT).date()
+
+
+def parse_field(field, value):
+    """
+    Convert a raw field value, e.g. a worksheet cell, to its type.
+
+    Age and version become an int (an empty version is 0), salary a
+    float and dates datetime.date. Values that cannot be converted are
+    kept as they are, so a bad cell in the worksheet does not stop the
+    records from loading.
+
+    Args:
+        field (str): The field name.
+        value: The raw value.
+
+    Returns:
+        The converted value.
+    """
+    try:
+        if field == 'age':
+            return value if isinstance(value, int) else int(float(value))
+        if field == 'version':
+            if isinstance(value, int):
+                return value
+            return int(float(value)) if value not in ('', None) else 0
+        if field == 'salary':
+            return float(value)
+        if field in DATE_FIELDS:
+            return parse_date(value)
+    except (TypeError, ValueError):
+        return value
+    if field in INTERNED_FIELDS and isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
+def format_field(field, value):
+    """
+    Convert a field value to the form written to the worksheet.
+
+    Args:
+        field (str): The field name.
+        value: The typed value.
+
+    Returns:
+        The value, with dates formatted as (DD-MM-YYYY).
+    """
+    if isinstance(value, datetime.date):
+        return value.strftime(DATE_FORMAT)
+    return value
+
+
+def calculate_age(date_of_birth, today=None):
+    """
+    Calculate the age in full years on a given day.
+
+    Args:
+        date_of_birth (datetime.date): The date of birth.
+        today (datetime.date): The day to calculate the age on.
+        Defaults to None, the current date.
+
+    Returns:
+        int: The age in years.
+    """
+    if today is None:
+        today = datetime.date.today()
+    return (
+        today.year - date_of_birth.year
+        - ((today.month, today.day) < (date_of_birth.month, date_of_birth.day))
+    )
+
+
+def calculate_tenure(hire_date, today=None):
+    """
+    Calculate the full years worked since the hire date.
+
+    Args:
+        hire_date (datetime.date): The hire date.
+        today (datetime.date): The day to calculate the tenure on.
+        Defaults to None, the current date.
+
+    Returns:
+        int: The tenure in years.
+    """
+    return calculate_age(hire_date, today)
+
+
+class Employee:
+    """
+    One employee record with typed fields.
+
+    Fields are stored in slots instead of a per-record dict and are
+    converted with parse_field() when set, so the rest of the code never
+    re-parses them. Records can still be read and written like a dict,
+    e.g. record['salary'].
+
+    The DERIVED_FIELDS are computed when read: record['age'] is the age
+    today and record['tenure'] the full years since the hire date. The
+    age slot, record.age, holds the age as last stored, and to_row()
+    writes the age of today.
+
+    Args:
+        **values: Field names and their raw or typed values. Missing
+        fields are set to an empty string.
+    """
+
+    __slots__ = tuple(FIELDNAMES)
+
+    def __init__(self, **values):
+        for field in FIELDNAMES:
+            setattr(self, field, parse_field(field, values.get(field, '')))
+
+    @classmethod
+    def from_row(cls, fieldnames, row):
+        """
+        Build a record from a worksheet row.
+
+        Args:
+            fieldnames (list): Lowercase field names of the columns.
+            row (list): The cell values.
+
+        Returns:
+            Employee: The record.
+        """
+        return cls(**dict(zip(fieldnames, row)))
+
+    def to_row(self, fieldnames=FIELDNAMES):
+        """
+        Get the field values in worksheet column order.
+
+        Args:
+            fieldnames (list): The fields in column order. Defaults to
+            FIELDNAMES.
+
+        Returns:
+            list: The values, with dates formatted as (DD-MM-YYYY).
+        """
+        return [format_field(field, self[field]) for field in fieldnames]
+
+    def derived(self, field, today=None):
+        """
+        Compute one of the DERIVED_FIELDS.
+
+        Args:
+            field (str): 'age' or 'tenure'.
+            today (datetime.date): The day to compute it on. Defaults
+            to None, the current date.
+
+        Returns:
+            int: The value. A date that could not be parsed gives the
+            stored age, or an empty tenure.
+        """
+        date = self.date_of_birth if field == 'age' else self.hire_date
+        if not isinstance(date, datetime.date):
+            return self.age if field == 'age' else ''
+        return calculate_age(date, today)
+
+    def __getitem__(self, field):
+        if field in DERIVED_FIELDS:
+            return self.derived(field)
+        if field not in self.__slots__:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __setitem__(self, field, value):
+        if field not in self.__slots__:
+            raise KeyError(field)
+        setattr(self, field, parse_field(field, value))
+
+    def __contains__(self, field):
+        return field in self.__slots__ or field in DERIVED_FIELDS
+
+    def __iter__(self):
+        return iter(FIELDNAMES)
+
+    def keys(self):
+        return list(FIELDNAMES)
+
+    def values(self):
+        return [self[field] for field in FIELDNAMES]
+
+    def items(self):
+        return [(field, self[field]) for field in FIELDNAMES]
+
+    def get(self, field, default=None):
+        return self[field] if field in self else default
+
+    def copy(self):
+        """
+        Get a copy of the record.
+
+        Returns:
+            Employee: A new record with the same field values.
+        """
+        record = Employee.__new__(Employee)
+        for field in FIELDNAMES:
+            setattr(record, field, getattr(self, field))
+        return record
+
+    def __repr__(self):
+        return f"Employee({', '.join(f'{k}={v!r}' for k, v in self.items())})"
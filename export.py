@@ -0,0 +1,293 @@
+import csv  # Import csv module to write CSV files
+import json  # Import json module to write JSON Lines and column chunks
+import os  # Import os module to work with file names
+import struct  # Import struct module for the columnar file footer
+import zlib  # Import zlib module to compress the column chunks
+from employee import FIELDNAMES, format_field
+from query_engine import parse_query
+
+# Records per row group in the columnar format
+ROW_GROUP_SIZE = 10000
+# First and last bytes of a columnar file
+COLUMNAR_MAGIC = b'HRISCOL1'
+# Footer length, stored just before the closing magic
+_FOOTER_LENGTH = struct.Struct('<I')
+
+
+def select_records(records, query=None):
+    """
+    Stream the records that match a query.
+
+    Args:
+        records (iterable): The records, e.g. from store.iter_records().
+        query (str): A query as accepted by parse_query(). Defaults to
+        None, every record.
+
+    Returns:
+        generator: The matching records.
+    """
+    # Parsed now rather than on the first record, so a bad query fails
+    # before the export file is created
+    conditions = parse_query(query) if query else []
+    return (
+        record for record in records
+        if all(condition.matches(record) for condition in conditions)
+    )
+
+
+def export_row(record, fields):
+    """
+    Get the selected field values of a record, as written to a file.
+
+    Args:
+        record (Employee): The record.
+        fields (list): The field names to export.
+
+    Returns:
+        list: The values, with dates formatted as (DD-MM-YYYY).
+    """
+    return [format_field(field, record[field]) for field in fields]
+
+
+def write_csv(output_file, records, fields):
+    """
+    Write records to a CSV file, with the field names as the header.
+
+    The header uses the same names as the import, so an export can be
+    imported again.
+
+    Returns:
+        int: Number of records written.
+    """
+    writer = csv.writer(output_file)
+    writer.writerow(fields)
+    count = 0
+    for record in records:
+        writer.writerow(export_row(record, fields))
+        count += 1
+    return count
+
+
+def write_jsonl(output_file, records, fields):
+    """
+    Write records to a JSON Lines file, one JSON object per record.
+
+    Returns:
+        int: Number of records written.
+    """
+    count = 0
+    for record in records:
+        output_file.write(
+            json.dumps(dict(zip(fields, export_row(record, fields))))
+        )
+        output_file.write("\n")
+        count += 1
+    return count
+
+
+def _write_row_group(output_file, columns):
+    """
+    Write one compressed chunk per column and return their positions.
+    """
+    positions = {}
+    for field, values in columns.items():
+        chunk = zlib.compress(
+            json.dumps(values, separators=(',', ':')).encode('utf-8')
+        )
+        positions[field] = [output_file.tell(), len(chunk)]
+        output_file.write(chunk)
+    return positions
+
+
+def write_columnar(output_file, records, fields, row_group_size=None):
+    """
+    Write records to a compact columnar file.
+
+    Records are collected in row groups. Each column of a row group is
+    stored as a zlib-compressed JSON array, so a reader can load only
+    the columns it needs. A JSON footer lists the fields and the
+    position of every column chunk:
+
+        magic | chunks... | footer | footer length | magic
+
+    Only one row group is held in memory at a time.
+
+    Args:
+        output_file: File opened for binary writing.
+        records (iterable): The records to write.
+        fields (list): The field names to export.
+        row_group_size (int): Records per row group. Defaults to None,
+        ROW_GROUP_SIZE.
+
+    Returns:
+        int: Number of records written.
+    """
+    row_group_size = row_group_size or ROW_GROUP_SIZE
+    output_file.write(COLUMNAR_MAGIC)
+    row_groups = []
+    columns = {field: [] for field in fields}
+    rows = 0
+    count = 0
+    for record in records:
+        for field, value in zip(fields, export_row(record, fields)):
+            columns[field].append(value)
+        rows += 1
+        count += 1
+        if rows == row_group_size:
+            row_groups.append({
+                'rows': rows,
+                'columns': _write_row_group(output_file, columns),
+            })
+            columns = {field: [] for field in fields}
+            rows = 0
+    if rows:
+        row_groups.append({
+            'rows': rows,
+            'columns': _write_row_group(output_file, columns),
+        })
+
+    footer = json.dumps({
+        'version': 1,
+        'fields': fields,
+        'row_groups': row_groups,
+    }).encode('utf-8')
+    output_file.write(footer)
+    output_file.write(_FOOTER_LENGTH.pack(len(footer)))
+    output_file.write(COLUMNAR_MAGIC)
+    return count
+
+
+def read_columnar(path, fields=None):
+    """
+    Stream the records of a columnar file, one row group at a time.
+
+    Args:
+        path (str): Path of the file.
+        fields (list): The field names to read. Defaults to None, every
+        field in the file.
+
+    Yields:
+        dict: The values of each record, keyed by field name.
+    """
+    tail_size = _FOOTER_LENGTH.size + len(COLUMNAR_MAGIC)
+    with open(path, 'rb') as columnar_file:
+        if columnar_file.read(len(COLUMNAR_MAGIC)) != COLUMNAR_MAGIC:
+            raise ValueError(f"Not a columnar export: {path}")
+        columnar_file.seek(-tail_size, os.SEEK_END)
+        tail = columnar_file.read(tail_size)
+        if tail[_FOOTER_LENGTH.size:] != COLUMNAR_MAGIC:
+            raise ValueError(f"Truncated columnar export: {path}")
+        footer_length = _FOOTER_LENGTH.unpack(
+            tail[:_FOOTER_LENGTH.size]
+        )[0]
+        columnar_file.seek(-(tail_size + footer_length), os.SEEK_END)
+        footer = json.loads(columnar_file.read(footer_length))
+
+        fields = fields or footer['fields']
+        for field in fields:
+            if field not in footer['fields']:
+                raise ValueError(f"Field not in the export: {field}")
+        for row_group in footer['row_groups']:
+            columns = []
+            for field in fields:
+                offset, length = row_group['columns'][field]
+                columnar_file.seek(offset)
+                columns.append(
+                    json.loads(zlib.decompress(columnar_file.read(length)))
+                )
+            for values in zip(*columns):
+                yield dict(zip(fields, values))
+
+
+# Writer and file mode of each export format, chosen by file extension
+FORMATS = {
+    '.csv': (write_csv, 'w'),
+    '.jsonl': (write_jsonl, 'w'),
+    '.hcol': (write_columnar, 'wb'),
+}
+
+
+def export_file(records, path, fields=None, query=None):
+    """
+    Stream records to a CSV, JSON Lines or columnar file.
+
+    The format is chosen by the file extension: .csv, .jsonl or .hcol.
+    Records are written as they are read, so exporting from a
+    generator such as store.iter_records() runs in constant memory.
+
+    Args:
+        records (iterable): The records to export.
+        path (str): Path of the file to write.
+        fields (list): The field names to export. Defaults to None,
+        every field.
+        query (str): Only export the records matching this query.
+        Defaults to None, every record.
+
+    Returns:
+        int: Number of records exported.
+    """
+    fields = list(fields or FIELDNAMES)
+    for field in fields:
+        if field not in FIELDNAMES:
+            raise ValueError(f"Unknown field: {field}")
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f"Unsupported file type: {extension or path}")
+    writer, mode = FORMATS[extension]
+
+    selected = select_records(records, query)
+    if 'b' in mode:
+        with open(path, mode) as output_file:
+            return writer(output_file, selected, fields)
+    with open(path, mode, newline='', encoding='utf-8') as output_file:
+        return writer(output_file, selected, fields)
+
+
+def parse_fields(text):
+    """
+    Parse a comma-separated list of field names.
+
+    Args:
+        text (str): The field names, e.g. "first_name, salary".
+
+    Returns:
+        list: The field names, or None if the text is empty.
+    """
+    fields = [field.strip().lower() for field in text.split(',')]
+    return [field for field in fields if field] or None
+
+
+def main():
+    """
+    Export the records of the configured store from the command line.
+    """
+    import argparse  # Imported here, only the command line needs it
+    from record_store import open_store
+
+    parser = argparse.ArgumentParser(
+        description="Export HRIS records to a .csv, .jsonl or .hcol file."
+    )
+    parser.add_argument('path', help="file to write")
+    parser.add_argument(
+        '--fields', default='',
+        help="comma-separated fields to export, default all"
+    )
+    parser.add_argument(
+        '--query', default=None,
+        help="only export matching records, e.g. 'department=IT'"
+    )
+    args = parser.parse_args()
+
+    store = open_store()
+    try:
+        count = export_file(
+            store.iter_records(), args.path,
+            parse_fields(args.fields), args.query
+        )
+    except (OSError, ValueError) as error:
+        parser.exit(1, f"Export failed! {error}\n")
+    print(f"{count} record(s) exported to {args.path}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,400 @@
+import os  # Import os module to flush the journal to disk
+import json  # Import json module to write one entry per line
+from conflicts import (
+    ConflictError,
+    identity,
+    rebase_changes,
+    same_values,
+    snapshot,
+    user_values,
+)
+from employee import FIELDNAMES, Employee
+from tracked_records import TrackedRecords
+
+
+class Journal:
+    """
+    Local append-only write-ahead journal of the changes being saved.
+
+    Before a save is sent to the backend, its changes are appended as
+    one JSON line and flushed to disk with fsync. Once the backend
+    write has finished, a line marking the save as done is appended.
+    A save without its done line did not complete, e.g. the network
+    failed halfway or the app was closed, and is replayed by recover()
+    on the next start.
+
+    Every save holds all the changes made since the last successful
+    one, so only the latest unfinished save needs replaying. The file
+    is read once for the last save number, which is then counted in
+    memory, and a retry of the same changes is not journaled again.
+
+    Args:
+        path (str): Path of the journal file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._last_number = None
+        self._unfinished = None
+
+    def _entries(self):
+        """
+        Read the journal entries, skipping a line torn by a crash.
+        """
+        try:
+            with open(self.path, encoding='utf-8') as journal_file:
+                lines = journal_file.readlines()
+        except FileNotFoundError:
+            return []
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+        return entries
+
+    def _append(self, entry):
+        """
+        Append one entry and wait until it is on disk.
+        """
+        with open(self.path, 'a', encoding='utf-8') as journal_file:
+            journal_file.write(json.dumps(entry) + "\n")
+            journal_file.flush()
+            os.fsync(journal_file.fileno())
+
+    def _last_save(self):
+        """
+        Get the number of the last save journaled, reading the file
+        only the first time.
+        """
+        if self._last_number is None:
+            self._last_number = max(
+                (entry.get('save', 0) for entry in self._entries()),
+                default=0
+            )
+        return self._last_number
+
+    def append(self, changes):
+        """
+        Journal the changes of a save before they are sent.
+
+        Args:
+            changes (list): The changes, as built by journal_changes().
+
+        Returns:
+            int: Number of the save, to pass to mark_done(). A retry of
+            the unfinished save with the same changes gets its number
+            back without writing them again.
+        """
+        if self._unfinished is not None and self._unfinished[1] == changes:
+            return self._unfinished[0]
+        number = self._last_save() + 1
+        self._append({'save': number, 'changes': changes})
+        self._last_number = number
+        self._unfinished = (number, changes)
+        return number
+
+    def mark_done(self, number):
+        """
+        Record that a save reached the backend.
+
+        Once no save is left unfinished the journal is emptied, so it
+        only grows while the backend cannot be reached.
+
+        Args:
+            number (int): Number of the save, as returned by append().
+        """
+        self._append({'done': number})
+        if self._unfinished is not None and self._unfinished[0] <= number:
+            self._unfinished = None
+        # A save covers the ones before it, so once the last one is done
+        # nothing is left to replay and nothing is lost by starting over
+        if number >= self._last_save():
+            with open(self.path, 'w', encoding='utf-8'):
+                pass
+
+    def pending(self):
+        """
+        Get the latest save that did not finish.
+
+        Returns:
+            tuple: (number, changes), or None if every save finished.
+        """
+        saves = {}
+        for entry in self._entries():
+            if 'save' in entry:
+                saves[entry['save']] = entry['changes']
+            elif 'done' in entry:
+                # A finished save also covers the ones before it
+                saves = {
+                    number: changes for number, changes in saves.items()
+                    if number > entry['done']
+                }
+        if not saves:
+            return None
+        number = max(saves)
+        return number, saves[number]
+
+
+def open_journal():
+    """
+    Open the journal file named by the environment.
+
+    HRIS_JOURNAL is the path, "hris_journal.jsonl" by default; set it
+    to an empty value to turn the journal off.
+
+    Returns:
+        Journal: The journal, or None if it is turned off.
+    """
+    path = os.environ.get('HRIS_JOURNAL', 'hris_journal.jsonl')
+    return Journal(path) if path else None
+
+
+def _record(row):
+    """
+    Build a record from journaled values.
+    """
+    return Employee.from_row(FIELDNAMES, row)
+
+
+def journal_changes(store, records):
+    """
+    Describe the pending changes of a list of records for the journal.
+
+    Updates and deletions carry the record as it was loaded, so the
+    row can be found again after other users moved it. A rewrite
+    carries every row as it was loaded, to check what is stored before
+    writing over it.
+
+    Args:
+        store (RecordStore): The store the records were loaded from.
+        records (TrackedRecords): Records with their pending changes.
+
+    Returns:
+        list: One dict per change, with 'op' set to 'update', 'delete',
+        'insert' or 'rewrite'.
+    """
+    if records.reordered:
+        return [{
+            'op': 'rewrite',
+            'base': [
+                store.base_record(origin).to_row()
+                for origin in range(records.base_count)
+            ],
+            'records': [record.to_row() for record in records],
+        }]
+    changes = [
+        {
+            'op': 'update',
+            'base': store.base_record(origin).to_row(),
+            'record': records[records.current_index(origin)].to_row(),
+        }
+        for origin in sorted(records.dirty)
+    ]
+    changes.extend(
+        {'op': 'delete', 'base': store.base_record(origin).to_row()}
+        for origin in sorted(records.deleted)
+    )
+    changes.extend(
+        {'op': 'insert', 'record': records[index].to_row()}
+        for index in records.inserted_indices()
+    )
+    return changes
+
+
+def journal_save(store, records, journal):
+    """
+    Journal the pending changes of a save about to be written.
+
+    Args:
+        store (RecordStore): The store the changes go to.
+        records (TrackedRecords): Records with their pending changes.
+        journal (Journal): The journal. None journals nothing.
+
+    Returns:
+        int: Number of the save, or None if nothing was journaled.
+    """
+    if journal is None or not records.has_changes:
+        return None
+    return journal.append(journal_changes(store, records))
+
+
+def save(store, records, journal, progress=None, number=None):
+    """
+    Journal the pending changes, write them and mark them done.
+
+    If the write fails the changes stay both pending on the records
+    and in the journal, so neither a retry nor a restart loses them. A
+    save the store refused with ConflictError is not replayed, the
+    user was told it was not saved.
+
+    Args:
+        store (RecordStore): The store to write to.
+        records (TrackedRecords): Records with their pending changes.
+        journal (Journal): The journal. None writes without journaling.
+        progress (ProgressReporter): Reporter told about each request.
+        Defaults to None.
+        number (int): Number of the save if journal_save() journaled
+        the changes already. Defaults to None, journal them now.
+
+    Returns:
+        list: List of Conflict, as returned by store.sync().
+    """
+    if number is None:
+        number = journal_save(store, records, journal)
+    if number is None:
+        return store.sync(records, progress)
+    try:
+        conflicts = store.sync(records, progress)
+    except ConflictError:
+        journal.mark_done(number)
+        raise
+    journal.mark_done(number)
+    return conflicts
+
+
+def _is_written(change, stored):
+    """
+    Check whether a journaled update or insert reached the backend.
+
+    An update did if its employee is stored at the next version with
+    the journaled values, an insert if its employee is stored at all:
+    IDs are given when records are made and never reused.
+    """
+    record = _record(change['record'])
+    current = stored.get(record['employee_id'])
+    if current is None or change['op'] == 'insert':
+        return current is not None
+    return (
+        current['version'] == _record(change['base'])['version'] + 1
+        and user_values(current) == user_values(record)
+    )
+
+
+def _replay_rewrite(records, change):
+    """
+    Replay a journaled full rewrite on freshly loaded records.
+
+    If the rows are stored as the rewrite found them, it is replayed as
+    it was. Otherwise another user saved in the meantime: the rewrite
+    is turned into updates, deletions and inserts of the rows it found,
+    matched by identity(), and these are merged into the stored rows.
+
+    Returns:
+        list: List of Conflict, the merged changes.
+    """
+    if 'base' not in change:
+        raise ConflictError(
+            "The unfinished save was journaled without the rows it "
+            "replaces, so it was not replayed"
+        )
+    base = [_record(row) for row in change['base']]
+    rows = [_record(row) for row in change['records']]
+    fresh = list(records)
+    if len(fresh) == len(base) and all(map(same_values, fresh, base)):
+        records.clear()
+        records.extend(rows)
+        return []
+
+    origins = {identity(record): origin for origin, record in enumerate(base)}
+    replayed = TrackedRecords(base)
+    kept = set()
+    for row in rows:
+        origin = origins.get(identity(row))
+        if origin is None or origin in kept:
+            replayed.append(row)
+            continue
+        kept.add(origin)
+        if not same_values(row, base[origin]):
+            replayed[origin] = row
+    # From the last row down, so the positions left are still origins
+    for origin in reversed(range(len(base))):
+        if origin not in kept:
+            del replayed[origin]
+    updated, deleted, inserted, conflicts = rebase_changes(
+        snapshot(base), replayed, fresh
+    )
+    # Still rewritten in full if the load asked for it, e.g. to move
+    # the sheet to new columns
+    reordered = records.reordered
+    records.rebase(fresh, updated, deleted, inserted)
+    if reordered:
+        records.mark_reordered()
+    return conflicts
+
+
+def recover(store, records, journal, progress=None):
+    """
+    Replay the latest unfinished save on freshly loaded records.
+
+    Changes that reached the backend before the save broke off are
+    skipped, the rest are merged like any other save, so replaying
+    twice does no harm. A journaled save the store refuses with
+    ConflictError is marked done, the error tells the user it was not
+    written.
+
+    Args:
+        store (RecordStore): The store the records were just loaded
+        from.
+        records (TrackedRecords): The freshly loaded records.
+        journal (Journal): The journal. None does nothing.
+        progress (ProgressReporter): Reporter told about each request.
+        Defaults to None.
+
+    Returns:
+        list: List of Conflict, as returned by store.sync().
+    """
+    found = journal.pending() if journal is not None else None
+    if found is None:
+        return []
+    number, changes = found
+
+    conflicts = []
+    rewrite = [change for change in changes if change['op'] == 'rewrite']
+    if rewrite:
+        try:
+            conflicts = _replay_rewrite(records, rewrite[-1])
+        except ConflictError:
+            journal.mark_done(number)
+            raise
+    else:
+        # Skip the updates and inserts the backend already holds
+        stored = {
+            record['employee_id']: record
+            for record in records if record['employee_id']
+        }
+        updates = [
+            (_record(change['base']), _record(change['record']))
+            for change in changes if change['op'] == 'update'
+            and not _is_written(change, stored)
+        ]
+        bases = [base for base, _ in updates] + [
+            _record(change['base'])
+            for change in changes if change['op'] == 'delete'
+        ]
+        # Rebuild the changes on the journaled rows, then move them
+        # to the rows as now stored
+        replayed = TrackedRecords(bases)
+        for index, (_, record) in enumerate(updates):
+            replayed[index] = record
+        for index in reversed(range(len(updates), len(bases))):
+            del replayed[index]
+        replayed.extend(
+            _record(change['record'])
+            for change in changes if change['op'] == 'insert'
+            and not _is_written(change, stored)
+        )
+        updated, deleted, inserted, conflicts = rebase_changes(
+            snapshot(bases), replayed, list(records)
+        )
+        records.rebase(list(records), updated, deleted, inserted)
+
+    if records.has_changes:
+        try:
+            conflicts = conflicts + store.sync(records, progress)
+        except ConflictError:
+            journal.mark_done(number)
+            raise
+    journal.mark_done(number)
+    return conflicts
@@ -1,27 +1,153 @@
+import sys  # Import sys module for buffered output
 from colorama import Fore, Style  # Import Fore and Style - text coloring
+from employee import format_field
 
+# Records per page in the card and table layouts
+CARD_PAGE_SIZE = 5
+TABLE_PAGE_SIZE = 20
 
-def print_record(records):
-    for idx, record in enumerate(records):
-        print(f"\n{Fore.YELLOW}Record {idx + 1}:")
-        print(f"{Fore.BLUE}First Name: "
-              f"{Fore.GREEN}{record['first_name']}")
-        print(f"{Fore.BLUE}Last Name: "
-              f"{Fore.GREEN}{record['last_name']}")
-        print(f"{Fore.BLUE}Date of Birth: "
-              f"{Fore.GREEN}{record['date_of_birth']}")
-        print(f"{Fore.BLUE}Age: "
-              f"{Fore.GREEN}{record['age']}")
-        print(f"{Fore.BLUE}Address: "
-              f"{Fore.GREEN}{record['address']}")
-        print(f"{Fore.BLUE}Email: "
-              f"{Fore.GREEN}{record['email']}")
-        print(f"{Fore.BLUE}Job Position: "
-              f"{Fore.GREEN}{record['job_position']}")
-        print(f"{Fore.BLUE}Department: "
-              f"{Fore.GREEN}{record['department']}")
-        print(f"{Fore.BLUE}Salary: "
-              f"{Fore.GREEN}{record['salary']}")
-        print(f"{Fore.BLUE}Hire Date: "
-              f"{Fore.GREEN}{record['hire_date']}")
-        print(Style.RESET_ALL)
+# Card layout: label and field of each line
+CARD_FIELDS = [
+    ("Employee ID", 'employee_id'),
+    ("First Name", 'first_name'),
+    ("Last Name", 'last_name'),
+    ("Date of Birth", 'date_of_birth'),
+    ("Age", 'age'),
+    ("Address", 'address'),
+    ("Email", 'email'),
+    ("Job Position", 'job_position'),
+    ("Department", 'department'),
+    ("Salary", 'salary'),
+    ("Hire Date", 'hire_date'),
+    ("Tenure", 'tenure'),
+]
+
+# Table layout: heading and field of each column
+TABLE_FIELDS = [
+    ("ID", 'employee_id'),
+    ("First Name", 'first_name'),
+    ("Last Name", 'last_name'),
+    ("Age", 'age'),
+    ("Email", 'email'),
+    ("Job", 'job_position'),
+    ("Dept", 'department'),
+    ("Salary", 'salary'),
+    ("Hired", 'hire_date'),
+]
+
+
+def format_cards(records, start):
+    """
+    Format records as cards, one line per field.
+
+    Args:
+        records (list): The records on the page.
+        start (int): Number of records before the page.
+
+    Returns:
+        str: The formatted page.
+    """
+    lines = []
+    for idx, record in enumerate(records, start=start + 1):
+        lines.append(f"\n{Fore.YELLOW}Record {idx}:")
+        for label, field in CARD_FIELDS:
+            # Show dates as (DD-MM-YYYY) like they were entered
+            value = format_field(field, record[field])
+            lines.append(f"{Fore.BLUE}{label}: {Fore.GREEN}{value}")
+        lines.append(Style.RESET_ALL)
+    return "\n".join(lines) + "\n"
+
+
+def format_table(records, start):
+    """
+    Format records as a table with aligned columns.
+
+    Column widths are taken from the records on the page only.
+
+    Args:
+        records (list): The records on the page.
+        start (int): Number of records before the page.
+
+    Returns:
+        str: The formatted page.
+    """
+    headings = ["#"] + [heading for heading, _ in TABLE_FIELDS]
+    rows = [
+        [str(idx)] + [
+            str(format_field(field, record[field]))
+            for _, field in TABLE_FIELDS
+        ]
+        for idx, record in enumerate(records, start=start + 1)
+    ]
+    widths = [
+        max(len(row[column]) for row in rows + [headings])
+        for column in range(len(headings))
+    ]
+    lines = [
+        Fore.BLUE + "  ".join(
+            heading.ljust(width) for heading, width in zip(headings, widths)
+        ) + Fore.GREEN
+    ]
+    for row in rows:
+        lines.append("  ".join(
+            value.ljust(width) for value, width in zip(row, widths)
+        ))
+    return "\n".join(lines) + Style.RESET_ALL + "\n"
+
+
+def is_interactive():
+    """
+    Check whether a user can page through the output.
+
+    Returns:
+        bool: True if both stdin and stdout are terminals.
+    """
+    return sys.stdin.isatty() and sys.stdout.isatty()
+
+
+def print_record(records, table=False, interactive=None):
+    """
+    Print records a page at a time, each page in a single write.
+
+    In a terminal the user steps through the pages and can switch between
+    the card and table layouts. Otherwise all pages are written one after
+    the other without prompting.
+
+    Args:
+        records (list): List of records.
+        table (bool): Start in the table layout. Defaults to False.
+        interactive (bool): Prompt between pages. Defaults to None,
+        is_interactive().
+    """
+    if interactive is None:
+        interactive = is_interactive()
+
+    start = 0
+    while start < len(records):
+        page_size = TABLE_PAGE_SIZE if table else CARD_PAGE_SIZE
+        page = records[start:start + page_size]
+        text = (format_table if table else format_cards)(page, start)
+        sys.stdout.write(text)
+        sys.stdout.flush()
+
+        if not interactive:
+            start += page_size
+            continue
+
+        last = min(start + page_size, len(records))
+        choice = input(
+            f"{Fore.YELLOW}Records {start + 1}-{last} of {len(records)}. "
+            f"[n]ext, [p]revious, [t]able/cards, [q]uit: "
+            f"{Style.RESET_ALL}"
+        ).strip().lower()
+        if choice == 'q':
+            break
+        elif choice == 'p':
+            start = max(start - page_size, 0)
+        elif choice == 't':
+            table = not table
+        elif last >= len(records):
+            # Next on the last page ends the listing
+            break
+        else:
+            start += page_size
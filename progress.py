@@ -0,0 +1,68 @@
+import os  # Import os module to read the quiet mode setting
+import sys  # Import sys module for the output stream
+import json  # Import json module to measure the request payload
+from colorama import Fore, Style  # Import Fore and Style - text coloring
+
+
+def is_quiet():
+    """
+    Check whether progress output is turned off.
+
+    Progress is off when HRIS_QUIET is set to a non-empty value other
+    than "0", or when stdout is not a terminal (scripted runs).
+
+    Returns:
+        bool: True if progress should not be shown.
+    """
+    quiet = os.environ.get('HRIS_QUIET', '')
+    if quiet and quiet != '0':
+        return True
+    return not sys.stdout.isatty()
+
+
+class ProgressReporter:
+    """
+    Report the batches actually sent by the sheet writer.
+
+    Args:
+        quiet (bool): Turn reporting off. Defaults to is_quiet().
+        stream (file): Stream to write to. Defaults to sys.stdout.
+    """
+
+    def __init__(self, quiet=None, stream=None):
+        self.quiet = is_quiet() if quiet is None else quiet
+        self.stream = stream or sys.stdout
+        self.batches = 0
+        self.rows = 0
+        self.bytes = 0
+
+    def batch(self, action, row_count, values=None):
+        """
+        Record one request sent to the worksheet.
+
+        Args:
+            action (str): What the request did, e.g. "Appended".
+            row_count (int): Number of rows the request touched.
+            values (list): The rows sent. Defaults to None (deletions).
+        """
+        self.batches += 1
+        self.rows += row_count
+        size = len(json.dumps(values, default=str)) if values else 0
+        self.bytes += size
+        if not self.quiet:
+            self.stream.write(
+                f"{Fore.LIGHTRED_EX}Batch {self.batches}: {action} "
+                f"{row_count} row(s), {size} bytes{Style.RESET_ALL}\n"
+            )
+
+    def finish(self):
+        """
+        Write the totals once all batches are sent.
+        """
+        if not self.quiet:
+            self.stream.write(
+                f"{Fore.LIGHTRED_EX}Saved {self.rows} row(s) in "
+                f"{self.batches} batch(es), {self.bytes} bytes"
+                f"{Style.RESET_ALL}\n"
+            )
+            self.stream.flush()
@@ -0,0 +1,559 @@
+import re  # Library for regular expressions
+import calendar  # Import calendar module to tell leap years apart
+import datetime  # Import datetime module for working with dates and times
+from bisect import bisect_left, bisect_right, insort  # Sorted index lookups
+from employee import DERIVED_FIELDS, FIELDNAMES
+
+# Fields compared as numbers or dates, every other field is text
+NUMBER_FIELDS = {
+    'age': int, 'tenure': int, 'salary': float, 'version': int
+}
+DATE_FIELDS = {'date_of_birth', 'hire_date'}
+
+# Comparison operators and the text operators written as words
+COMPARISONS = {
+    '=': lambda a, b: a == b,
+    '!=': lambda a, b: a != b,
+    '<': lambda a, b: a < b,
+    '<=': lambda a, b: a <= b,
+    '>': lambda a, b: a > b,
+    '>=': lambda a, b: a >= b,
+}
+TEXT_OPERATORS = {
+    'contains': lambda a, b: b in a,
+    'startswith': lambda a, b: a.startswith(b),
+    'endswith': lambda a, b: a.endswith(b),
+}
+
+# A value is a quoted string or a run of non-space characters
+_VALUE = r'''("[^"]*"|'[^']*'|[^\s"']+)'''
+_BETWEEN = re.compile(
+    r'\s*(\w+)\s+between\s+' + _VALUE + r'\s+and\s+' + _VALUE, re.I
+)
+_TEXT = re.compile(
+    r'\s*(\w+)\s+(contains|startswith|endswith)\s+' + _VALUE, re.I
+)
+_COMPARISON = re.compile(r'\s*(\w+)\s*(!=|<=|>=|==|=|<|>)\s*' + _VALUE)
+_AND = re.compile(r'\s+and\s+', re.I)
+# Sorts after every record id in a (value, record id) sorted index entry
+_AFTER = float('inf')
+_END = re.compile(r'\s*$')
+_ONE_DAY = datetime.timedelta(days=1)
+
+
+class QueryError(ValueError):
+    """
+    Raised for a query that cannot be parsed.
+    """
+
+
+def parse_date_literal(value):
+    """
+    Parse a date written as DD-MM-YYYY, YYYY-MM-DD or a bare year.
+
+    Args:
+        value: A date, or a string in one of the formats above.
+
+    Returns:
+        datetime.date: The date, or None if it cannot be parsed.
+    """
+    if isinstance(value, datetime.date):
+        return value
+    value = str(value).strip()
+    if re.fullmatch(r'\d{4}', value):
+        return datetime.date(int(value), 1, 1)
+    for date_format in ('%d-%m-%Y', '%Y-%m-%d'):
+        try:
+            return datetime.datetime.strptime(value, date_format).date()
+        except ValueError:
+            continue
+    return None
+
+
+def field_key(field, value):
+    """
+    Convert a field value to the type it is compared as.
+
+    Numbers and dates are parsed, text is lowercased.
+
+    Args:
+        field (str): The field name.
+        value: The raw field value.
+
+    Returns:
+        The comparable value, or None if it cannot be parsed.
+    """
+    if field in NUMBER_FIELDS:
+        try:
+            return NUMBER_FIELDS[field](float(value))
+        except (TypeError, ValueError):
+            return None
+    if field in DATE_FIELDS:
+        return parse_date_literal(value)
+    return str(value).lower()
+
+
+def _unquote(value):
+    """
+    Strip the quotes around a quoted value.
+    """
+    if value[:1] in ('"', "'"):
+        return value[1:-1]
+    return value
+
+
+class Condition:
+    """
+    One condition of a query, e.g. salary > 80000.
+
+    Args:
+        field (str): The field name.
+        operator (str): A comparison, text operator or "between".
+        values (list): One value, or two for "between".
+    """
+
+    def __init__(self, field, operator, values):
+        field = field.lower()
+        if field not in FIELDNAMES and field not in DERIVED_FIELDS:
+            raise QueryError(f"Unknown field: {field}")
+        self.field = field
+        self.operator = operator.lower()
+        if self.operator == '==':
+            self.operator = '='
+        if self.operator in TEXT_OPERATORS:
+            self.values = [value.lower() for value in values]
+        else:
+            self.values = [field_key(field, value) for value in values]
+            if None in self.values:
+                raise QueryError(f"Invalid value for {field}: {values}")
+
+    def matches(self, record):
+        """
+        Check a record against the condition.
+
+        Args:
+            record (dict): The record to check.
+
+        Returns:
+            bool: True if the record matches.
+        """
+        if self.operator in TEXT_OPERATORS:
+            value = str(record[self.field]).lower()
+            return TEXT_OPERATORS[self.operator](value, self.values[0])
+        value = field_key(self.field, record[self.field])
+        if value is None:
+            return False
+        if self.operator == 'between':
+            return self.values[0] <= value <= self.values[1]
+        return COMPARISONS[self.operator](value, self.values[0])
+
+
+def parse_query(text):
+    """
+    Parse a query made of conditions joined by "and".
+
+    Conditions are "field op value" with op one of = != < <= > >=,
+    "field contains|startswith|endswith value" and
+    "field between low and high". Values with spaces must be quoted.
+
+    Args:
+        text (str): The query, e.g. "department=IT and salary>80000".
+
+    Returns:
+        list: List of Condition objects.
+    """
+    conditions = []
+    position = 0
+    while True:
+        for pattern in (_BETWEEN, _TEXT, _COMPARISON):
+            match = pattern.match(text, position)
+            if match:
+                break
+        else:
+            raise QueryError(f"Cannot parse query at: {text[position:]!r}")
+
+        groups = match.groups()
+        if pattern is _BETWEEN:
+            field, operator = groups[0], 'between'
+            values = [_unquote(groups[1]), _unquote(groups[2])]
+        else:
+            field, operator = groups[0], groups[1]
+            values = [_unquote(groups[2])]
+        conditions.append(Condition(field, operator, values))
+        position = match.end()
+
+        if _END.match(text, position):
+            return conditions
+        separator = _AND.match(text, position)
+        if not separator:
+            raise QueryError(f"Expected 'and' at: {text[position:]!r}")
+        position = separator.end()
+
+
+class HashIndex:
+    """
+    Index from the lowercased value of a text field to its records.
+
+    Args:
+        field (str): The indexed field.
+    """
+
+    def __init__(self, field):
+        self.field = field
+        self.clear()
+
+    def clear(self):
+        self._keys = {}
+        self._buckets = {}
+
+    def rebuild(self, entries):
+        self.clear()
+        for record_id, record in entries:
+            self.add(record_id, record)
+
+    def add(self, record_id, record):
+        key = field_key(self.field, record[self.field])
+        self._keys[record_id] = key
+        self._buckets.setdefault(key, set()).add(record_id)
+
+    def remove(self, record_id):
+        key = self._keys.pop(record_id)
+        bucket = self._buckets[key]
+        bucket.discard(record_id)
+        if not bucket:
+            del self._buckets[key]
+
+    def supports(self, condition):
+        """
+        Check whether the index can answer a condition.
+        """
+        return condition.operator == '='
+
+    def estimate(self, condition):
+        """
+        Count the candidates of a condition.
+        """
+        return len(self._buckets.get(condition.values[0], ()))
+
+    def lookup(self, condition):
+        """
+        Get the ids of the records that can match a condition.
+        """
+        return self._buckets.get(condition.values[0], set())
+
+
+class SortedIndex:
+    """
+    Index of a number or date field sorted by value, for range lookups.
+
+    Records whose value cannot be parsed are left out; they never match
+    a comparison on the field.
+
+    Args:
+        field (str): The indexed field.
+    """
+
+    def __init__(self, field):
+        self.field = field
+        self.clear()
+
+    def clear(self):
+        self._keys = {}
+        self._entries = []
+
+    def rebuild(self, entries):
+        self.clear()
+        for record_id, record in entries:
+            key = field_key(self.field, record[self.field])
+            self._keys[record_id] = key
+            if key is not None:
+                self._entries.append((key, record_id))
+        # One sort for the initial build, binary inserts after that
+        self._entries.sort()
+
+    def add(self, record_id, record):
+        key = field_key(self.field, record[self.field])
+        self._keys[record_id] = key
+        if key is not None:
+            insort(self._entries, (key, record_id))
+
+    def remove(self, record_id):
+        key = self._keys.pop(record_id)
+        if key is not None:
+            del self._entries[bisect_left(self._entries, (key, record_id))]
+
+    def _bounds(self, condition):
+        """
+        Get the slice of entries matching a range condition.
+        """
+        entries = self._entries
+        operator = condition.operator
+        first, last = condition.values[0], condition.values[-1]
+        # (value,) sorts before and (value, _AFTER) after every (value, id)
+        low, high = 0, len(entries)
+        if operator in ('=', '>=', 'between'):
+            low = bisect_left(entries, (first,))
+        elif operator == '>':
+            low = bisect_right(entries, (first, _AFTER))
+        if operator in ('=', '<=', 'between'):
+            high = bisect_right(entries, (last, _AFTER))
+        elif operator == '<':
+            high = bisect_left(entries, (first,))
+        return low, max(low, high)
+
+    def supports(self, condition):
+        """
+        Check whether the index can answer a condition.
+        """
+        return condition.operator in ('=', '<', '<=', '>', '>=', 'between')
+
+    def estimate(self, condition):
+        """
+        Count the candidates of a condition without building the list.
+        """
+        low, high = self._bounds(condition)
+        return high - low
+
+    def lookup(self, condition):
+        """
+        Get the ids of the records that can match a condition.
+        """
+        low, high = self._bounds(condition)
+        return [record_id for _, record_id in self._entries[low:high]]
+
+
+def _latest_birth_date(age, today):
+    """
+    Get the latest date of birth of someone at least a given age today,
+    as calculate_age() counts. Out-of-range dates are clamped, which
+    only widens a lookup.
+    """
+    year = today.year - age
+    if year < datetime.MINYEAR:
+        return datetime.date.min
+    if year > datetime.MAXYEAR:
+        return datetime.date.max
+    if (today.month, today.day) == (2, 29) and not calendar.isleap(year):
+        # 28 February is the last birthday before 1 March
+        return datetime.date(year, 2, 28)
+    return today.replace(year=year)
+
+
+def _day_after(date):
+    """
+    Get the next day, or the date itself at the end of the calendar.
+    """
+    return date if date == datetime.date.max else date + _ONE_DAY
+
+
+class AgeIndex:
+    """
+    Index of the age, kept as the date of birth sorted by date.
+
+    Ages go up on birthdays without the records changing, so an index
+    of the ages would go stale; the dates of birth do not. An age
+    condition is turned into a range of dates of birth on the day it is
+    looked up. Records without a valid date of birth keep the age they
+    were stored with, so those are indexed by that age.
+    """
+
+    field = 'age'
+
+    def __init__(self):
+        self._dates = SortedIndex('date_of_birth')
+        self._stored = SortedIndex('age')
+        self.clear()
+
+    def clear(self):
+        self._dates.clear()
+        self._stored.clear()
+        self._stored_ids = set()
+
+    def rebuild(self, entries):
+        self.clear()
+        entries = list(entries)
+        self._dates.rebuild(entries)
+        stored = [
+            (record_id, record) for record_id, record in entries
+            if not self._has_date(record)
+        ]
+        self._stored.rebuild(stored)
+        self._stored_ids = {record_id for record_id, _ in stored}
+
+    def _has_date(self, record):
+        """
+        Check whether a record's age is computed from its date of birth.
+        """
+        return field_key('date_of_birth', record['date_of_birth']) \
+            is not None
+
+    def add(self, record_id, record):
+        self._dates.add(record_id, record)
+        if not self._has_date(record):
+            self._stored.add(record_id, record)
+            self._stored_ids.add(record_id)
+
+    def remove(self, record_id):
+        self._dates.remove(record_id)
+        if record_id in self._stored_ids:
+            self._stored_ids.discard(record_id)
+            self._stored.remove(record_id)
+
+    def _date_condition(self, condition):
+        """
+        Turn an age condition into the condition on the date of birth
+        that holds today.
+        """
+        today = datetime.date.today()
+        operator = condition.operator
+        first, last = condition.values[0], condition.values[-1]
+        # The older the age, the earlier the date of birth
+        if operator == '>=':
+            values = [_latest_birth_date(first, today)]
+            operator = '<='
+        elif operator == '>':
+            values = [_latest_birth_date(first + 1, today)]
+            operator = '<='
+        elif operator == '<=':
+            values = [_latest_birth_date(last + 1, today)]
+            operator = '>'
+        elif operator == '<':
+            values = [_latest_birth_date(first, today)]
+            operator = '>'
+        else:
+            # = and between: born after the next age up to the first
+            values = [
+                _day_after(_latest_birth_date(last + 1, today)),
+                _latest_birth_date(first, today),
+            ]
+            operator = 'between'
+        return Condition('date_of_birth', operator, values)
+
+    def supports(self, condition):
+        """
+        Check whether the index can answer a condition.
+        """
+        return self._stored.supports(condition)
+
+    def estimate(self, condition):
+        """
+        Count the candidates of a condition without building the list.
+        """
+        return self._dates.estimate(self._date_condition(condition)) \
+            + self._stored.estimate(condition)
+
+    def lookup(self, condition):
+        """
+        Get the ids of the records that can match a condition.
+        """
+        return self._dates.lookup(self._date_condition(condition)) \
+            + self._stored.lookup(condition)
+
+
+class QueryEngine:
+    """
+    Run structured queries over records using per-field indexes.
+
+    Keeps a hash index on department and job position and sorted indexes
+    on salary, age (by date of birth) and hire date. For each query the
+    planner looks at every condition an index can answer, starts from
+    the one with the fewest candidates and checks only those records
+    against the rest. Queries that no index can answer scan every
+    record.
+
+    Register it with TrackedRecords.add_index() to keep it up to date.
+    """
+
+    def __init__(self):
+        self.indexes = {
+            'department': HashIndex('department'),
+            'job_position': HashIndex('job_position'),
+            'salary': SortedIndex('salary'),
+            'age': AgeIndex(),
+            'hire_date': SortedIndex('hire_date'),
+        }
+        self.clear()
+
+    def clear(self):
+        self._records = {}
+        self._order = {}
+        self._next_order = 0
+        for index in self.indexes.values():
+            index.clear()
+
+    def rebuild(self, records):
+        self.clear()
+        entries = []
+        for record in records:
+            record_id = id(record)
+            self._records[record_id] = record
+            self._order[record_id] = self._next_order
+            self._next_order += 1
+            entries.append((record_id, record))
+        for index in self.indexes.values():
+            index.rebuild(entries)
+
+    def add(self, record):
+        record_id = id(record)
+        self._records[record_id] = record
+        self._order[record_id] = self._next_order
+        self._next_order += 1
+        for index in self.indexes.values():
+            index.add(record_id, record)
+
+    def remove(self, record):
+        record_id = id(record)
+        if self._records.pop(record_id, None) is None:
+            return
+        del self._order[record_id]
+        for index in self.indexes.values():
+            index.remove(record_id)
+
+    def update(self, record):
+        record_id = id(record)
+        for index in self.indexes.values():
+            index.remove(record_id)
+            index.add(record_id, record)
+
+    def _plan(self, conditions):
+        """
+        Pick the condition whose index yields the fewest candidates.
+
+        Returns:
+            list: Candidate record ids, or None for a full scan.
+        """
+        best = None
+        for condition in conditions:
+            index = self.indexes.get(condition.field)
+            if index is None or not index.supports(condition):
+                continue
+            size = index.estimate(condition)
+            if best is None or size < best[0]:
+                best = (size, index, condition)
+        if best is None:
+            return None
+        return best[1].lookup(best[2])
+
+    def query(self, text):
+        """
+        Find the records matching a query.
+
+        Args:
+            text (str): The query, see parse_query().
+
+        Returns:
+            list: List of matching records, in the order they were added.
+        """
+        conditions = parse_query(text)
+        candidates = self._plan(conditions)
+        if candidates is None:
+            candidates = self._records
+        matches = [
+            record_id for record_id in candidates
+            if all(
+                condition.matches(self._records[record_id])
+                for condition in conditions
+            )
+        ]
+        matches.sort(key=self._order.get)
+        return [self._records[record_id] for record_id in matches]
@@ -0,0 +1,197 @@
+import os  # Import os module to read the backend settings
+from abc import ABC, abstractmethod  # Backends must implement every method
+
+
+class RecordStore(ABC):
+    """
+    Storage backend for HRIS records.
+
+    Records are addressed by their position in the list returned by
+    load(). The single-record methods write straight to the backend,
+    sync() writes the pending changes of a TrackedRecords list in as few
+    operations as the backend allows.
+
+    Every record has an employee ID, given when it is first saved and
+    never changed, and a version, raised by one on each write. Writes are
+    compare-and-swap: a change made to a record another user has saved
+    since it was read is merged with theirs or refused, never written
+    over it.
+
+    Every method is abstract, so a backend missing one cannot be
+    created.
+    """
+
+    @abstractmethod
+    def load(self):
+        """
+        Load all records.
+
+        Returns:
+            TrackedRecords: List of records.
+        """
+
+    @abstractmethod
+    def iter_records(self, batch_size=1000):
+        """
+        Stream all records, reading them from the backend in batches.
+
+        Unlike load(), the records are not kept, so any number of
+        records can be streamed in constant memory, e.g. for an export.
+
+        Args:
+            batch_size (int): Records read per request. Defaults to 1000.
+
+        Yields:
+            Employee: Each record in storage order.
+        """
+
+    @abstractmethod
+    def get(self, index):
+        """
+        Get one record.
+
+        Args:
+            index (int): Position of the record.
+
+        Returns:
+            dict: The record.
+        """
+
+    @abstractmethod
+    def find(self, employee_id):
+        """
+        Find the position of a record by its employee ID.
+
+        Args:
+            employee_id (str): The employee ID.
+
+        Returns:
+            int: Position of the record, or None if there is none.
+        """
+
+    @abstractmethod
+    def duplicate_candidates(self, record):
+        """
+        Find the stored records a record may duplicate: those with the
+        same normalized email, or the same normalized name and date of
+        birth, as compared by duplicates.DuplicateIndex.
+
+        Args:
+            record (dict): A new or changed record.
+
+        Returns:
+            list: List of records. Only the employee ID and the fields
+            of DuplicateIndex.fields are sure to be filled in.
+        """
+
+    @abstractmethod
+    def insert(self, record):
+        """
+        Add a record at the end, as version 1 and with a new employee ID
+        if it has none.
+
+        Args:
+            record (dict): The record to add.
+        """
+
+    @abstractmethod
+    def update(self, index, record, expected=None):
+        """
+        Replace one record and set its version to the next one. The
+        record keeps the stored employee ID.
+
+        Args:
+            index (int): Position of the record.
+            record (dict): The new values.
+            expected (dict): The record as it was read. Defaults to
+            None, no check.
+
+        Raises:
+            ConflictError: If the stored record is no longer as expected.
+        """
+
+    @abstractmethod
+    def delete(self, index, expected=None):
+        """
+        Delete one record.
+
+        Args:
+            index (int): Position of the record.
+            expected (dict): The record as it was read. Defaults to
+            None, no check.
+
+        Raises:
+            ConflictError: If the stored record is no longer as expected.
+        """
+
+    @abstractmethod
+    def base_record(self, origin):
+        """
+        Get a record as it was loaded or last saved, before any pending
+        change, e.g. to journal the change.
+
+        Args:
+            origin (int): Position of the record at the last sync.
+
+        Returns:
+            Employee: A copy of the record as stored.
+        """
+
+    @abstractmethod
+    def query(self, **criteria):
+        """
+        Find the records whose fields equal the given values.
+
+        Args:
+            **criteria: Field names and the values to match.
+
+        Returns:
+            list: List of matching records.
+        """
+
+    @abstractmethod
+    def sync(self, records, progress=None):
+        """
+        Write the changes tracked on a list of records.
+
+        Records other users changed in the meantime are merged: fields
+        only one side changed are combined, fields both changed keep the
+        value saved first. The records are updated to what was saved.
+
+        Args:
+            records (TrackedRecords): Records with their pending changes.
+            progress (ProgressReporter): Reporter told about each request.
+            Defaults to None.
+
+        Returns:
+            list: List of Conflict, the changes that were merged.
+
+        Raises:
+            ConflictError: If the changes could not be merged.
+        """
+
+
+def open_store():
+    """
+    Open the storage backend selected by the environment.
+
+    HRIS_BACKEND chooses "sheets" (the default, Google Sheets) or
+    "sqlite". The SQLite database file is HRIS_DB, "hris.db" by default.
+    Google Sheets are cached locally in HRIS_CACHE, "hris_cache.db" by
+    default; set it to an empty value to turn the cache off.
+
+    Returns:
+        RecordStore: The opened store.
+    """
+    backend = os.environ.get('HRIS_BACKEND', 'sheets').lower()
+    if backend == 'sqlite':
+        # Imported here so the SQLite backend never needs gspread
+        from sqlite_store import SQLiteRecordStore
+        return SQLiteRecordStore(os.environ.get('HRIS_DB', 'hris.db'))
+    if backend == 'sheets':
+        from sheets_store import SheetsRecordStore
+        from snapshot_cache import SnapshotCache
+        cache_path = os.environ.get('HRIS_CACHE', 'hris_cache.db')
+        cache = SnapshotCache(cache_path) if cache_path else None
+        return SheetsRecordStore(cache=cache)
+    raise ValueError(f"Unknown HRIS_BACKEND: {backend}")
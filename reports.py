@@ -0,0 +1,566 @@
+import math  # Import math module for exact sums
+import datetime  # Import datetime module for working with dates and times
+from array import array  # Compact columns of numbers
+from bisect import bisect_right  # Find a rank in cumulative counts
+from collections import Counter  # Count values and group sizes
+from itertools import (  # Bulk column access
+    accumulate,
+    compress,
+    islice,
+)
+from operator import (  # Bulk operations
+    attrgetter,
+    eq,
+    methodcaller,
+    mul,
+)
+from employee import calculate_age
+
+# Fields a report can be grouped by
+GROUP_FIELDS = ('department', 'job_position')
+# Measured columns: salary as stored, age and tenure from the dates
+METRICS = ('salary', 'age', 'tenure')
+# Heading of each metric's table
+METRIC_TITLES = {
+    'salary': "Salary",
+    'age': "Age",
+    'tenure': "Tenure (years)",
+}
+# Percentiles reported besides the median
+PERCENTILES = (25, 75, 90)
+# Records copied into the columns at a time
+CHUNK_SIZE = 10000
+# Columns counted per group: salary, and the dates age and tenure are
+# computed from
+TALLIED_COLUMNS = ('salary', 'birth_day', 'hire_day')
+# Statistics of each metric, in report column order
+STATISTICS = (
+    ('sum', "Sum"),
+    ('mean', "Mean"),
+    ('min', "Min"),
+    ('p25', "P25"),
+    ('median', "Median"),
+    ('p75', "P75"),
+    ('p90', "P90"),
+    ('max', "Max"),
+)
+
+_NAN = float('nan')
+
+
+def _number(value):
+    """
+    Get a numeric field value, or NaN for a bad cell.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return _NAN
+
+
+def _day_number(value):
+    """
+    Get the ordinal of a date field value, or NaN for a bad cell.
+    """
+    if isinstance(value, datetime.date):
+        return float(value.toordinal())
+    return _NAN
+
+
+def _years_since(day, today, years):
+    """
+    Get the full years from a date ordinal to today, as calculate_age()
+    counts them, remembering each date converted in years.
+    """
+    if day not in years:
+        years[day] = float(
+            calculate_age(datetime.date.fromordinal(int(day)), today)
+        )
+    return years[day]
+
+
+def _extend(column, values, convert, fallback):
+    """
+    Append converted values to a column, converting in C where possible.
+
+    Records normally hold typed values, so the whole chunk is converted
+    with map(). A bad cell makes the chunk fall back to the slower
+    conversion that turns it into NaN.
+    """
+    try:
+        column.extend(array('d', map(convert, values)))
+    except (TypeError, ValueError, AttributeError):
+        column.extend(map(fallback, values))
+
+
+def build_columns(records):
+    """
+    Copy the fields used by reports into columns.
+
+    Group fields become lists of strings, numbers become arrays of
+    floats with NaN for missing or unparseable values, and the date of
+    birth and hire date become arrays of day numbers. Records are read
+    a chunk at a time and each field is copied from a whole chunk in
+    one call, so the grouping and statistics work on plain sequences
+    instead of records.
+
+    Args:
+        records (iterable): The records, e.g. store.iter_records().
+
+    Returns:
+        dict: Columns keyed by field name, with 'birth_day' and
+        'hire_day' holding the date of birth and hire date ordinals.
+    """
+    columns = {field: [] for field in GROUP_FIELDS}
+    for field in ('salary', 'birth_day', 'hire_day'):
+        columns[field] = array('d')
+
+    records = iter(records)
+    while True:
+        # Read a chunk at a time, so streamed records are not all kept
+        chunk = list(islice(records, CHUNK_SIZE))
+        if not chunk:
+            break
+        for field in GROUP_FIELDS:
+            columns[field].extend(map(str, map(attrgetter(field), chunk)))
+        _extend(
+            columns['salary'], list(map(attrgetter('salary'), chunk)),
+            float, _number
+        )
+        # Not the age column as stored, the age is computed from this
+        _extend(
+            columns['birth_day'],
+            list(map(attrgetter('date_of_birth'), chunk)),
+            methodcaller('toordinal'), _day_number
+        )
+        _extend(
+            columns['hire_day'], list(map(attrgetter('hire_date'), chunk)),
+            methodcaller('toordinal'), _day_number
+        )
+    return columns
+
+
+def _new_tally():
+    """
+    Get an empty tally of one group: its headcount and the number of
+    times each value of TALLIED_COLUMNS occurs.
+    """
+    tally = {column: Counter() for column in TALLIED_COLUMNS}
+    tally['headcount'] = 0
+    return tally
+
+
+def tally_columns(columns):
+    """
+    Count the values of each group in columns from build_columns().
+
+    Groups are keyed by all of GROUP_FIELDS, so a report by any of them
+    only has to add up the tallies. The row numbers of each group are
+    collected in one pass, then the values of a group are picked out of
+    each column and counted in one call.
+
+    Args:
+        columns (dict): The columns.
+
+    Returns:
+        dict: Tallies keyed by the tuple of GROUP_FIELDS values, each
+        with 'headcount' and a Counter per column of TALLIED_COLUMNS.
+        NaN is not counted.
+    """
+    keys = list(zip(*(columns[field] for field in GROUP_FIELDS)))
+    groups = list(set(keys))
+    group_numbers = dict(zip(groups, range(len(groups))))
+    # Row numbers of each group, in one pass instead of a sort
+    rows = [[] for _ in groups]
+    appends = [group_rows.append for group_rows in rows]
+    for position, number in enumerate(map(group_numbers.__getitem__, keys)):
+        appends[number](position)
+
+    tallies = {}
+    for key, group_rows in zip(groups, rows):
+        tally = tallies[key] = {'headcount': len(group_rows)}
+        for column in TALLIED_COLUMNS:
+            values = list(map(columns[column].__getitem__, group_rows))
+            # NaN is the only value not equal to itself
+            tally[column] = Counter(
+                compress(values, map(eq, values, values))
+            )
+    return tallies
+
+
+class ReportIndex:
+    """
+    Tallies of the groups of a list of records, kept up to date so a
+    report does not have to copy the fields of every record again.
+
+    Register it with TrackedRecords.add_index() to keep it up to date;
+    group_report() uses it when the records have it as 'report'. Each
+    change moves one record in or out of its group's counts. Records
+    are dicts and not hashable, so they are tracked by id().
+
+    Attributes:
+        tallies (dict): Tallies by group, as tally_columns() returns
+        them.
+    """
+
+    fields = GROUP_FIELDS + ('salary', 'date_of_birth', 'hire_date')
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """
+        Remove every record from the index.
+        """
+        self.tallies = {}
+        self._entries = {}
+
+    def rebuild(self, records):
+        """
+        Index a list of records from scratch, copying the fields a
+        chunk at a time as build_columns() does.
+
+        Args:
+            records (list): List of records.
+        """
+        columns = build_columns(records)
+        self.tallies = tally_columns(columns)
+        # One key tuple per group, shared by the entries
+        groups = {key: key for key in self.tallies}
+        keys = map(
+            groups.__getitem__,
+            zip(*(columns[field] for field in GROUP_FIELDS))
+        )
+        # The values as stored, converted again when a record is removed
+        self._entries = dict(zip(
+            map(id, records),
+            zip(
+                keys,
+                map(attrgetter('salary'), records),
+                map(attrgetter('date_of_birth'), records),
+                map(attrgetter('hire_date'), records),
+            )
+        ))
+
+    def _values(self, salary, date_of_birth, hire_date):
+        """
+        Get the values of TALLIED_COLUMNS from the stored field values.
+        """
+        return (
+            _number(salary),
+            _day_number(date_of_birth),
+            _day_number(hire_date),
+        )
+
+    def add(self, record):
+        """
+        Count a record in its group.
+
+        Args:
+            record (dict): The record to index.
+        """
+        key = tuple(str(record[field]) for field in GROUP_FIELDS)
+        if key not in self.tallies:
+            self.tallies[key] = _new_tally()
+        tally = self.tallies[key]
+        fields = (
+            record['salary'], record['date_of_birth'], record['hire_date']
+        )
+        self._entries[id(record)] = (key,) + fields
+        tally['headcount'] += 1
+        for column, value in zip(TALLIED_COLUMNS, self._values(*fields)):
+            if value == value:
+                tally[column][value] += 1
+
+    def remove(self, record):
+        """
+        Take a record out of its group, using the values it was counted
+        with.
+
+        Args:
+            record (dict): The record to remove.
+        """
+        entry = self._entries.pop(id(record), None)
+        if entry is None:
+            return
+        key, *fields = entry
+        tally = self.tallies[key]
+        tally['headcount'] -= 1
+        if not tally['headcount']:
+            del self.tallies[key]
+            return
+        for column, value in zip(TALLIED_COLUMNS, self._values(*fields)):
+            if value != value:
+                continue
+            counts = tally[column]
+            counts[value] -= 1
+            # Keep only values that occur, for min and max
+            if not counts[value]:
+                del counts[value]
+
+    def update(self, record):
+        """
+        Re-index a record after its fields changed in place.
+
+        Args:
+            record (dict): The changed record.
+        """
+        self.remove(record)
+        self.add(record)
+
+
+def percentile(distinct, cumulative, percent):
+    """
+    Get a percentile by linear interpolation between the closest values.
+
+    Args:
+        distinct (list): The distinct values in ascending order.
+        cumulative (list): Number of values up to and including each
+        distinct value.
+        percent (float): The percentile, 0 to 100.
+
+    Returns:
+        float: The percentile.
+    """
+    def value_at(rank):
+        # The value at a 0-based rank in the full sorted list
+        return distinct[bisect_right(cumulative, rank)]
+
+    position = (cumulative[-1] - 1) * percent / 100
+    lower = math.floor(position)
+    low_value = value_at(lower)
+    high_value = value_at(min(lower + 1, cumulative[-1] - 1))
+    return low_value + (high_value - low_value) * (position - lower)
+
+
+def summarize(values):
+    """
+    Compute the statistics of one metric of one group.
+
+    The values are counted rather than sorted: ages, tenures and
+    salaries repeat a lot, so only the distinct values need sorting.
+
+    Args:
+        values (list): The values, NaN for missing ones.
+
+    Returns:
+        dict: count, sum, mean, min, max, median and the PERCENTILES as
+        'p25' etc. Only count is set if there are no values.
+    """
+    # NaN is the only value not equal to itself, drop it without a loop
+    counts = Counter(compress(values, map(eq, values, values)))
+    return summarize_counts(counts)
+
+
+def summarize_counts(counts):
+    """
+    Compute the statistics of one metric of one group from the number
+    of times each value occurs.
+
+    Args:
+        counts (Counter): Number of occurrences by value, without NaN.
+
+    Returns:
+        dict: The statistics, as summarize() returns them.
+    """
+    if not counts:
+        return {'count': 0}
+    distinct = sorted(counts)
+    frequencies = list(map(counts.__getitem__, distinct))
+    cumulative = list(accumulate(frequencies))
+    count = cumulative[-1]
+    total = math.fsum(map(mul, distinct, frequencies))
+    stats = {
+        'sum': total,
+        'mean': total / count,
+        'min': distinct[0],
+        'max': distinct[-1],
+        'median': percentile(distinct, cumulative, 50),
+    }
+    for percent in PERCENTILES:
+        stats[f'p{percent}'] = percentile(distinct, cumulative, percent)
+    stats['count'] = count
+    return stats
+
+
+def _merge(counters):
+    """
+    Add up Counters, without copying a single one.
+    """
+    if len(counters) == 1:
+        return counters[0]
+    total = Counter()
+    for counts in counters:
+        total.update(counts)
+    return total
+
+
+def _count_years(day_counts, today, years):
+    """
+    Turn the counts of date ordinals into counts of the full years from
+    each date to today.
+    """
+    counts = Counter()
+    for day, count in day_counts.items():
+        counts[_years_since(day, today, years)] += count
+    return counts
+
+
+def group_report(records, group_by=('department',), today=None):
+    """
+    Compute headcount and metric statistics per group.
+
+    The statistics are computed from the tallies of each group, the
+    number of times each value occurs, so the work depends on the
+    number of distinct values rather than of records. Records with a
+    ReportIndex registered as 'report' already have their tallies;
+    other records are copied into columns and tallied first. Age and
+    tenure are computed once per distinct date.
+
+    Args:
+        records (iterable): The records.
+        group_by (tuple): Fields from GROUP_FIELDS to group by.
+        Defaults to department.
+        today (datetime.date): The day age and tenure are measured to.
+        Defaults to None, the current date.
+
+    Returns:
+        list: One dict per group, sorted by group, with 'group' (tuple
+        of the group field values), 'headcount' and one dict of
+        statistics per metric.
+    """
+    group_by = tuple(group_by)
+    for field in group_by:
+        if field not in GROUP_FIELDS:
+            raise ValueError(f"Cannot group by: {field}")
+    index = getattr(records, 'indexes', {}).get('report')
+    if isinstance(index, ReportIndex):
+        tallies = index.tallies
+    else:
+        tallies = tally_columns(build_columns(records))
+
+    today = today or datetime.date.today()
+    # Tallies of each reported group, from those of the finer groups
+    positions = [GROUP_FIELDS.index(field) for field in group_by]
+    groups = {}
+    for key, tally in tallies.items():
+        group = tuple(key[position] for position in positions)
+        groups.setdefault(group, []).append(tally)
+
+    # Full years by date ordinal, shared by all groups and both dates
+    years = {}
+    report = []
+    for group in sorted(groups):
+        parts = groups[group]
+        counts = {
+            column: _merge([part[column] for part in parts])
+            for column in TALLIED_COLUMNS
+        }
+        report.append({
+            'group': group,
+            'headcount': sum(part['headcount'] for part in parts),
+            'salary': summarize_counts(counts['salary']),
+            # Full years, as record['age'] and record['tenure'] count
+            'age': summarize_counts(
+                _count_years(counts['birth_day'], today, years)
+            ),
+            'tenure': summarize_counts(
+                _count_years(counts['hire_day'], today, years)
+            ),
+        })
+    return report
+
+
+def _format_number(value):
+    """
+    Format a statistic with thousands separators and up to 2 decimals.
+    """
+    if value is None:
+        return "-"
+    if float(value).is_integer():
+        return f"{value:,.0f}"
+    return f"{value:,.2f}"
+
+
+def format_report(report, group_by=('department',)):
+    """
+    Format a group report as one aligned table per metric.
+
+    Args:
+        report (list): The result of group_report().
+        group_by (tuple): The fields the report was grouped by.
+
+    Returns:
+        str: The formatted report.
+    """
+    group_headings = [
+        field.replace('_', ' ').title() for field in group_by
+    ] or ["All"]
+    sections = []
+    for metric in METRICS:
+        headings = group_headings + ["Count"] + [
+            heading for _, heading in STATISTICS
+        ]
+        rows = []
+        for row in report:
+            stats = row.get(metric, {'count': 0})
+            rows.append(
+                (list(row['group']) or ["All"])
+                + [str(stats['count'])]
+                + [_format_number(stats.get(name)) for name, _ in STATISTICS]
+            )
+        widths = [
+            max(len(cells[column]) for cells in rows + [headings])
+            for column in range(len(headings))
+        ]
+        lines = [METRIC_TITLES[metric]]
+        for cells in [headings] + rows:
+            # Group names on the left, numbers aligned on the right
+            lines.append("  ".join(
+                cell.ljust(width) if column < len(group_headings)
+                else cell.rjust(width)
+                for column, (cell, width) in enumerate(zip(cells, widths))
+            ))
+        sections.append("\n".join(lines))
+    return "\n\n".join(sections) + "\n"
+
+
+def main():
+    """
+    Print a group report of the configured store from the command line.
+    """
+    import argparse  # Imported here, only the command line needs it
+    import json  # Imported here, only the command line prints JSON
+    from record_store import open_store
+
+    parser = argparse.ArgumentParser(
+        description="Print headcount, salary, age and tenure statistics."
+    )
+    parser.add_argument(
+        '--by', default='department',
+        help="comma-separated fields to group by: department, "
+             "job_position (default department, empty for no grouping)"
+    )
+    parser.add_argument(
+        '--json', action='store_true', help="print the report as JSON"
+    )
+    args = parser.parse_args()
+
+    group_by = tuple(
+        field.strip().lower() for field in args.by.split(',')
+        if field.strip()
+    )
+    try:
+        report = group_report(open_store().iter_records(), group_by)
+    except ValueError as error:
+        parser.exit(1, f"Report failed! {error}\n")
+    if args.json:
+        print(json.dumps(
+            [dict(row, group=list(row['group'])) for row in report],
+            indent=2
+        ))
+    else:
+        print(format_report(report, group_by), end="")
+
+
+if __name__ == '__main__':
+    main()
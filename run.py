@@ -1,9 +1,9 @@
 # Import required libraries
-import os  # Import os module for interacting with the operating system
+import sys  # Import sys module to read command line arguments
+import atexit  # Import atexit module to save queued changes on exit
 import datetime  # Import datetime module for working with dates and times
-import time  # Import time module
-import gspread  # Import gspread library for accessing Google Sheets
-from google.oauth2.service_account import Credentials  # Import Credentials
+from contextlib import nullcontext  # No lock without the background writer
+from concurrent.futures import ThreadPoolExecutor  # Background loading
 from simple_term_menu import TerminalMenu  # Import TerminalMenu class
 from colorama import Fore, Style  # Import Fore and Style - text coloring
 from validation_functions import (
@@ -18,82 +18,335 @@ from validation_functions import (
     get_job_input,
     get_department_input,
 )
+from birthdays import AgeRefresher
+from bulk_import import import_file
+from duplicates import DuplicateIndex, dedupe_report, format_dedupe_report
+from export import FORMATS, export_file, parse_fields
+from reports import ReportIndex, group_report, format_report
+from conflicts import ConflictError, user_values
+from journal import open_journal, recover, save
+from sync_queue import SyncQueue, is_backend_error
+from employee import (
+    FIELDNAMES,
+    SYSTEM_FIELDS,
+    Employee,
+    calculate_age,
+    new_employee_id,
+    parse_date,
+)
 from print_record import print_record
-
-SCOPE = [
-    "https://www.googleapis.com/auth/spreadsheets",
-    "https://www.googleapis.com/auth/drive.file",
-    "https://www.googleapis.com/auth/drive"
-]
-
-# Load credentials from the service account file
-CREDS = Credentials.from_service_account_file('creds.json')
-# Load credentials from the service account file
-SCOPED_CREDS = CREDS.with_scopes(SCOPE)
-# Authorize the gspread client using the scoped credentials
-GSPREAD_CLIENT = gspread.authorize(SCOPED_CREDS)
-# Open the Google Sheets document named 'pp3'
-SHEET = GSPREAD_CLIENT.open('pp3')
-# Access the 'hris' worksheet within the Google Sheets document
-hris = SHEET.worksheet('hris')
+from progress import ProgressReporter
+from record_store import open_store
+from screen import clear_screen, redraw
+from search_index import EmployeeIdIndex, NameIndex
+from sorted_view import SortedView
+from query_engine import QueryEngine, QueryError
+from validators import DUPLICATE_EMAIL, DUPLICATE_PERSON, MESSAGES
+
+# Open the storage backend (Google Sheets unless HRIS_BACKEND says so).
+# This does not connect yet, the first data access does.
+store = open_store()
+# Local write-ahead journal of the saves, unless HRIS_JOURNAL is empty
+journal = open_journal()
+# Background load of the records, started by prefetch_records()
+records_future = None
+# Background writer of the changes, started by start_sync_queue()
+sync_queue = None
+# Daily update of the stored ages, created by load_records()
+age_refresher = None
+# Why the journal could not be replayed by load_records(), if it failed
+load_warning = None
 
 red_color = Fore.RED
 reset_style = Style.RESET_ALL
 
+# Screens of the menu loop in run_menus()
+MAIN_SCREEN = 'main'
+INSTRUCTIONS_SCREEN = 'instructions'
+HRIS_SCREEN = 'hris'
+RETURN_SCREEN = 'return'
+
+# Sorting options: the menu label and the (field, descending) sort keys
+SORT_OPTIONS = [
+    ("First Name", [('first_name', False), ('last_name', False)]),
+    ("Last Name", [('last_name', False), ('first_name', False)]),
+    ("Age", [('age', False)]),
+    ("Department", [('department', False)]),
+    ("Department, then Salary (highest first)",
+     [('department', False), ('salary', True)]),
+    ("Salary (highest first)", [('salary', True)]),
+    ("Hire Date", [('hire_date', False)]),
+]
+
+# Report options: the menu label and the fields to group by
+REPORT_OPTIONS = [
+    ("Department", ('department',)),
+    ("Job Position", ('job_position',)),
+    ("Department and Job Position", ('department', 'job_position')),
+    ("All Employees", ()),
+]
+
 
 def load_records():
     """
-    Load records from Google Sheets.
+    Load records from the storage backend.
 
     Returns:
-        list: List of records.
+        TrackedRecords: List of records.
     """
-    records_data = hris.get_all_values()
-    if not records_data:
-        print(red_color + "No records found in the worksheet.")
-        print(reset_style)
-        return []
-
-    fieldnames = [fieldname.lower() for fieldname in records_data[0]]
-    records = [dict(zip(fieldnames, row)) for row in records_data[1:]]
+    # No output here, the records are loaded while the menu is shown,
+    # a failed replay is shown on the status line of the HRIS menu
+    global load_warning
+    records = store.load()
+    try:
+        # Finish a save the last run could not complete
+        recover(store, records, journal)
+    except ConflictError as error:
+        load_warning = f"Journaled changes not saved: {error}"
+    except Exception as error:
+        if not is_backend_error(error):
+            load_warning = (
+                f"Journal {journal.path} could not be replayed: {error}"
+            )
+        # Otherwise the replayed changes stay pending and go with the
+        # next save
+    # Build the search indexes as part of the background load
+    records.add_index('id', EmployeeIdIndex())
+    records.add_index('name', NameIndex())
+    records.add_index('query', QueryEngine())
+    records.add_index('duplicates', DuplicateIndex())
+    records.add_index('report', ReportIndex())
+    # Bring the stored ages up to date, saved with the first save
+    global age_refresher
+    age_refresher = AgeRefresher(records)
+    age_refresher.refresh()
     return records
 
 
-def save_records(records):
+def prefetch_records():
+    """
+    Start loading the records in a background thread.
+    """
+    global records_future
+    executor = ThreadPoolExecutor(max_workers=1)
+    records_future = executor.submit(load_records)
+    # Let the thread finish on its own, nothing else is submitted
+    executor.shutdown(wait=False)
+
+
+def get_records():
     """
-    Save records to Google Sheets.
+    Get the prefetched records, waiting for the load if still running.
+
+    Returns:
+        TrackedRecords: List of records.
+    """
+    if records_future is None:
+        prefetch_records()
+    return records_future.result()
+
+
+def start_sync_queue(records):
+    """
+    Start saving the changes to the records in the background.
+
+    Whatever is still waiting is saved when the program exits.
 
     Args:
-        records (list): List of records.
+        records (TrackedRecords): List of records.
     """
-    # Clear existing data in the worksheet
-    hris.clear()
+    global sync_queue
+    sync_queue = SyncQueue(store, records, journal)
+    sync_queue.start()
+    atexit.register(sync_queue.close, 30)
+    if records.has_changes:
+        # Save the IDs and ages brought up to date while loading
+        sync_queue.changed()
 
-    if len(records) >= 1:
-        # Write the fieldnames as column headers in uppercase
-        fieldnames = list(records[0].keys())
-        capitalized_fieldnames = [
-            fieldname.upper() for fieldname in fieldnames
-        ]
-        hris.insert_row(capitalized_fieldnames, 1)
 
-    # Write the records to the worksheet
-    for record in records:
-        row_values = [record[key] for key in record.keys()]
-        hris.append_row(row_values)
+def records_lock():
+    """
+    Get the lock to hold while reading or changing the records: the
+    background writer's, or none if it is not running. Never hold it
+    while waiting for input.
+
+    Returns:
+        The lock, a context manager.
+    """
+    return sync_queue.lock if sync_queue is not None else nullcontext()
+
 
-    print("\n")  # Add whitespace above the progress update
+def locate_record(records, record):
+    """
+    Find where a record chosen earlier is now, e.g. after the user
+    typed its changes. Call with records_lock() held.
 
-    for i in range(1, 101):
-        print(f"{Fore.LIGHTRED_EX}Saving progress: {i}%", end="\r")
-        time.sleep(0.025)
+    Both lookups are O(1): the record by its ID, then its position.
 
-    print("\n")  # Add whitespace below the progress update
+    Args:
+        records (TrackedRecords): List of records.
+        record (Employee): The record as it was chosen.
 
+    Returns:
+        int: Its position, or None if another user deleted or changed
+        it in the meantime.
+    """
+    current = records.indexes['id'].get(record['employee_id'])
+    if current is None or (
+        current is not record and user_values(current) != user_values(record)
+    ):
+        return None
+    return records.position_of(current)
+
+
+def refresh_ages():
+    """
+    Update the stored ages if the day changed since the last refresh,
+    e.g. when the program was left running overnight. Only employees
+    with a birthday since then are looked at.
+    """
+    if age_refresher is not None and age_refresher.refresh():
+        if sync_queue is not None:
+            sync_queue.changed()
+
+
+def sync_status(_entry=None):
+    """
+    Get the state of the background saves, shown under the HRIS menu,
+    after a warning if the journal could not be replayed on loading.
+
+    Returns:
+        str: The status line.
+    """
+    status = sync_queue.status() if sync_queue is not None else ""
+    return "; ".join(filter(None, (load_warning, status)))
+
+
+def save_records(records):
+    """
+    Save the records changed since the last save to the storage backend.
+
+    Changes another user saved in the meantime are merged, and the
+    records where both changed the same record are listed. The changes
+    are journaled on disk first, so if the backend cannot be reached
+    they are kept and written by the next save or start.
+
+    Args:
+        records (TrackedRecords): List of records.
+
+    With the background writer running, the changes are only queued
+    and the menu carries on at once; the writer saves them shortly.
+
+    Returns:
+        bool: True if the records were saved or queued.
+    """
+    if sync_queue is not None:
+        sync_queue.changed()
+        print_conflicts(sync_queue.take_conflicts())
+        print(Fore.LIGHTGREEN_EX + "\nChanges queued, saving in the "
+              "background.\n")
+        return True
+
+    print("\n")  # Add whitespace above the progress report
+
+    # Write only the changed rows, or everything if the rows were reordered
+    progress = ProgressReporter()
+    try:
+        conflicts = save(store, records, journal, progress)
+    except ConflictError as error:
+        print(red_color + f"\nRecords not saved! {error}")
+        print(reset_style)
+        return False
+    except Exception as error:
+        if journal is None:
+            raise
+        print(
+            Fore.YELLOW +
+            f"\nThe records could not be written ({error}). The changes "
+            "are kept in the local journal and written by the next save "
+            "or start."
+        )
+        print(reset_style)
+        return True
+    progress.finish()
+
+    print_conflicts(conflicts)
     print(
         Fore.LIGHTGREEN_EX +
-        "\nRecords saved to Google Sheets successfully!\n"
+        "\nRecords saved successfully!\n"
+    )
+    return True
+
+
+def print_conflicts(conflicts):
+    """
+    List the changes that were merged with another user's.
+
+    Args:
+        conflicts (list): List of Conflict.
+    """
+    if conflicts:
+        print(Fore.YELLOW + "\nMerged with changes made by another user:")
+        for conflict in conflicts:
+            print(Fore.YELLOW + f"  {conflict}")
+        print(reset_style)
+
+
+def check_duplicates(records, record, previous=None):
+    """
+    Check a new or changed record against the other employees.
+
+    An email address another employee has is asked for again. Another
+    employee with the same name and date of birth is shown, and the
+    user confirms that this is a different person.
+
+    Args:
+        records (list): List of records.
+        record (Employee): The record about to be saved.
+        previous (Employee): The record before the update. Defaults to
+        None, a new record.
+
+    Returns:
+        bool: True to save the record, False to cancel.
+    """
+    index = getattr(records, 'indexes', {}).get('duplicates')
+    if index is None:
+        return True
+    while True:
+        with records_lock():
+            matches = index.matches(record, previous)
+        same_email = [
+            other for code, other in matches if code == DUPLICATE_EMAIL
+        ]
+        if not same_email:
+            break
+        other = same_email[0]
+        print(
+            red_color + MESSAGES[DUPLICATE_EMAIL] +
+            f" ({other['first_name']} {other['last_name']}, "
+            f"{other['employee_id']})"
+        )
+        print(reset_style)
+        record['email'] = get_valid_email(
+            "Enter the employee's email address: "
+        )
+
+    same_person = [
+        other for code, other in matches if code == DUPLICATE_PERSON
+    ]
+    if not same_person:
+        return True
+    print(Fore.YELLOW + MESSAGES[DUPLICATE_PERSON])
+    for other in same_person:
+        print(
+            f"  {other['employee_id']}  {other['first_name']} "
+            f"{other['last_name']}, {other['email']}"
+        )
+    confirm = get_confirmation_input(
+        Fore.YELLOW + "Save this record anyway? (y/n): "
     )
+    print(reset_style)
+    return confirm.lower() == 'y'
 
 
 def add_record(records):
@@ -120,12 +373,8 @@ def add_record(records):
     )
 
     # Calculate age from date of birth
-    current_date = datetime.datetime.now().date()
-    dob = datetime.datetime.strptime(date_of_birth, '%d-%m-%Y').date()
-    age = (
-        current_date.year - dob.year
-        - ((current_date.month, current_date.day) < (dob.month, dob.day))
-    )
+    dob = parse_date(date_of_birth)
+    age = calculate_age(dob)
 
     # Check if the address is valid
     address = input("Enter the employee address: ")
@@ -146,10 +395,7 @@ def add_record(records):
         float, lambda x: x >= 0
     )
     # Calculate the minimum hire date (18 years after the date of birth)
-    min_hire_date = (
-        datetime.datetime.strptime(date_of_birth, "%d-%m-%Y").date() +
-        datetime.timedelta(days=365 * 18)
-    )
+    min_hire_date = dob + datetime.timedelta(days=365 * 18)
 
     # Get the hire date
     hire_date = get_valid_hire_date(
@@ -157,26 +403,49 @@ def add_record(records):
         min_date=min_hire_date
     )
 
-    # Create a record dictionary with the input values
-    record = {
-        'first_name': first_name,
-        'last_name': last_name,
-        'date_of_birth': date_of_birth,
-        'age': age,
-        'address': address,
-        'email': email,
-        'job_position': job_position,
-        'department': department,
-        'salary': salary,
-        'hire_date': hire_date
-    }
+    # Create a typed record with the input values
+    record = Employee(
+        employee_id=new_employee_id(),
+        first_name=first_name,
+        last_name=last_name,
+        date_of_birth=dob,
+        age=age,
+        address=address,
+        email=email,
+        job_position=job_position,
+        department=department,
+        salary=salary,
+        hire_date=hire_date
+    )
+    if not check_duplicates(records, record):
+        clear_screen()
+        print(red_color + "Record not added.")
+        print(reset_style)
+        return
 
     # Clear the terminal screen
-    os.system('cls' if os.name == 'nt' else 'clear')
+    clear_screen()
 
     # Append the record to the list of records and save to file
-    records.append(record)
-    save_records(records)
+    with records_lock():
+        records.append(record)
+    if save_records(records):
+        print(f"Employee ID: {record['employee_id']}\n")
+
+
+def displayed_records(records):
+    """
+    Get the records in the order chosen with Sort Records.
+
+    Args:
+        records (list): List of records.
+
+    Returns:
+        list: The records in display order, storage order if unsorted.
+    """
+    with records_lock():
+        view = getattr(records, 'indexes', {}).get('display')
+        return view.records() if view is not None else list(records)
 
 
 def view_records(records):
@@ -190,7 +459,44 @@ def view_records(records):
         print(red_color + "No records found!")
         print(reset_style)
     else:
-        print_record(records)
+        print_record(displayed_records(records))
+
+
+def choose_record(records, action):
+    """
+    Ask for the record to act on, by employee ID or from the list.
+
+    Args:
+        records (list): List of records, not empty.
+        action (str): What will be done, e.g. "update".
+
+    Returns:
+        The chosen record.
+    """
+    by_id = getattr(records, 'indexes', {}).get('id')
+    while by_id is not None:
+        employee_id = input(
+            f"Enter the employee ID to {action} "
+            "(or press Enter to choose from the list): "
+        ).strip()
+        if not employee_id:
+            break
+        with records_lock():
+            record = by_id.get(employee_id)
+        if record is not None:
+            return record
+        print(red_color + f"No employee with ID {employee_id}.")
+        print(reset_style)
+
+    # Display the existing records, numbered in display order
+    shown_records = displayed_records(records)
+    view_records(shown_records)
+    record_number = get_valid_record_input(
+        f"\nEnter the record number to {action}: ",
+        int,
+        lambda x: 1 <= x <= len(shown_records)
+    )
+    return shown_records[record_number - 1]
 
 
 def update_record(records):
@@ -205,18 +511,12 @@ def update_record(records):
         print(reset_style)
         return
 
-    # Display the existing records
-    view_records(records)
-    record_idx = get_valid_record_input(
-        "\nEnter the record number to update: ",
-        int,
-        lambda x: 1 <= x <= len(records)
-    ) - 1
-
-    # Get the chosen record for updating
-    record = records[record_idx]
-    print(f"\nUpdating record {record_idx + 1}: {record['first_name']} "
-          f"{record['last_name']}")
+    # Get the chosen record for updating. The input goes to a copy, the
+    # records keep changing in the background meanwhile.
+    original = choose_record(records, "update")
+    record = original.copy()
+    print(f"\nUpdating record {record['employee_id']}: "
+          f"{record['first_name']} {record['last_name']}")
 
     # Get updated input for each field of the record
     record['first_name'] = get_valid_name_input(
@@ -233,15 +533,9 @@ def update_record(records):
         "Enter the employee's date of birth (DD-MM-YYYY): ",
         min_age=18
     )
-    date_of_birth = record['date_of_birth']
-    # Calculate age from date of birth
-    current_date = datetime.datetime.now().date()
-    dob = datetime.datetime.strptime(date_of_birth, '%d-%m-%Y').date()
-    age = (
-        current_date.year - dob.year -
-        ((current_date.month, current_date.day) < (dob.month, dob.day))
-    )
-    record['age'] = age
+    # Calculate age from date of birth (already parsed by the record)
+    dob = record['date_of_birth']
+    record['age'] = calculate_age(dob)
 
     # Check if the address is valid
     address = input("Enter the employee address: ")
@@ -270,23 +564,34 @@ def update_record(records):
     )
 
     # Calculate the minimum hire date (18 years after the date of birth)
-    min_hire_date = (
-        datetime.datetime.strptime(date_of_birth, "%d-%m-%Y").date() +
-        datetime.timedelta(days=365 * 18)
-    )
+    min_hire_date = dob + datetime.timedelta(days=365 * 18)
 
     # Get the hire date
     hire_date = get_valid_hire_date(
         "Enter the employee's hire date (DD-MM-YYYY): ",
         min_date=min_hire_date)
     record['hire_date'] = hire_date
+    if not check_duplicates(records, record, original):
+        clear_screen()
+        print(red_color + "Update cancelled.")
+        print(reset_style)
+        return
+    with records_lock():
+        record_idx = locate_record(records, original)
+        if record_idx is not None:
+            records[record_idx] = record
 
     # Clear the terminal screen
-    os.system('cls' if os.name == 'nt' else 'clear')
+    clear_screen()
+    if record_idx is None:
+        print(red_color + "Record not updated, another user changed or "
+              "deleted it meanwhile. Please try again.")
+        print(reset_style)
+        return
 
     # Save the updated records to file
-    save_records(records)
-    print("Record updated successfully!\n")
+    if save_records(records):
+        print("Record updated successfully!\n")
 
 
 def delete_record(records):
@@ -301,18 +606,10 @@ def delete_record(records):
         print(reset_style)
         return
 
-    # Display the existing records
-    view_records(records)
-    record_idx = get_valid_record_input(
-        "\nEnter the record number to delete: ",
-        int,
-        lambda x: 1 <= x <= len(records)
-    ) - 1
-
     # Get the chosen record for deletion
-    record = records[record_idx]
+    record = choose_record(records, "delete")
     print(
-        f"\nDeleting record {record_idx + 1}: "
+        f"\nDeleting record {record['employee_id']}: "
         f"{record['first_name']} {record['last_name']}"
     )
     confirm = get_confirmation_input(
@@ -323,19 +620,26 @@ def delete_record(records):
 
     if confirm.lower() == 'y':
         # Delete the record from the list and save to file
-        del records[record_idx]
+        with records_lock():
+            record_idx = locate_record(records, record)
+            if record_idx is not None:
+                del records[record_idx]
         # Clear the terminal screen
-        os.system('cls' if os.name == 'nt' else 'clear')
+        clear_screen()
+        if record_idx is None:
+            print(red_color + "Record not deleted, another user changed "
+                  "or deleted it meanwhile.")
+            print(reset_style)
+            return
         print(Fore.GREEN + "Record deleted successfully!")
         print(Fore.GREEN + "Saving updated data records")
         save_records(records)
     else:
         # Clear the terminal screen
-        os.system('cls' if os.name == 'nt' else 'clear')
+        clear_screen()
         print(red_color + "Deletion cancelled.")
         print(reset_style)
         print("Return to HRIS!")
-        hris_menu(records)
 
 
 def search_records(records):
@@ -351,12 +655,41 @@ def search_records(records):
         return
     while True:
         search_term = input("Enter the search term(first-/lastname): ")
-        found_records = []
-        for record in records:
-            # Search for records with a matching name
-            if (search_term.lower() in record['first_name'].lower() or
-               search_term.lower() in record['last_name'].lower()):
-                found_records.append(record)
+        # Look up records with a matching name in the name index
+        with records_lock():
+            found_records = records.indexes['name'].search(search_term)
+        if found_records:
+            view_records(found_records)
+            break
+        else:
+            print(red_color + "No matching records found.")
+            print(reset_style)
+
+
+def query_records(records):
+    """
+    Query records in the HRIS with conditions on any field.
+
+    Args:
+        records (list): List of records.
+    """
+    if not records:
+        print(red_color + "No records available to query.")
+        print(reset_style)
+        return
+    print("Combine conditions with 'and', for example:")
+    print("  department=IT and salary>80000 and hire_date<2020")
+    print("  email endswith @corp.com")
+    print("  age between 30 and 40\n")
+    while True:
+        query = input("Enter the query: ")
+        try:
+            with records_lock():
+                found_records = records.indexes['query'].query(query)
+        except QueryError as error:
+            print(red_color + f"Invalid query! {error}")
+            print(reset_style)
+            continue
         if found_records:
             view_records(found_records)
             break
@@ -378,239 +711,372 @@ def sort_records(records):
         return
 
     print("Select a sorting option:")
-    print("1. First Name")
-    print("2. Last Name")
-    print("3. Age")
-    print("4. Department")
+    for number, (label, _) in enumerate(SORT_OPTIONS, start=1):
+        print(f"{number}. {label}")
 
+    valid_choices = [str(number) for number in range(1, len(SORT_OPTIONS) + 1)]
     while True:
-        sort_choice = input("Enter your choice (1-4): ")
+        sort_choice = input(f"Enter your choice (1-{len(SORT_OPTIONS)}): ")
 
-        if sort_choice == '1':
-            # Sort records by first name
-            records.sort(key=lambda x: x['first_name'])
-            break
-        elif sort_choice == '2':
-            # Sort records by last name
-            records.sort(key=lambda x: x['last_name'])
-            break
-        elif sort_choice == '3':
-            # Sort records by age
-            records.sort(key=lambda x: x['age'])
-            break
-        elif sort_choice == '4':
-            # Sort records by department
-            records.sort(key=lambda x: x['department'])
+        if sort_choice in valid_choices:
             break
         else:
             print(red_color + "Invalid sorting choice!")
-            print(red_color + "Enter a number 1-4")
+            print(red_color + f"Enter a number 1-{len(SORT_OPTIONS)}")
             print(Style.RESET_ALL)
 
+    # Keep a sorted view of the records for display. It is updated as
+    # records change and leaves the storage order (and the sheet) alone.
+    sort_fields = SORT_OPTIONS[int(sort_choice) - 1][1]
+    with records_lock():
+        records.add_index('display', SortedView(sort_fields))
+
     # Clear the terminal screen
-    os.system('cls' if os.name == 'nt' else 'clear')
+    clear_screen()
     print(Fore.GREEN + "Records sorted successfully!")
     view_records(records)
-    print(Fore.GREEN + "Saving sorted data records")
-    save_records(records)
 
 
-def main_menu(records):
+def report_records(records):
     """
-    Main menu.
+    Print headcount, salary, age and tenure statistics per group.
 
     Args:
         records (list): List of records.
     """
-    # Clear the terminal screen
-    os.system('cls' if os.name == 'nt' else 'clear')
-    print(Fore.GREEN + "*********************************************")
-    print(Fore.BLUE + "Welcome to Human Resources Information System\n")
-    print(Fore.GREEN + "*********************************************")
-    print(Style.RESET_ALL)
-    print("Welcome to our secure and efficient employee\ndata management "
-          "application.\n")
-    print("Our app is designed specifically to ensure the\nutmost security "
-          "and organization of your\ncompany's valuable employee data. "
-          "With our\npowerful features and intuitive interface, you\ncan "
-          "confidently store andmanage all\nnecessary information with ease."
-          )
-    print("--------------------------------------------------\n")
+    if not records:
+        print(red_color + "No records available to report on.")
+        print(reset_style)
+        return
+
+    print("Group the report by:")
+    for number, (label, _) in enumerate(REPORT_OPTIONS, start=1):
+        print(f"{number}. {label}")
+
+    valid_choices = [
+        str(number) for number in range(1, len(REPORT_OPTIONS) + 1)
+    ]
     while True:
+        report_choice = input(
+            f"Enter your choice (1-{len(REPORT_OPTIONS)}): "
+        )
+        if report_choice in valid_choices:
+            break
+        print(red_color + "Invalid report choice!")
+        print(red_color + f"Enter a number 1-{len(REPORT_OPTIONS)}")
+        print(Style.RESET_ALL)
 
-        # Define menu options
-        options = [
-            "HRIS Menu",
-            "Instructions"
-        ]
+    group_by = REPORT_OPTIONS[int(report_choice) - 1][1]
+    with records_lock():
+        report = group_report(records, group_by)
+    print("\n" + Fore.GREEN + format_report(report, group_by)
+          + Style.RESET_ALL)
 
-        # Create menu object
-        menu = TerminalMenu(options)
-
-        # Display the menu and get user's choice
-        menu_index = menu.show()
-
-        if menu_index == 0:
-            # Clear the terminal screen
-            os.system('cls' if os.name == 'nt' else 'clear')
-            # HRIS Menu
-            hris_menu(records)
-        elif menu_index == 1:
-            # Clear the terminal screen
-            os.system('cls' if os.name == 'nt' else 'clear')
-            # Instructions
-            print(Fore.YELLOW + "Brief Application Instructions:\n")
-            print(Style.RESET_ALL)
-            print(
-                "To utilize this application effectively, "
-                "please follow these steps:\n"
-                "1. Navigation: Use the arrow keys to "
-                "navigate through the menu options.\n"
-                "2. HRIS Menu: Within the HRIS Menu, you will "
-                "find various features to manage employee data efficiently. "
-                "These features include:\n"
-                "\n"
-                "* Adding new employee data: Enter new employee " +
-                "information to store it securely.\n"
-                "* Viewing stored data: Access and review " +
-                "the existing employee data.\n"
-                "* Updating existing data: Modify and update " +
-                "employee records as required.\n"
-                "* Deleting stored data: Remove employee data " +
-                "that is no longer needed.\n"
-                "* Searching the data: Utilize search functionality " +
-                "to locate specific employee information.\n"
-                "* Sorting the data: Arrange employee data based on " +
-                "specific criteria for easier analysis."
-            )
-            print("\n")
-            print(
-                "By following these instructions, you can effectively "
-                "navigate and utilize the features provided by "
-                "the HRIS application.\n"
-            )
-            print(
-                Fore.BLUE +
-                "Navigate to HRIS MENU: Locate and "
-                "select the 'Main MENU' option\n"
-            )
-            # Update options list to show only "HRIS Menu"
-            options = ["Main Menu"]
-            # Create update menu object without Instructions option
-            menu = TerminalMenu(options)
 
-            # Display the updated menu
-            menu_index = menu.show()
+def duplicate_records(records):
+    """
+    List the records that look like the same employee.
 
-            if menu_index == 0:
-                main_menu(records)
+    Args:
+        records (list): List of records.
+    """
+    if not records:
+        print(red_color + "No records available to check.")
+        print(reset_style)
+        return
+    with records_lock():
+        shown_records = list(records)
+    pairs = dedupe_report(shown_records)
+    color = Fore.YELLOW if pairs else Fore.GREEN
+    print(color + format_dedupe_report(shown_records, pairs) + reset_style)
 
 
-def hris_menu(records):
+def import_records(records):
     """
-    Human Resources Information System (HRIS) menu.
+    Import records in bulk from a CSV or XLSX file.
 
     Args:
         records (list): List of records.
     """
-    print(Fore.YELLOW + "=============================")
-    print("      HRIS MENU")
-    print("   Select an Option:")
-    print("=============================" + Fore.RESET)
-
-    # Define menu options
-    options = [
-        "Add Record",
-        "View Records",
-        "Update Record",
-        "Delete Record",
-        "Search Records",
-        "Sort Records",
-        "Exit"
-    ]
+    print("The first row of the file must name the columns, e.g.")
+    print(", ".join(
+        field for field in FIELDNAMES if field not in SYSTEM_FIELDS
+    ) + "\n")
+    path = input("Enter the path of the CSV or XLSX file: ").strip()
+    try:
+        # Checked against the records while they are added, so they
+        # must not change in between; the file is local, no input
+        with records_lock():
+            imported, rejected, reject_path = import_file(path, records)
+    except (OSError, ValueError) as error:
+        print(red_color + f"Import failed! {error}")
+        print(reset_style)
+        return
+
+    if rejected:
+        print(
+            red_color +
+            f"{rejected} row(s) rejected, see {reject_path} for the errors."
+        )
+        print(reset_style)
+    if imported:
+        print(Fore.GREEN + f"{imported} record(s) imported.")
+        save_records(records)
+    else:
+        print(red_color + "No records imported.")
+        print(reset_style)
 
-    # Create menu object
-    menu = TerminalMenu(options)
 
+def export_records(records):
+    """
+    Export records to a CSV, JSON Lines or columnar file.
+
+    Args:
+        records (list): List of records.
+    """
+    print("The format is chosen by the file extension: " +
+          ", ".join(FORMATS) + "\n")
+    path = input("Enter the path of the file to write: ").strip()
+    fields = parse_fields(input(
+        "Enter the fields to export, separated by commas "
+        "(leave empty for all): "
+    ))
+    query = input(
+        "Enter a query to filter the records (leave empty for all): "
+    ).strip()
+    try:
+        exported = export_file(displayed_records(records), path,
+                               fields, query or None)
+    except (OSError, ValueError) as error:
+        print(red_color + f"Export failed! {error}")
+        print(reset_style)
+        return
+    print(Fore.GREEN + f"{exported} record(s) exported to {path}.")
+    print(reset_style)
+
+
+def main_menu(menu):
+    """
+    Main menu.
+
+    Args:
+        menu (TerminalMenu): The main menu, built once by run_menus().
+
+    Returns:
+        str: The next screen.
+    """
+    # Clear the terminal screen and draw the welcome text in one write
+    with redraw():
+        print(Fore.GREEN + "*********************************************")
+        print(Fore.BLUE + "Welcome to Human Resources Information System\n")
+        print(Fore.GREEN + "*********************************************")
+        print(Style.RESET_ALL)
+        print("Welcome to our secure and efficient employee\n"
+              "data management application.\n")
+        print("Our app is designed specifically to ensure the\n"
+              "utmost security and organization of your\n"
+              "company's valuable employee data. With our\n"
+              "powerful features and intuitive interface, you\n"
+              "can confidently store andmanage all\n"
+              "necessary information with ease.")
+        print("--------------------------------------------------\n")
     # Display the menu and get user's choice
     menu_index = menu.show()
 
-    while True:
-        if menu_index == 0:
-            # Clear the terminal screen
-            os.system('cls' if os.name == 'nt' else 'clear')
-            # Add a new record
-            add_record(records)
-
-        elif menu_index == 1:
-            # Clear the terminal screen
-            os.system('cls' if os.name == 'nt' else 'clear')
-            # View all records
-            view_records(records)
-        elif menu_index == 2:
-            # Clear the terminal screen
-            os.system('cls' if os.name == 'nt' else 'clear')
-            # Update a record
-            update_record(records)
-        elif menu_index == 3:
-            # Clear the terminal screen
-            os.system('cls' if os.name == 'nt' else 'clear')
-            # Delete a record
-            delete_record(records)
-        elif menu_index == 4:
-            # Clear the terminal screen
-            os.system('cls' if os.name == 'nt' else 'clear')
-            # Search for records
-            search_records(records)
-        elif menu_index == 5:
-            # Clear the terminal screen
-            os.system('cls' if os.name == 'nt' else 'clear')
-            # Sort records
-            sort_records(records)
-        elif menu_index == 6:
-            # Clear the terminal screen
-            os.system('cls' if os.name == 'nt' else 'clear')
-            main_menu(records)
+    if menu_index == 0:
+        # Clear the terminal screen
+        clear_screen()
+        return HRIS_SCREEN
+    if menu_index == 1:
+        return INSTRUCTIONS_SCREEN
+    return MAIN_SCREEN
 
-        else:
-            print(red_color + "Invalid choice! Please try again.")
-            print(reset_style)
 
-        return_hris_menu(records)
+def instructions(menu):
+    """
+    Show the application instructions.
 
+    Args:
+        menu (TerminalMenu): The menu back to the main menu.
 
-def return_hris_menu(records):
+    Returns:
+        str: The next screen.
     """
-    Return to HRIS Menu.
+    # Instructions, cleared and drawn in one write
+    with redraw():
+        print(Fore.YELLOW + "Brief Application Instructions:\n")
+        print(Style.RESET_ALL)
+        print(
+            "To utilize this application effectively, "
+            "please follow these steps:\n"
+            "1. Navigation: Use the arrow keys to "
+            "navigate through the menu options.\n"
+            "2. HRIS Menu: Within the HRIS Menu, you will "
+            "find various features to manage employee data "
+            "efficiently. These features include:\n"
+            "\n"
+            "* Adding new employee data: Enter new employee " +
+            "information to store it securely.\n"
+            "* Viewing stored data: Access and review " +
+            "the existing employee data.\n"
+            "* Updating existing data: Modify and update " +
+            "employee records as required.\n"
+            "* Deleting stored data: Remove employee data " +
+            "that is no longer needed.\n"
+            "* Searching the data: Utilize search functionality " +
+            "to locate specific employee information.\n"
+            "* Querying the data: Combine conditions on any field, " +
+            "e.g. department=IT and salary>80000.\n"
+            "* Sorting the data: Arrange employee data based on " +
+            "specific criteria for easier analysis.\n"
+            "* Importing data: Add many employees at once from " +
+            "a CSV or XLSX file.\n"
+            "* Exporting data: Write the records, or only some " +
+            "fields and records, to a CSV, JSONL or .hcol file.\n"
+            "* Reports: Headcount, salary, age and tenure " +
+            "statistics by department and/or job position."
+        )
+        print("\n")
+        print(
+            "By following these instructions, you can effectively "
+            "navigate and utilize the features provided by "
+            "the HRIS application.\n"
+        )
+        print(
+            Fore.BLUE +
+            "Navigate to HRIS MENU: Locate and "
+            "select the 'Main MENU' option\n"
+        )
+    # Display the menu with only the "Main Menu" option
+    menu.show()
+    return MAIN_SCREEN
+
+
+def hris_menu(records, menu):
+    """
+    Human Resources Information System (HRIS) menu.
+
+    Runs the chosen action and returns, so the caller's loop decides
+    what is shown next and the call stack does not grow.
 
     Args:
         records (list): List of records.
+        menu (TerminalMenu): The HRIS menu, built once by run_menus().
+
+    Returns:
+        str: The next screen.
     """
+    with redraw(clear=False):
+        print(Fore.YELLOW + "=============================")
+        print("      HRIS MENU")
+        print("   Select an Option:")
+        print("=============================" + Fore.RESET)
 
-    while True:
-        # Define menu options
-        options = [
-            "Return to HRIS Menu",
-        ]
+    # Display the menu and get user's choice
+    menu_index = menu.show()
 
-        # Create menu object
-        menu = TerminalMenu(options)
+    if menu_index == len(HRIS_ACTIONS):
+        # Exit: back to the main menu
+        clear_screen()
+        return MAIN_SCREEN
+    if menu_index is None:
+        print(red_color + "Invalid choice! Please try again.")
+        print(reset_style)
+        return RETURN_SCREEN
 
-        # Display the menu and get user's choice
-        menu_index = menu.show()
+    # Clear the terminal screen
+    clear_screen()
+    if sync_queue is not None:
+        print_conflicts(sync_queue.take_conflicts())
+    with records_lock():
+        refresh_ages()
+    # Run the chosen action, e.g. add_record(records). It holds the
+    # lock only while it reads or changes the records, so a background
+    # save can go on while it waits for input.
+    HRIS_ACTIONS[menu_index][1](records)
+    return RETURN_SCREEN
+
+
+def return_hris_menu(menu):
+    """
+    Return to HRIS Menu.
 
-        if menu_index == 0:
-            # Clear the terminal screen
-            os.system('cls' if os.name == 'nt' else 'clear')
-            # Go back to HRIS menu
-            hris_menu(records)
+    Args:
+        menu (TerminalMenu): The menu with the "Return to HRIS Menu"
+        option.
+
+    Returns:
+        str: The next screen.
+    """
+    # Display the menu until the user chooses to go back
+    while menu.show() != 0:
+        pass
+    # Clear the terminal screen
+    clear_screen()
+    return HRIS_SCREEN
 
 
-# Load records from file
-records = load_records()
+def run_menus():
+    """
+    Run the menus until the program is stopped.
 
-# Clear the terminal screen
-os.system('cls' if os.name == 'nt' else 'clear')
+    Each screen function shows its screen and returns the name of the
+    next one, and this loop calls it. Navigating therefore never nests
+    calls, and each menu is built once and shown again as needed.
+    """
+    menus = {
+        MAIN_SCREEN: TerminalMenu(["HRIS Menu", "Instructions"]),
+        INSTRUCTIONS_SCREEN: TerminalMenu(["Main Menu"]),
+        HRIS_SCREEN: TerminalMenu(
+            [label for label, _ in HRIS_ACTIONS] + ["Exit"],
+            status_bar=sync_status
+        ),
+        RETURN_SCREEN: TerminalMenu(["Return to HRIS Menu"]),
+    }
+    records = None
+    screen = MAIN_SCREEN
+    while True:
+        if screen == MAIN_SCREEN:
+            screen = main_menu(menus[MAIN_SCREEN])
+        elif screen == INSTRUCTIONS_SCREEN:
+            screen = instructions(menus[INSTRUCTIONS_SCREEN])
+        elif screen == HRIS_SCREEN:
+            # Wait for the prefetched records on the first visit
+            if records is None:
+                records = get_records()
+                start_sync_queue(records)
+            screen = hris_menu(records, menus[HRIS_SCREEN])
+        else:
+            screen = return_hris_menu(menus[RETURN_SCREEN])
+
+
+# HRIS menu options: the menu label and the action run with the records
+HRIS_ACTIONS = [
+    ("Add Record", add_record),
+    ("View Records", view_records),
+    ("Update Record", update_record),
+    ("Delete Record", delete_record),
+    ("Search Records", search_records),
+    ("Query Records", query_records),
+    ("Sort Records", sort_records),
+    ("Import Records", import_records),
+    ("Export Records", export_records),
+    ("Reports", report_records),
+    ("Find Duplicates", duplicate_records),
+]
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        # Arguments run one headless command instead of the menus
+        from cli import main as run_command
+        sys.exit(run_command(sys.argv[1:], store))
+
+    # Load records in the background while the main menu is shown
+    prefetch_records()
+
+    # Clear the terminal screen
+    clear_screen()
 
-# Run the HRIS
-main_menu(records)
+    # Run the HRIS
+    run_menus()
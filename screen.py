@@ -0,0 +1,66 @@
+import io  # Import io module to collect output in memory
+import sys  # Import sys module to write to the terminal
+from contextlib import contextmanager, redirect_stdout  # Buffered output
+from colorama import just_fix_windows_console  # ANSI codes on Windows
+
+# Move the cursor home, clear the screen and the scrollback buffer
+CLEAR_SCREEN = "\033[H\033[2J\033[3J"
+
+# Let the Windows console understand ANSI codes, a no-op elsewhere
+just_fix_windows_console()
+
+
+def is_terminal(stream=None):
+    """
+    Check whether output goes to a terminal.
+
+    Args:
+        stream: The output stream. Defaults to None, sys.stdout.
+
+    Returns:
+        bool: True if the stream is a terminal.
+    """
+    stream = stream or sys.stdout
+    isatty = getattr(stream, 'isatty', None)
+    return bool(isatty and isatty())
+
+
+def clear_screen(stream=None):
+    """
+    Clear the terminal with ANSI codes, without starting a process.
+
+    Nothing is written when the output is not a terminal, e.g. a pipe
+    or a log file.
+
+    Args:
+        stream: The output stream. Defaults to None, sys.stdout.
+    """
+    stream = stream or sys.stdout
+    if is_terminal(stream):
+        stream.write(CLEAR_SCREEN)
+        stream.flush()
+
+
+@contextmanager
+def redraw(clear=True):
+    """
+    Collect everything printed in the block and write it in one go.
+
+    The screen is cleared and redrawn with a single write, so it does
+    not flicker line by line. Do not prompt for input in the block, the
+    prompt would be held back with the rest of the output.
+
+    Args:
+        clear (bool): Clear the screen first. Defaults to True.
+    """
+    stream = sys.stdout
+    buffer = io.StringIO()
+    try:
+        with redirect_stdout(buffer):
+            yield
+    finally:
+        text = buffer.getvalue()
+        if clear and is_terminal(stream):
+            text = CLEAR_SCREEN + text
+        stream.write(text)
+        stream.flush()
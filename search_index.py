@@ -0,0 +1,282 @@
+from bisect import bisect_left, insort  # Binary search in sorted lists
+
+# Longest n-gram indexed; longer search terms intersect their n-grams
+NGRAM_SIZE = 3
+
+
+def _ngrams(text, size):
+    """
+    Get the set of substrings of a given length.
+
+    Args:
+        text (str): The text to split.
+        size (int): Length of each substring.
+
+    Returns:
+        set: The substrings.
+    """
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+
+def _all_ngrams(text):
+    """
+    Get every substring of the text up to NGRAM_SIZE characters long.
+    """
+    grams = set()
+    for size in range(1, NGRAM_SIZE + 1):
+        grams |= _ngrams(text, size)
+    return grams
+
+
+class NameIndex:
+    """
+    Search index over the first and last names of the records.
+
+    Names are lowercased once when a record is indexed. Every substring of
+    up to NGRAM_SIZE characters maps to the records containing it, so a
+    short search term is a single lookup and a longer one intersects the
+    postings of its n-grams. A sorted list of names answers prefix
+    lookups by binary search.
+
+    Records are dicts and not hashable, so they are tracked by id().
+    """
+
+    fields = ('first_name', 'last_name')
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """
+        Remove every record from the index.
+        """
+        self._records = {}
+        self._keys = {}
+        self._order = {}
+        self._next_order = 0
+        self._postings = {}
+        self._sorted_names = []
+
+    def rebuild(self, records):
+        """
+        Index a list of records from scratch.
+
+        Args:
+            records (list): List of records.
+        """
+        self.clear()
+        sorted_names = []
+        for record in records:
+            sorted_names.extend(self._index(record))
+        # One sort for the initial build, binary inserts after that
+        sorted_names.sort()
+        self._sorted_names = sorted_names
+
+    def _index(self, record):
+        """
+        Index a record in everything but the sorted names.
+
+        Returns:
+            list: The (name, record id) entries of the sorted names.
+        """
+        record_id = id(record)
+        keys = tuple(str(record[field]).lower() for field in self.fields)
+        self._records[record_id] = record
+        self._keys[record_id] = keys
+        self._order[record_id] = self._next_order
+        self._next_order += 1
+        for key in keys:
+            for gram in _all_ngrams(key):
+                self._postings.setdefault(gram, set()).add(record_id)
+        return [(key, record_id) for key in keys]
+
+    def add(self, record):
+        """
+        Index a record.
+
+        Args:
+            record (dict): The record to index.
+        """
+        for entry in self._index(record):
+            insort(self._sorted_names, entry)
+
+    def remove(self, record):
+        """
+        Remove a record from the index, using the keys it was indexed by.
+
+        Args:
+            record (dict): The record to remove.
+        """
+        record_id = id(record)
+        keys = self._keys.pop(record_id, None)
+        if keys is None:
+            return
+        del self._records[record_id]
+        del self._order[record_id]
+        # Both names can share n-grams, each posting is left once
+        grams = set()
+        for key in keys:
+            position = bisect_left(self._sorted_names, (key, record_id))
+            del self._sorted_names[position]
+            grams.update(_all_ngrams(key))
+        for gram in grams:
+            posting = self._postings[gram]
+            posting.discard(record_id)
+            if not posting:
+                del self._postings[gram]
+
+    def update(self, record):
+        """
+        Re-index a record after its fields changed in place.
+
+        Args:
+            record (dict): The changed record.
+        """
+        order = self._order.get(id(record))
+        self.remove(record)
+        self.add(record)
+        if order is not None:
+            # Keep the record's place in the result order
+            self._order[id(record)] = order
+
+    def _results(self, record_ids):
+        """
+        Turn record ids into records, in the order they were indexed.
+        """
+        return [
+            self._records[record_id]
+            for record_id in sorted(record_ids, key=self._order.get)
+        ]
+
+    def search(self, term):
+        """
+        Find the records whose first or last name contains a term.
+
+        Args:
+            term (str): The search term, case-insensitive.
+
+        Returns:
+            list: List of matching records.
+        """
+        term = term.lower()
+        if not term:
+            return self._results(self._records)
+        if len(term) <= NGRAM_SIZE:
+            return self._results(self._postings.get(term, ()))
+
+        # Intersect the postings of the term's n-grams, smallest first
+        postings = sorted(
+            (self._postings.get(gram, set())
+             for gram in _ngrams(term, NGRAM_SIZE)),
+            key=len
+        )
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates:
+                break
+
+        # The n-grams can all match without the whole term matching
+        return self._results(
+            record_id for record_id in candidates
+            if any(term in key for key in self._keys[record_id])
+        )
+
+    def prefix(self, term):
+        """
+        Find the records whose first or last name starts with a term.
+
+        Args:
+            term (str): The prefix, case-insensitive.
+
+        Returns:
+            list: List of matching records.
+        """
+        term = term.lower()
+        matches = set()
+        position = bisect_left(self._sorted_names, (term,))
+        while position < len(self._sorted_names):
+            name, record_id = self._sorted_names[position]
+            if not name.startswith(term):
+                break
+            matches.add(record_id)
+            position += 1
+        return self._results(matches)
+
+
+class EmployeeIdIndex:
+    """
+    Primary-key index mapping each employee ID to its record.
+
+    IDs never change, so a lookup by ID is one dict access instead of
+    a scan of the list.
+    """
+
+    fields = ('employee_id',)
+
+    def __init__(self):
+        self.clear()
+
+    def clear(self):
+        """
+        Remove every record from the index.
+        """
+        self._records = {}
+        self._keys = {}
+
+    def rebuild(self, records):
+        """
+        Index a list of records from scratch.
+
+        Args:
+            records (list): List of records.
+        """
+        self.clear()
+        for record in records:
+            self.add(record)
+
+    def add(self, record):
+        """
+        Index a record. Records without an ID yet are skipped.
+
+        Args:
+            record (dict): The record to index.
+        """
+        key = record['employee_id']
+        if key:
+            self._records[key] = record
+            self._keys[id(record)] = key
+
+    def remove(self, record):
+        """
+        Remove a record from the index, using the ID it was indexed by.
+
+        Args:
+            record (dict): The record to remove.
+        """
+        key = self._keys.pop(id(record), None)
+        if key is not None and self._records.get(key) is record:
+            del self._records[key]
+
+    def update(self, record):
+        """
+        Re-index a record after its fields changed in place, e.g. when
+        it was given an ID.
+
+        Args:
+            record (dict): The changed record.
+        """
+        self.remove(record)
+        self.add(record)
+
+    def get(self, employee_id):
+        """
+        Find the record with an employee ID.
+
+        Args:
+            employee_id (str): The ID, case-insensitive.
+
+        Returns:
+            The record, or None if no record has the ID.
+        """
+        return self._records.get(employee_id.strip().upper())
@@ -0,0 +1,552 @@
+import re  # Library for regular expressions, used to route requests
+import json  # Import json module for request and response bodies
+import asyncio  # Import asyncio module for the HTTP server
+import traceback  # Import traceback module to log failed requests
+from http import HTTPStatus  # Standard HTTP status codes and phrases
+from urllib.parse import urlsplit, parse_qs  # Split request targets
+from employee import FIELDNAMES, SYSTEM_FIELDS, new_employee_id
+from cli import INPUT_FIELDS, record_data
+from birthdays import AgeRefresher
+from conflicts import ConflictError
+from duplicates import DuplicateIndex
+from journal import recover, save
+from query_engine import QueryEngine, QueryError
+from reports import ReportIndex, group_report
+from search_index import EmployeeIdIndex, NameIndex
+from sync_queue import is_backend_error
+from validators import RecordValidator, format_errors
+
+# Largest request body accepted, in bytes
+MAX_BODY_SIZE = 1024 * 1024
+# Records returned by GET /records when no limit is given
+DEFAULT_LIMIT = 100
+
+
+class HTTPError(Exception):
+    """
+    Raised by a request handler to answer with an error status.
+
+    Args:
+        status (HTTPStatus): The response status.
+        message (str): What went wrong.
+        errors (list): List of (field, error code) tuples, if any.
+    """
+
+    def __init__(self, status, message, errors=None):
+        super().__init__(message)
+        self.status = status
+        self.errors = errors or []
+
+
+class HRISService:
+    """
+    Long-running HTTP/JSON API over the records of a store.
+
+    The records and their search indexes are loaded once and kept in
+    memory, so reads never touch the backend. Changes are applied in
+    memory and then written with store.sync() in a worker thread, one
+    write at a time. Records are numbered from 1 in storage order and
+    can also be addressed by employee ID, e.g. /records/E1A2B3C4D5E6.
+
+    Args:
+        store (RecordStore): The backend, e.g. open_store() or a
+        SQLiteRecordStore(':memory:') in tests.
+        journal (Journal): Write-ahead journal of the saves. Defaults
+        to None, no journal.
+    """
+
+    def __init__(self, store, journal=None):
+        self.store = store
+        self.journal = journal
+        self.records = None
+        self.age_refresher = None
+        self._write_lock = asyncio.Lock()
+        self.routes = [
+            ('GET', re.compile(r'/health'), self.health),
+            ('GET', re.compile(r'/records'), self.list_records),
+            ('POST', re.compile(r'/records'), self.add_record),
+            ('GET', re.compile(r'/records/(\w+)'), self.get_record),
+            ('PUT', re.compile(r'/records/(\w+)'), self.update_record),
+            ('PATCH', re.compile(r'/records/(\w+)'), self.update_record),
+            ('DELETE', re.compile(r'/records/(\w+)'), self.delete_record),
+            ('GET', re.compile(r'/search'), self.search),
+            ('GET', re.compile(r'/query'), self.query),
+            ('GET', re.compile(r'/reports'), self.report),
+        ]
+
+    async def load(self, recover_journal=True):
+        """
+        Load the records and build the indexes, in a worker thread.
+
+        Args:
+            recover_journal (bool): Finish a save the last run could
+            not complete. Defaults to True.
+        """
+        loop = asyncio.get_running_loop()
+        records = await loop.run_in_executor(None, self.store.load)
+        if recover_journal:
+            await loop.run_in_executor(
+                None, recover, self.store, records, self.journal
+            )
+        records.add_index('id', EmployeeIdIndex())
+        records.add_index('name', NameIndex())
+        records.add_index('query', QueryEngine())
+        records.add_index('duplicates', DuplicateIndex())
+        records.add_index('report', ReportIndex())
+        self.age_refresher = AgeRefresher(records)
+        self.records = records
+
+    async def refresh_ages(self):
+        """
+        Update and save the stored ages that changed since the last
+        refresh. After the first run only the employees with a birthday
+        since then are looked at.
+
+        Returns:
+            int: Number of records updated.
+        """
+        async with self._write_lock:
+            count = self.age_refresher.refresh()
+            if count:
+                try:
+                    await self._save()
+                except HTTPError:
+                    # Refused and reloaded, the next refresh checks every
+                    # record again
+                    pass
+        return count
+
+    async def _refresh_daily(self):
+        """
+        Run refresh_ages() after every midnight, until cancelled.
+        """
+        while True:
+            await asyncio.sleep(self.age_refresher.seconds_to_next_run() + 1)
+            await self.refresh_ages()
+
+    async def _save(self):
+        """
+        Write the pending changes to the store, in a worker thread.
+
+        If the store refuses them, with ConflictError or any error that
+        does not come from the backend or the network, the records are
+        reloaded, so the refused change does not make every later write
+        fail too.
+
+        Returns:
+            bool: True if the changes were written, False if the
+            backend could not be reached. They then stay pending, and
+            in the journal if there is one, and go with the next write.
+
+        Raises:
+            HTTPError: 409 if the store refused the changes.
+            Exception: Any other error but a backend one, once the
+            records are reloaded.
+        """
+        loop = asyncio.get_running_loop()
+        try:
+            await loop.run_in_executor(
+                None, save, self.store, self.records, self.journal
+            )
+        except ConflictError as error:
+            # The journal marked the save done, it is not replayed
+            await self.load(recover_journal=False)
+            raise HTTPError(
+                HTTPStatus.CONFLICT,
+                f"Save failed! {error}; the records were reloaded"
+            )
+        except Exception as error:
+            if is_backend_error(error):
+                return False
+            await self.load(recover_journal=False)
+            raise
+        return True
+
+    @staticmethod
+    def _response(saved, status, data):
+        """
+        Answer a change with status once saved, or with 202 and
+        "pending": true while it waits for the next write. A client
+        must not repeat a pending change, it is kept.
+        """
+        if saved:
+            return status, data
+        return HTTPStatus.ACCEPTED, dict(data, pending=True)
+
+    def _position(self, key):
+        """
+        Get the list position of a 1-based record number or of an
+        employee ID.
+        """
+        if not key.isdigit():
+            record = self.records.indexes['id'].get(key)
+            if record is None:
+                raise HTTPError(
+                    HTTPStatus.NOT_FOUND, f"Employee {key} not found"
+                )
+            return self.records.position_of(record)
+        number = int(key)
+        if not 1 <= number <= len(self.records):
+            raise HTTPError(
+                HTTPStatus.NOT_FOUND, f"Record {number} not found"
+            )
+        return number - 1
+
+    def _numbered(self, found_records):
+        """
+        Get found records as data with their record numbers.
+        """
+        return [
+            record_data(record, self.records.position_of(record) + 1)
+            for record in found_records
+        ]
+
+    @staticmethod
+    def _validate(values):
+        """
+        Validate raw field values, raising a 422 error with the errors.
+        """
+        record, errors = RecordValidator().validate(values)
+        if errors:
+            raise HTTPError(
+                HTTPStatus.UNPROCESSABLE_ENTITY, "Invalid record", errors
+            )
+        return record
+
+    def _check_duplicates(self, record, params, current=None):
+        """
+        Raise a 409 error if a record repeats the email, or the name and
+        date of birth, of another record. "allow_duplicate=true" in the
+        query string accepts the same name and date of birth. Only the
+        keys an update changes are checked against current.
+        """
+        allow_person = params.get('allow_duplicate', '').lower() in (
+            'true', '1', 'yes'
+        )
+        errors = self.records.indexes['duplicates'].check(
+            record, allow_person, current
+        )
+        if errors:
+            raise HTTPError(HTTPStatus.CONFLICT, "Duplicate record", errors)
+
+    @staticmethod
+    def _fields(body):
+        """
+        Get the settable fields of a JSON request body.
+        """
+        if not isinstance(body, dict):
+            raise HTTPError(
+                HTTPStatus.BAD_REQUEST, "Expected a JSON object"
+            )
+        body = {
+            field: value for field, value in body.items()
+            if field not in SYSTEM_FIELDS
+        }
+        unknown = [field for field in body if field not in INPUT_FIELDS]
+        if unknown:
+            raise HTTPError(
+                HTTPStatus.BAD_REQUEST,
+                f"Unknown fields: {', '.join(unknown)}"
+            )
+        return {field: str(value) for field, value in body.items()}
+
+    async def health(self, params, body):
+        """
+        GET /health: the service is up and how many records it holds.
+        """
+        return HTTPStatus.OK, {'records': len(self.records)}
+
+    async def list_records(self, params, body):
+        """
+        GET /records?offset=0&limit=100: a page of records.
+        """
+        try:
+            offset = int(params.get('offset', 0))
+            limit = int(params.get('limit', DEFAULT_LIMIT))
+        except ValueError:
+            raise HTTPError(
+                HTTPStatus.BAD_REQUEST, "offset and limit must be numbers"
+            )
+        offset = max(offset, 0)
+        page = self.records[offset:offset + max(limit, 0)]
+        return HTTPStatus.OK, {
+            'total': len(self.records),
+            'records': [
+                record_data(record, number)
+                for number, record in enumerate(page, start=offset + 1)
+            ],
+        }
+
+    async def get_record(self, params, body, key):
+        """
+        GET /records/<number or ID>: one record.
+        """
+        position = self._position(key)
+        return HTTPStatus.OK, record_data(
+            self.records[position], position + 1
+        )
+
+    async def add_record(self, params, body):
+        """
+        POST /records: add a record from a JSON object of all fields.
+
+        A record repeating another's email, or name and date of birth,
+        fails with 409; add "?allow_duplicate=true" to accept the same
+        name and date of birth. If the backend cannot be reached the
+        record is kept and the answer is 202 instead of 201.
+        """
+        values = self._fields(body)
+        missing = [field for field in INPUT_FIELDS if field not in values]
+        if missing:
+            raise HTTPError(
+                HTTPStatus.BAD_REQUEST,
+                f"Missing fields: {', '.join(missing)}"
+            )
+        record = self._validate(values)
+        record['employee_id'] = new_employee_id()
+        async with self._write_lock:
+            self._check_duplicates(record, params)
+            self.records.append(record)
+            number = len(self.records)
+            saved = await self._save()
+        return self._response(
+            saved, HTTPStatus.CREATED, record_data(record, number)
+        )
+
+    async def update_record(self, params, body, key):
+        """
+        PUT or PATCH /records/<number or ID>: change the given fields.
+
+        A "version" in the body makes the update conditional: it fails
+        with 409 if the record is no longer at that version.
+        """
+        changes = self._fields(body)
+        async with self._write_lock:
+            position = self._position(key)
+            current = self.records[position]
+            current_version = current['version']
+            if 'version' in body and str(body['version']) != str(
+                current_version
+            ):
+                raise HTTPError(
+                    HTTPStatus.CONFLICT,
+                    f"Record {key} is at version {current_version}"
+                )
+            values = {
+                field: str(value) for field, value in
+                zip(FIELDNAMES, current.to_row())
+            }
+            values.update(changes)
+            record = self._validate(values)
+            # The ID stays with the employee
+            record['employee_id'] = current['employee_id']
+            self._check_duplicates(record, params, current)
+            self.records[position] = record
+            saved = await self._save()
+        return self._response(
+            saved, HTTPStatus.OK, record_data(record, position + 1)
+        )
+
+    async def delete_record(self, params, body, key):
+        """
+        DELETE /records/<number or ID>: delete a record.
+        """
+        async with self._write_lock:
+            position = self._position(key)
+            record = self.records[position]
+            del self.records[position]
+            saved = await self._save()
+        return self._response(
+            saved, HTTPStatus.OK, record_data(record, position + 1)
+        )
+
+    async def search(self, params, body):
+        """
+        GET /search?term=...: records whose name contains the term.
+        """
+        term = params.get('term', '')
+        if not term:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "term is required")
+        found_records = self.records.indexes['name'].search(term)
+        return HTTPStatus.OK, self._numbered(found_records)
+
+    async def query(self, params, body):
+        """
+        GET /query?q=...: records matching a query.
+        """
+        try:
+            found_records = self.records.indexes['query'].query(
+                params.get('q', '')
+            )
+        except QueryError as error:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Invalid query! {error}")
+        return HTTPStatus.OK, self._numbered(found_records)
+
+    async def report(self, params, body):
+        """
+        GET /reports?by=department,job_position: group statistics.
+        """
+        group_by = tuple(
+            field.strip().lower()
+            for field in params.get('by', 'department').split(',')
+            if field.strip()
+        )
+        try:
+            report = group_report(self.records, group_by)
+        except ValueError as error:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(error))
+        return HTTPStatus.OK, [
+            dict(row, group=list(row['group'])) for row in report
+        ]
+
+    async def dispatch(self, method, target, body):
+        """
+        Route a request to its handler.
+
+        Args:
+            method (str): The HTTP method.
+            target (str): The request target, path and query string.
+            body (bytes): The request body.
+
+        Returns:
+            tuple: (HTTPStatus, JSON-ready response data). An error the
+            handler did not expect is logged and answered with 500.
+        """
+        url = urlsplit(target)
+        params = {
+            name: values[-1]
+            for name, values in parse_qs(url.query).items()
+        }
+        path = url.path.rstrip('/') or '/'
+        allowed = False
+        for route_method, pattern, handler in self.routes:
+            match = pattern.fullmatch(path)
+            if not match:
+                continue
+            allowed = True
+            if route_method != method:
+                continue
+            try:
+                data = json.loads(body) if body else None
+            except ValueError:
+                return HTTPStatus.BAD_REQUEST, {'error': "Invalid JSON"}
+            try:
+                return await handler(params, data, *match.groups())
+            except HTTPError as error:
+                return error.status, {
+                    'error': str(error),
+                    'errors': [
+                        {'field': field, 'code': code, 'message': message}
+                        for (field, code), message in
+                        zip(error.errors, format_errors(error.errors))
+                    ],
+                }
+            except Exception:
+                traceback.print_exc()
+                return HTTPStatus.INTERNAL_SERVER_ERROR, {
+                    'error': "Internal server error"
+                }
+        if allowed:
+            return HTTPStatus.METHOD_NOT_ALLOWED, {'error': "Not allowed"}
+        return HTTPStatus.NOT_FOUND, {'error': "Not found"}
+
+    async def handle_connection(self, reader, writer):
+        """
+        Serve the HTTP/1.1 requests of one connection, keeping it open
+        between requests unless the client asks to close it.
+        """
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+                method, target, version = \
+                    request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0))
+                if length > MAX_BODY_SIZE:
+                    status, data = HTTPStatus.REQUEST_ENTITY_TOO_LARGE, {
+                        'error': "Request body too large"
+                    }
+                    keep_alive = False
+                else:
+                    body = await reader.readexactly(length)
+                    status, data = await self.dispatch(method, target, body)
+                    keep_alive = (
+                        version == 'HTTP/1.1'
+                        and headers.get('connection', '').lower() != 'close'
+                    )
+
+                payload = json.dumps(data).encode('utf-8')
+                writer.write(
+                    f"HTTP/1.1 {status.value} {status.phrase}\r\n"
+                    f"Content-Type: application/json\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}"
+                    f"\r\n\r\n".encode('latin-1') + payload
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            # A broken or malformed request ends the connection
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, host='127.0.0.1', port=8080):
+        """
+        Load the records and serve requests until cancelled.
+
+        Args:
+            host (str): The address to listen on. Defaults to localhost.
+            port (int): The port to listen on. Defaults to 8080.
+        """
+        await self.load()
+        await self.refresh_ages()
+        refresher = asyncio.create_task(self._refresh_daily())
+        server = await asyncio.start_server(
+            self.handle_connection, host, port
+        )
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            refresher.cancel()
+
+
+def main():
+    """
+    Run the service from the command line.
+    """
+    import os  # Imported here, only the command line reads the port
+    import argparse  # Imported here, only the command line needs it
+    from journal import open_journal
+    from record_store import open_store
+
+    parser = argparse.ArgumentParser(
+        description="Serve the HRIS records as an HTTP/JSON API."
+    )
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument(
+        '--port', type=int, default=int(os.environ.get('PORT', 8080))
+    )
+    args = parser.parse_args()
+
+    service = HRISService(open_store(), open_journal())
+    print(f"Serving HRIS records on http://{args.host}:{args.port}")
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
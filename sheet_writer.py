@@ -0,0 +1,122 @@
+from gspread.utils import rowcol_to_a1  # Convert row/column to A1 notation
+from employee import FIELDNAMES
+
+
+def build_values(records):
+    """
+    Build the header and body rows written to the worksheet.
+
+    Args:
+        records (list): List of Employee records.
+
+    Returns:
+        list: List of rows, the first row being the uppercase header.
+    """
+    values = [[fieldname.upper() for fieldname in FIELDNAMES]]
+    values.extend(record.to_row() for record in records)
+    return values
+
+
+def write_records(worksheet, records, progress=None):
+    """
+    Write all records to a worksheet in a single range write.
+
+    The worksheet is resized to exactly the size of the data first, which
+    both makes room for new rows and trims rows left over from a previous,
+    longer save. Nothing is cleared, so the sheet is never left empty.
+
+    Args:
+        worksheet (gspread.Worksheet): The worksheet to write to.
+        records (list): List of records.
+        progress (ProgressReporter): Reporter told about each request.
+        Defaults to None.
+
+    Returns:
+        int: Number of rows written, including the header.
+    """
+    values = build_values(records)
+
+    # Grow or trim the grid to the data (no API call if already sized)
+    if worksheet.row_count != len(values):
+        worksheet.resize(rows=len(values))
+
+    # Send the header and every record in one request
+    last_cell = rowcol_to_a1(len(values), len(values[0]))
+    worksheet.update(f"A1:{last_cell}", values)
+    if progress is not None:
+        progress.batch("Wrote", len(values), values)
+    return len(values)
+
+
+def _contiguous_runs(indices):
+    """
+    Group sorted indices into runs of consecutive values.
+
+    Args:
+        indices (list): Sorted list of integers.
+
+    Returns:
+        list: List of (first, last) tuples, inclusive.
+    """
+    runs = []
+    for index in indices:
+        if runs and runs[-1][1] == index - 1:
+            runs[-1] = (runs[-1][0], index)
+        else:
+            runs.append((index, index))
+    return runs
+
+
+def write_changes(worksheet, records, progress=None):
+    """
+    Write only the rows that changed since the last sync.
+
+    Deleted rows are removed bottom-up so the row numbers above them stay
+    valid, updated rows are sent together in one batch update and new
+    records are appended in one request. Falls back to a full rewrite if
+    the rows were reordered or none of the synced rows are left.
+
+    Args:
+        worksheet (gspread.Worksheet): The worksheet to write to.
+        records (TrackedRecords): Records with their pending changes.
+        progress (ProgressReporter): Reporter told about each request.
+        Defaults to None.
+
+    Returns:
+        int: Number of rows written or deleted.
+    """
+    if records.reordered or records.synced_count == 0:
+        return write_records(worksheet, records, progress)
+
+    # Sheet row = origin index + 2 (1-based rows and a header row)
+    for first, last in reversed(_contiguous_runs(sorted(records.deleted))):
+        worksheet.delete_rows(first + 2, last + 2)
+        if progress is not None:
+            progress.batch("Deleted", last - first + 1)
+
+    updates = []
+    for origin in sorted(records.dirty):
+        index = records.current_index(origin)
+        row = records[index].to_row()
+        first_cell = rowcol_to_a1(index + 2, 1)
+        last_cell = rowcol_to_a1(index + 2, len(row))
+        updates.append({
+            'range': f"{first_cell}:{last_cell}",
+            'values': [row],
+        })
+    if updates:
+        worksheet.batch_update(updates)
+        if progress is not None:
+            progress.batch(
+                "Updated", len(updates), [u['values'][0] for u in updates]
+            )
+
+    new_rows = [
+        records[index].to_row() for index in records.inserted_indices()
+    ]
+    if new_rows:
+        worksheet.append_rows(new_rows)
+        if progress is not None:
+            progress.batch("Appended", len(new_rows), new_rows)
+
+    return len(records.deleted) + len(updates) + len(new_rows)
@@ -0,0 +1,453 @@
+import threading  # Import threading module to guard the connection
+from itertools import zip_longest  # Pad the shorter downloaded columns
+import gspread  # Import gspread library for accessing Google Sheets
+from google.oauth2.service_account import Credentials  # Import Credentials
+from gspread.urls import DRIVE_FILES_API_V3_URL  # Drive files endpoint
+from gspread.utils import rowcol_to_a1  # Convert row/column to A1 notation
+from conflicts import (
+    MAX_ATTEMPTS,
+    STALE_VERSION,
+    Conflict,
+    ConflictError,
+    advance_snapshot,
+    prepare_insert,
+    prepare_update,
+    rebase_changes,
+    same_values,
+    snapshot,
+    stamp_changes,
+)
+from duplicates import DuplicateIndex, email_key, person_key
+from employee import FIELDNAMES, Employee, new_employee_id, parse_field
+from record_store import RecordStore
+from sheet_writer import write_changes, write_records
+from tracked_records import TrackedRecords
+
+SCOPE = [
+    "https://www.googleapis.com/auth/spreadsheets",
+    "https://www.googleapis.com/auth/drive.file",
+    "https://www.googleapis.com/auth/drive"
+]
+
+
+# Connection handles, created on first use by the functions below
+_client = None
+_spreadsheet = None
+_worksheet = None
+_connect_lock = threading.Lock()
+
+
+def get_client():
+    """
+    Get the authorized gspread client, authorizing on first use.
+
+    Returns:
+        gspread.Client: The gspread client.
+    """
+    global _client
+    with _connect_lock:
+        if _client is None:
+            # Load credentials from the service account file
+            creds = Credentials.from_service_account_file('creds.json')
+            scoped_creds = creds.with_scopes(SCOPE)
+            # Authorize the gspread client using the scoped credentials
+            _client = gspread.authorize(scoped_creds)
+    return _client
+
+
+def get_spreadsheet():
+    """
+    Get the 'pp3' Google Sheets document, opening it on first use.
+
+    Returns:
+        gspread.Spreadsheet: The pp3 spreadsheet.
+    """
+    global _spreadsheet
+    client = get_client()
+    with _connect_lock:
+        if _spreadsheet is None:
+            _spreadsheet = client.open('pp3')
+    return _spreadsheet
+
+
+def get_worksheet():
+    """
+    Get the 'hris' worksheet, fetching it on first use.
+
+    Returns:
+        gspread.Worksheet: The hris worksheet.
+    """
+    global _worksheet
+    spreadsheet = get_spreadsheet()
+    with _connect_lock:
+        if _worksheet is None:
+            _worksheet = spreadsheet.worksheet('hris')
+    return _worksheet
+
+
+class SheetsRecordStore(RecordStore):
+    """
+    Record store backed by a Google Sheets worksheet.
+
+    Row 1 holds the uppercase field names, record N is on row N + 2.
+    The employee ID is in column A, so a record is found by reading that
+    one column, and the row of each ID is remembered from the last load.
+    Records are read by the column names in row 1. A save writes every
+    row in FIELDNAMES order, which migrates an older sheet; a single-row
+    write reads row 1 again first and uses its order, and is refused if
+    its columns are not the FIELDNAMES.
+    Nothing is sent to Google until the records are first accessed.
+    With a snapshot cache, load() only downloads the sheet if it was
+    modified since the snapshot was taken.
+
+    The Sheets API has no transactions, so writes are compare-and-swap
+    by hand: the rows about to be written are read back first and
+    compared with the copy taken when they were loaded. If another user
+    changed them, the sheet is downloaded again and the pending changes
+    are merged into it before writing. Only the touched rows are sent.
+
+    Args:
+        worksheet (gspread.Worksheet): The worksheet holding the records.
+        Defaults to None, the lazily opened hris worksheet.
+        cache (SnapshotCache): Local copy of the sheet. Defaults to None.
+    """
+
+    def __init__(self, worksheet=None, cache=None):
+        self._worksheet = worksheet
+        self.cache = cache
+        # Lowercase column names of row 1, read when first needed
+        self.fieldnames = None
+        # Copy of the records as loaded or last saved, by position
+        self._base = []
+        # Position of each employee ID, built from the copy when needed
+        self._rows = None
+
+    @property
+    def worksheet(self):
+        """
+        gspread.Worksheet: The worksheet, connected on first access.
+        """
+        if self._worksheet is None:
+            self._worksheet = get_worksheet()
+        return self._worksheet
+
+    def _row_range(self, index):
+        """
+        Get the A1 range of the row holding a record.
+        """
+        row = index + 2
+        return f"{rowcol_to_a1(row, 1)}:{rowcol_to_a1(row, len(FIELDNAMES))}"
+
+    def _read_header(self):
+        """
+        Read the column names in row 1 as they are now.
+
+        Returns:
+            list: The lowercase field names, empty for an empty sheet.
+        """
+        self.fieldnames = [
+            fieldname.lower() for fieldname in self.worksheet.row_values(1)
+        ]
+        return self.fieldnames
+
+    def _columns(self):
+        """
+        Get the column names of row 1, read on first use.
+        """
+        if self.fieldnames is None:
+            self._read_header()
+        return self.fieldnames
+
+    def _write_order(self):
+        """
+        Get the column order to write a single row in, the one the sheet
+        has now. Raise ConflictError if the columns are not the
+        FIELDNAMES, e.g. a sheet from before a column was added, where
+        the row would land under the wrong columns.
+        """
+        fieldnames = self._read_header()
+        if not fieldnames:
+            # An empty sheet gets the header first
+            self.worksheet.append_row(
+                [fieldname.upper() for fieldname in FIELDNAMES]
+            )
+            self.fieldnames = FIELDNAMES
+        elif sorted(fieldnames) != sorted(FIELDNAMES):
+            raise ConflictError(
+                "The sheet columns are out of date, open the menu once "
+                "to update them before changing single records"
+            )
+        return self.fieldnames
+
+    def _to_record(self, row):
+        """
+        Turn a worksheet row into an Employee record.
+        """
+        return Employee.from_row(self.fieldnames, row)
+
+    def revision(self):
+        """
+        Get the modified time of the spreadsheet, a single metadata call.
+
+        Returns:
+            str: The modified time as reported by Google Drive.
+        """
+        spreadsheet = self.worksheet.spreadsheet
+        response = spreadsheet.client.request(
+            'get',
+            f"{DRIVE_FILES_API_V3_URL}/{spreadsheet.id}",
+            params={'fields': 'modifiedTime', 'supportsAllDrives': True}
+        )
+        return response.json()['modifiedTime']
+
+    def _get_values(self):
+        """
+        Get the worksheet values, from the cache if it is still current.
+        """
+        if self.cache is None:
+            return self.worksheet.get_all_values()
+
+        # Read the revision first, a later change then fails the next check
+        revision = self.revision()
+        records_data = self.cache.read(revision)
+        if records_data is None:
+            records_data = self.worksheet.get_all_values()
+            self.cache.write(revision, records_data)
+        return records_data
+
+    def load(self):
+        records_data = self._get_values()
+        self._rows = None
+        if not records_data:
+            self._base = []
+            return TrackedRecords()
+
+        self.fieldnames = [
+            fieldname.lower() for fieldname in records_data[0]
+        ]
+        records = TrackedRecords(
+            self._to_record(row) for row in records_data[1:]
+        )
+        if self.fieldnames != FIELDNAMES:
+            # Rewrite everything in FIELDNAMES order on the first save
+            records.mark_reordered()
+        self._base = snapshot(records)
+        # Give IDs to rows without one, e.g. added in the browser. They
+        # are written by the next save.
+        for index, record in enumerate(records):
+            if not record['employee_id']:
+                record['employee_id'] = new_employee_id()
+                records.mark_updated(index)
+        return records
+
+    def iter_records(self, batch_size=1000):
+        fieldnames = [
+            fieldname.lower() for fieldname in self.worksheet.row_values(1)
+        ]
+        if not fieldnames:
+            return
+        # Record rows start on row 2, read batch_size rows per request
+        start = 2
+        while True:
+            end = start + batch_size - 1
+            rows = self.worksheet.get(
+                f"{rowcol_to_a1(start, 1)}:"
+                f"{rowcol_to_a1(end, len(fieldnames))}"
+            )
+            for row in rows:
+                yield Employee.from_row(fieldnames, row)
+            if len(rows) < batch_size:
+                return
+            start = end + 1
+
+    def get(self, index):
+        self._columns()
+        return self._to_record(self.worksheet.row_values(index + 2))
+
+    def _row_map(self):
+        """
+        Get the position of each employee ID at the last load or save.
+        """
+        if self._rows is None:
+            self._rows = {
+                record['employee_id']: origin
+                for origin, record in enumerate(self._base)
+            }
+        return self._rows
+
+    def find(self, employee_id):
+        origin = self._row_map().get(employee_id)
+        if origin is not None and \
+                self.get(origin)['employee_id'] == employee_id:
+            return origin
+        fieldnames = self._columns()
+        if 'employee_id' not in fieldnames:
+            return None
+        # Not loaded or moved since: read the ID column only
+        column = fieldnames.index('employee_id') + 1
+        employee_ids = self.worksheet.col_values(column)[1:]
+        self._rows = {
+            value: origin for origin, value in enumerate(employee_ids)
+        }
+        return self._rows.get(employee_id)
+
+    def duplicate_candidates(self, record):
+        keys = (email_key(record), person_key(record))
+        header = self._read_header()
+        fieldnames = [
+            field for field in ('employee_id',) + DuplicateIndex.fields
+            if field in header
+        ]
+        if not fieldnames or keys == (None, None):
+            return []
+        # Download only the compared columns, not the whole sheet
+        letters = [
+            rowcol_to_a1(1, header.index(field) + 1)[:-1]
+            for field in fieldnames
+        ]
+        columns = self.worksheet.batch_get(
+            [f"{letter}2:{letter}" for letter in letters]
+        )
+        candidates = []
+        for cells in zip_longest(*columns, fillvalue=[]):
+            stored = Employee.from_row(
+                fieldnames, [cell[0] if cell else '' for cell in cells]
+            )
+            stored_keys = (email_key(stored), person_key(stored))
+            if any(
+                key is not None and key == stored_key
+                for key, stored_key in zip(keys, stored_keys)
+            ):
+                candidates.append(stored)
+        return candidates
+
+    def insert(self, record):
+        fieldnames = self._write_order()
+        prepare_insert(record)
+        self.worksheet.append_row(record.to_row(fieldnames))
+
+    def _check_current(self, index, expected):
+        """
+        Raise ConflictError if a row no longer holds the expected record.
+        """
+        current = self.get(index)
+        if expected is not None and not same_values(current, expected):
+            raise ConflictError(
+                f"Record {index + 1} was changed by another user",
+                [Conflict(current, STALE_VERSION)]
+            )
+        return current
+
+    def update(self, index, record, expected=None):
+        fieldnames = self._write_order()
+        current = self._check_current(index, expected)
+        prepare_update(current, record)
+        self.worksheet.update(
+            self._row_range(index), [record.to_row(fieldnames)]
+        )
+
+    def delete(self, index, expected=None):
+        self._check_current(index, expected)
+        self.worksheet.delete_rows(index + 2)
+
+    def base_record(self, origin):
+        return self._base[origin]
+
+    def query(self, **criteria):
+        # The Sheets API cannot filter rows, so filter a fresh download
+        return [
+            record for record in self.load()
+            if all(
+                record[field] == parse_field(field, value)
+                for field, value in criteria.items()
+            )
+        ]
+
+    def _download(self):
+        """
+        Get the records as now stored, bypassing the cache.
+        """
+        values = self.worksheet.get_all_values()
+        fieldnames = [fieldname.lower() for fieldname in values[0]] \
+            if values else []
+        if values and fieldnames != self.fieldnames:
+            raise ConflictError(
+                "The sheet columns were changed by another user, "
+                "load the records again before saving"
+            )
+        return [self._to_record(row) for row in values[1:]]
+
+    def _is_current(self, records):
+        """
+        Check that the rows about to be changed still hold what was
+        loaded, reading them all in one request.
+        """
+        touched = sorted(records.dirty | records.deleted)
+        if not touched:
+            # Appending needs no check, the rows go after the last one
+            return True
+        value_ranges = self.worksheet.batch_get(
+            [self._row_range(origin) for origin in touched]
+        )
+        for origin, value_range in zip(touched, value_ranges):
+            row = value_range[0] if value_range else []
+            if not same_values(self._to_record(row), self._base[origin]):
+                return False
+        return True
+
+    def _rebase(self, records):
+        """
+        Download the sheet again and merge the pending changes into it.
+        """
+        fresh = self._download()
+        updated, deleted, inserted, conflicts = rebase_changes(
+            self._base, records, fresh
+        )
+        self._base = snapshot(fresh)
+        self._rows = None
+        records.rebase(fresh, updated, deleted, inserted)
+        return conflicts
+
+    def sync(self, records, progress=None):
+        if self.cache is not None:
+            # Stale from the first write on, even if a later one fails
+            self.cache.invalidate()
+
+        conflicts = []
+        if records.reordered or records.synced_count == 0:
+            # Everything is rewritten, so the whole sheet must be as
+            # loaded, e.g. when the columns are migrated on first save
+            fresh = self._download()
+            if len(fresh) != len(self._base) or not all(
+                map(same_values, fresh, self._base)
+            ):
+                raise ConflictError(
+                    "The sheet was changed by another user, load the "
+                    "records again before saving"
+                )
+            for record in records:
+                if not record['employee_id']:
+                    record['employee_id'] = new_employee_id()
+                record['version'] += 1
+            write_records(self.worksheet, records, progress)
+            self.fieldnames = FIELDNAMES
+            self._base = snapshot(records)
+            self._rows = None
+            records.mark_synced()
+            return conflicts
+
+        for _ in range(MAX_ATTEMPTS):
+            if self._is_current(records):
+                break
+            conflicts.extend(self._rebase(records))
+        else:
+            raise ConflictError(
+                "The sheet kept changing while saving, nothing was saved",
+                conflicts
+            )
+        stamp_changes(self._base, records)
+        write_changes(self.worksheet, records, progress)
+        self._base = advance_snapshot(self._base, records)
+        self._rows = None
+        records.mark_synced()
+        return conflicts
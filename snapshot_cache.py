@@ -0,0 +1,83 @@
+import sqlite3  # Import sqlite3 module for the cache file
+import json  # Import json module to serialize the rows
+import zlib  # Import zlib module to compress the snapshot
+from contextlib import contextmanager  # Build the connection helper
+
+
+class SnapshotCache:
+    """
+    Local on-disk copy of the last loaded worksheet values.
+
+    The snapshot is stored as one compressed blob in a SQLite file,
+    together with the revision (modified time) of the spreadsheet it was
+    taken from. It is only used while that revision is still current.
+
+    Args:
+        path (str): Path of the cache file.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with self._connect() as connection:
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS snapshot "
+                "(id INTEGER PRIMARY KEY CHECK (id = 1), "
+                "revision TEXT, data BLOB)"
+            )
+
+    @contextmanager
+    def _connect(self):
+        """
+        Open a connection, one per operation so any thread can use it.
+        Commits on success and always closes the connection.
+        """
+        connection = sqlite3.connect(self.path)
+        try:
+            with connection:
+                yield connection
+        finally:
+            connection.close()
+
+    def read(self, revision):
+        """
+        Get the cached values if they were taken at a revision.
+
+        Args:
+            revision (str): The current revision of the spreadsheet.
+
+        Returns:
+            list: The worksheet values, or None if the cache is stale.
+        """
+        with self._connect() as connection:
+            row = connection.execute(
+                "SELECT data FROM snapshot WHERE id = 1 AND revision = ?",
+                (revision,)
+            ).fetchone()
+        if row is None:
+            return None
+        return json.loads(zlib.decompress(row[0]))
+
+    def write(self, revision, values):
+        """
+        Replace the cached values.
+
+        Args:
+            revision (str): The revision the values were taken at.
+            values (list): The worksheet values, header row included.
+        """
+        data = zlib.compress(json.dumps(values, default=str).encode())
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO snapshot (id, revision, data) "
+                "VALUES (1, ?, ?)",
+                (revision, data)
+            )
+
+    def invalidate(self):
+        """
+        Mark the cached values as stale, e.g. after writing to the sheet.
+        """
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE snapshot SET revision = NULL WHERE id = 1"
+            )
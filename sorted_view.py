@@ -0,0 +1,136 @@
+import datetime  # Import datetime module for working with dates and times
+from bisect import bisect_left, insort  # Binary search in a sorted list
+from functools import total_ordering  # Fill in the comparison methods
+
+
+@total_ordering
+class _Descending:
+    """
+    Wrapper that reverses the order of a text value.
+    """
+
+    __slots__ = ('value',)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+    def __lt__(self, other):
+        return self.value > other.value
+
+
+def sort_key_part(value, descending=False):
+    """
+    Build the part of a sort key for one typed field value.
+
+    Numbers and dates keep their natural order and text sorts without
+    regard to case. Values of an unexpected type, e.g. an unparseable
+    cell, sort after all the others in both directions.
+
+    Args:
+        value: The typed field value.
+        descending (bool): Sort from highest to lowest. Defaults to False.
+
+    Returns:
+        tuple: A comparable key.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return (0, -value if descending else value)
+    if isinstance(value, datetime.date):
+        ordinal = value.toordinal()
+        return (0, -ordinal if descending else ordinal)
+    if isinstance(value, str) and value:
+        value = value.lower()
+        return (1, _Descending(value) if descending else value)
+    return (2, 0)
+
+
+class SortedView:
+    """
+    Records kept in a multi-key sort order, separate from storage order.
+
+    The sort key of each record is computed once when it is added and
+    kept in a sorted list, so adding, removing or updating a record is a
+    binary search instead of a re-sort. Register it with
+    TrackedRecords.add_index() to keep it up to date.
+
+    Args:
+        sort_fields (list): List of (field, descending) tuples, most
+        significant first, e.g. [('department', False),
+        ('salary', True)].
+    """
+
+    def __init__(self, sort_fields):
+        self.sort_fields = list(sort_fields)
+        self.clear()
+
+    def clear(self):
+        self._records = {}
+        self._entries = []
+        self._entry_of = {}
+        self._next_order = 0
+
+    def rebuild(self, records):
+        self.clear()
+        entries = []
+        for record in records:
+            entries.append(self._entry(record, self._next_order))
+            self._next_order += 1
+        # One sort for the initial build, binary inserts after that
+        entries.sort()
+        self._entries = entries
+
+    def _entry(self, record, order):
+        """
+        Build the sorted list entry of a record and remember it.
+        """
+        key = tuple(
+            sort_key_part(record[field], descending)
+            for field, descending in self.sort_fields
+        )
+        # The order added keeps equal keys stable and entries unique
+        entry = (key, order, id(record))
+        self._records[id(record)] = record
+        self._entry_of[id(record)] = entry
+        return entry
+
+    def add(self, record):
+        insort(self._entries, self._entry(record, self._next_order))
+        self._next_order += 1
+
+    def remove(self, record):
+        entry = self._entry_of.pop(id(record), None)
+        if entry is None:
+            return
+        del self._records[id(record)]
+        del self._entries[bisect_left(self._entries, entry)]
+
+    def update(self, record):
+        entry = self._entry_of.get(id(record))
+        if entry is None:
+            self.add(record)
+            return
+        self.remove(record)
+        # Keep the record's place among records with an equal key
+        insort(self._entries, self._entry(record, entry[1]))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def records(self, start=0, stop=None):
+        """
+        Get the records in sort order.
+
+        Args:
+            start (int): First position. Defaults to 0.
+            stop (int): Position to stop before. Defaults to None, the end.
+
+        Returns:
+            list: List of records.
+        """
+        return [
+            self._records[record_id]
+            for _, _, record_id in self._entries[start:stop]
+        ]
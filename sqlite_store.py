@@ -0,0 +1,439 @@
+import sqlite3  # Import sqlite3 module for the local database
+import threading  # Import threading module to serialize access
+from bisect import bisect_left  # Find a rowid among the sorted rowids
+from conflicts import (
+    DELETED_BY_OTHER,
+    KEPT_EDITED,
+    STALE_VERSION,
+    Conflict,
+    ConflictError,
+    advance_snapshot,
+    prepare_insert,
+    prepare_update,
+    resolve,
+    snapshot,
+)
+from duplicates import email_key, person_key
+from employee import (
+    FIELDNAMES,
+    Employee,
+    format_field,
+    new_employee_id,
+    parse_field,
+)
+from record_store import RecordStore
+from tracked_records import TrackedRecords
+
+# SQLite column types, every other field is stored as text
+COLUMN_TYPES = {
+    'age': 'INTEGER',
+    'salary': 'REAL',
+    'version': 'INTEGER NOT NULL DEFAULT 0',
+}
+
+# Columns with an index for fast lookups
+INDEXED_FIELDS = ['last_name', 'first_name', 'email', 'department']
+# Normalized keys the duplicate check looks rows up by, each indexed
+KEY_COLUMNS = ['email_key', 'person_key']
+
+
+def duplicate_keys(record):
+    """
+    Get the values of the KEY_COLUMNS of a record.
+
+    Args:
+        record (Employee): The record.
+
+    Returns:
+        list: The normalized email, and the normalized last name, first
+        name and date of birth in one string. None where a key is empty.
+    """
+    person = person_key(record)
+    if person is not None:
+        last_name, first_name, date_of_birth = person
+        person = (
+            f"{last_name} {first_name} "
+            f"{format_field('date_of_birth', date_of_birth)}"
+        )
+    return [email_key(record), person]
+
+
+class SQLiteRecordStore(RecordStore):
+    """
+    Record store backed by a local SQLite database.
+
+    Records are kept in the 'hris' table in insertion order (by rowid).
+    The store remembers the rowid of each record loaded or written, so a
+    position maps to its row without a scan, and a unique index finds
+    the row of an employee ID. Each row also keeps its duplicate_keys(),
+    so a duplicate check is an indexed lookup. The connection may be used
+    from any thread (records are prefetched in the background); a lock
+    keeps one operation at a time.
+
+    Several processes may share the database file. Updates and deletes
+    only match the row at the version it was read at; a row another
+    process saved first is merged inside the same transaction, which
+    holds the database write lock from its first statement.
+
+    Args:
+        path (str): Path of the database file, ":memory:" for a
+        temporary database.
+    """
+
+    def __init__(self, path):
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.row_factory = sqlite3.Row
+        self._lock = threading.RLock()
+        # Rowids by position, read on first use if load() was not called
+        self._ids = None
+        # Copy of the records as loaded or last saved, by position
+        self._base = None
+        self._create_table()
+
+    def _create_table(self):
+        """
+        Create the hris table and its indexes if they do not exist.
+        """
+        columns = ", ".join(
+            f"{field} {COLUMN_TYPES.get(field, 'TEXT')}"
+            for field in FIELDNAMES
+        )
+        with self.connection:
+            self.connection.execute(
+                f"CREATE TABLE IF NOT EXISTS hris "
+                f"(id INTEGER PRIMARY KEY, {columns})"
+            )
+            # Add the columns of fields added since the table was made
+            existing = {
+                row['name'] for row in
+                self.connection.execute("PRAGMA table_info(hris)")
+            }
+            for field in FIELDNAMES:
+                if field not in existing:
+                    self.connection.execute(
+                        f"ALTER TABLE hris ADD COLUMN "
+                        f"{field} {COLUMN_TYPES.get(field, 'TEXT')}"
+                    )
+            # Add the duplicate keys, computed for the rows saved before
+            new_keys = [
+                column for column in KEY_COLUMNS if column not in existing
+            ]
+            for column in new_keys:
+                self.connection.execute(
+                    f"ALTER TABLE hris ADD COLUMN {column} TEXT"
+                )
+            if new_keys:
+                assignments = ", ".join(
+                    f"{column} = ?" for column in KEY_COLUMNS
+                )
+                self.connection.executemany(
+                    f"UPDATE hris SET {assignments} WHERE id = ?",
+                    [
+                        duplicate_keys(self._to_record(row)) + [row['id']]
+                        for row in self._select().fetchall()
+                    ]
+                )
+            # Give IDs to rows saved before there were IDs
+            missing = self.connection.execute(
+                "SELECT id FROM hris "
+                "WHERE employee_id IS NULL OR employee_id = ''"
+            ).fetchall()
+            self.connection.executemany(
+                "UPDATE hris SET employee_id = ? WHERE id = ?",
+                [(new_employee_id(), row[0]) for row in missing]
+            )
+            self.connection.execute(
+                "CREATE UNIQUE INDEX IF NOT EXISTS hris_employee_id "
+                "ON hris (employee_id)"
+            )
+            for field in INDEXED_FIELDS + KEY_COLUMNS:
+                self.connection.execute(
+                    f"CREATE INDEX IF NOT EXISTS hris_{field} "
+                    f"ON hris ({field})"
+                )
+
+    def _select(self, where="", params=()):
+        """
+        Run a SELECT on the hris table in insertion order.
+        """
+        return self.connection.execute(
+            f"SELECT id, {', '.join(FIELDNAMES)} FROM hris {where} "
+            f"ORDER BY id",
+            params
+        )
+
+    def _insert_row(self, record):
+        """
+        Insert one record and return its rowid. Does not commit.
+        """
+        columns = FIELDNAMES + KEY_COLUMNS
+        cursor = self.connection.execute(
+            f"INSERT INTO hris ({', '.join(columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})",
+            record.to_row() + duplicate_keys(record)
+        )
+        return cursor.lastrowid
+
+    def _update_row(self, row_id, record, version=None):
+        """
+        Update one record by rowid, only if it is still at a version.
+        Does not commit.
+
+        Returns:
+            bool: True if the row was updated.
+        """
+        assignments = ", ".join(
+            f"{column} = ?" for column in FIELDNAMES + KEY_COLUMNS
+        )
+        params = record.to_row() + duplicate_keys(record) + [row_id]
+        where = "id = ?"
+        if version is not None:
+            where += " AND version = ?"
+            params.append(version)
+        cursor = self.connection.execute(
+            f"UPDATE hris SET {assignments} WHERE {where}", params
+        )
+        return cursor.rowcount > 0
+
+    def _fetch(self, row_id):
+        """
+        Get the record stored under a rowid, or None if it was deleted.
+        """
+        row = self._select("WHERE id = ?", (row_id,)).fetchone()
+        return None if row is None else self._to_record(row)
+
+    def _row_ids(self):
+        """
+        Get the rowids of the records by position.
+        """
+        if self._ids is None:
+            self._ids = [
+                row[0] for row in
+                self.connection.execute("SELECT id FROM hris ORDER BY id")
+            ]
+        return self._ids
+
+    @staticmethod
+    def _to_record(row):
+        """
+        Turn a database row into an Employee record without its rowid.
+        """
+        return Employee(**{field: row[field] for field in FIELDNAMES})
+
+    def load(self):
+        with self._lock:
+            rows = self._select().fetchall()
+            self._ids = [row['id'] for row in rows]
+            records = TrackedRecords(self._to_record(row) for row in rows)
+            self._base = snapshot(records)
+            return records
+
+    def iter_records(self, batch_size=1000):
+        with self._lock:
+            cursor = self._select()
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            for row in rows:
+                yield self._to_record(row)
+
+    def get(self, index):
+        with self._lock:
+            return self._fetch(self._row_ids()[index])
+
+    def find(self, employee_id):
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT id FROM hris WHERE employee_id = ?", (employee_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            # Rowids grow with each insert, so they are in order
+            row_ids = self._row_ids()
+            index = bisect_left(row_ids, row[0])
+            if index < len(row_ids) and row_ids[index] == row[0]:
+                return index
+            # Added by another process since the rowids were read. The
+            # positions of loaded records must not move until they are
+            # saved, so only a store without them reads the rowids again.
+            if self._base is not None:
+                return None
+            self._ids = None
+            return bisect_left(self._row_ids(), row[0])
+
+    def duplicate_candidates(self, record):
+        with self._lock:
+            rows = self._select(
+                "WHERE email_key = ? OR person_key = ?",
+                duplicate_keys(record)
+            )
+            return [self._to_record(row) for row in rows]
+
+    def insert(self, record):
+        with self._lock:
+            prepare_insert(record)
+            with self.connection:
+                self._row_ids().append(self._insert_row(record))
+
+    def _check_current(self, row_id, index, expected):
+        """
+        Get the stored record of a row, raising ConflictError if it is
+        no longer at the expected version. Does not commit.
+        """
+        current = self._fetch(row_id)
+        if current is None or (
+            expected is not None
+            and current['version'] != expected['version']
+        ):
+            raise ConflictError(
+                f"Record {index + 1} was changed by another user",
+                [Conflict(current or expected, STALE_VERSION)]
+            )
+        return current
+
+    def update(self, index, record, expected=None):
+        with self._lock:
+            with self.connection:
+                row_id = self._row_ids()[index]
+                current = self._check_current(row_id, index, expected)
+                prepare_update(current, record)
+                version = current['version']
+                if not self._update_row(row_id, record, version):
+                    raise ConflictError(
+                        f"Record {index + 1} was changed by another user"
+                    )
+
+    def delete(self, index, expected=None):
+        with self._lock:
+            with self.connection:
+                row_id = self._row_ids()[index]
+                current = self._check_current(row_id, index, expected)
+                cursor = self.connection.execute(
+                    "DELETE FROM hris WHERE id = ? AND version = ?",
+                    (row_id, current['version'])
+                )
+                if cursor.rowcount == 0:
+                    raise ConflictError(
+                        f"Record {index + 1} was changed by another user"
+                    )
+            del self._ids[index]
+            if self._base is not None:
+                del self._base[index]
+
+    def base_record(self, origin):
+        return self._base[origin]
+
+    def query(self, **criteria):
+        with self._lock:
+            for field in criteria:
+                if field not in FIELDNAMES:
+                    raise ValueError(f"Unknown field: {field}")
+            where = " AND ".join(f"{field} = ?" for field in criteria)
+            params = [
+                format_field(field, parse_field(field, value))
+                for field, value in criteria.items()
+            ]
+            rows = self._select(f"WHERE {where}" if where else "", params)
+            return [self._to_record(row) for row in rows]
+
+    def _apply_changes(self, records):
+        """
+        Apply the changes tracked on a list of records. Does not commit.
+
+        Returns:
+            tuple: (number of rows deleted, updated or inserted, list of
+            Conflict).
+        """
+        base = self._base
+        if base is None:
+            raise ConflictError("Load the records before saving them")
+        if records.reordered:
+            # Everything is rewritten, so no other process may have
+            # saved since the records were loaded
+            stored = self.connection.execute(
+                "SELECT id, version FROM hris ORDER BY id"
+            ).fetchall()
+            if [tuple(row) for row in stored] != [
+                (row_id, record['version'])
+                for row_id, record in zip(self._row_ids(), base)
+            ]:
+                raise ConflictError(
+                    "The records were changed by another user, load them "
+                    "again before saving"
+                )
+            self.connection.execute("DELETE FROM hris")
+            for record in records:
+                if not record['employee_id']:
+                    record['employee_id'] = new_employee_id()
+                record['version'] += 1
+            self._ids = [self._insert_row(record) for record in records]
+            return len(records), []
+
+        # The rowids are still indexed by position at the last sync
+        row_ids = self._row_ids()
+        conflicts = []
+        for origin in records.deleted:
+            cursor = self.connection.execute(
+                "DELETE FROM hris WHERE id = ? AND version = ?",
+                (row_ids[origin], base[origin]['version'])
+            )
+            if cursor.rowcount == 0:
+                theirs = self._fetch(row_ids[origin])
+                if theirs is not None:
+                    conflicts.append(Conflict(theirs, KEPT_EDITED))
+        for origin in records.dirty:
+            ours = records[records.current_index(origin)]
+            prepare_update(base[origin], ours)
+            if self._update_row(
+                row_ids[origin], ours, base[origin]['version']
+            ):
+                continue
+            # The write lock is held now, so this second try succeeds
+            theirs = self._fetch(row_ids[origin])
+            if theirs is None:
+                prepare_insert(ours)
+                self._insert_row(ours)
+                conflicts.append(Conflict(ours, DELETED_BY_OTHER))
+                continue
+            conflicts.append(resolve(base[origin], ours, theirs))
+            prepare_update(theirs, ours)
+            self._update_row(row_ids[origin], ours)
+        for index in records.inserted_indices():
+            prepare_insert(records[index])
+        new_ids = [
+            self._insert_row(records[index])
+            for index in records.inserted_indices()
+        ]
+        self._ids = [
+            row_id for origin, row_id in enumerate(row_ids)
+            if origin not in records.deleted
+        ] + new_ids
+        row_count = len(records.deleted) + len(records.dirty) + len(new_ids)
+        return row_count, conflicts
+
+    def sync(self, records, progress=None):
+        with self._lock:
+            # One transaction, so a failure leaves the previous data intact
+            with self.connection:
+                # Take the write lock before the first read: otherwise
+                # it is only taken at the first write, and another
+                # process could save between the version check and it
+                self.connection.execute("BEGIN IMMEDIATE")
+                row_count, conflicts = self._apply_changes(records)
+            if conflicts:
+                # Rows were re-added or kept, read them back in order
+                rows = self._select().fetchall()
+                self._ids = [row['id'] for row in rows]
+                records.rebase(self._to_record(row) for row in rows)
+                self._base = snapshot(records)
+            elif records.reordered:
+                self._base = snapshot(records)
+                records.mark_synced()
+            else:
+                self._base = advance_snapshot(self._base, records)
+                records.mark_synced()
+        if progress is not None:
+            progress.batch("Committed", row_count)
+        return conflicts
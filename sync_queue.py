@@ -0,0 +1,295 @@
+import time  # Import time module for the flush timer and backoff
+import sqlite3  # Import sqlite3 module to tell database errors apart
+import random  # Import random module to spread out the retries
+import threading  # Import threading module for the background writer
+from conflicts import ConflictError
+from journal import journal_save, save
+
+# Seconds a change waits for more changes before it is written
+FLUSH_DELAY = 5.0
+# Pending changes that are written at once, without waiting
+FLUSH_SIZE = 100
+# First and longest wait before retrying a failed write, in seconds
+BACKOFF_START = 1.0
+BACKOFF_MAX = 64.0
+# HTTP statuses worth retrying: quota exceeded and server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def status_code(error):
+    """
+    Get the HTTP status of a failed backend request, if it has one.
+
+    Args:
+        error (Exception): The error, e.g. a gspread APIError.
+
+    Returns:
+        int: The status code, or None.
+    """
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None)
+
+
+def is_backend_error(error):
+    """
+    Check whether an error came from the backend or the network and
+    may pass, e.g. a lost connection, a quota error or a locked
+    database, rather than from the records or the code. A refusal that
+    stays, such as a broken constraint or an HTTP 403, is not one.
+
+    Args:
+        error (Exception): The error.
+
+    Returns:
+        bool: True if trying again later may succeed.
+    """
+    return (
+        isinstance(error, (OSError, sqlite3.OperationalError))
+        or status_code(error) in RETRY_STATUSES
+    )
+
+
+class SyncQueue:
+    """
+    Background writer that saves the changes made to a list of records.
+
+    The menu changes the records and calls changed(), which returns at
+    once. A writer thread waits FLUSH_DELAY seconds for more changes,
+    or less if FLUSH_SIZE changes are pending, and then saves them all
+    in one sync. Edits to the same row are coalesced by the tracked
+    records, so a row edited many times is written once.
+
+    A write that fails on a quota error (429), a server error or a
+    network error is retried with exponential backoff. The changes are
+    journaled before each attempt, so they also survive a restart. Any
+    other failure, e.g. a bug or a bad record, is not retried: it is
+    shown by status() and the changes wait for the next change or
+    flush().
+
+    The records must only be read or changed while holding self.lock,
+    and records must be replaced rather than changed in place. The
+    writer holds the lock only to take the pending changes off the
+    records and journal them, and to merge back what happened during
+    the write; the write itself runs with the lock released and
+    self.flushing set.
+
+    Args:
+        store (RecordStore): The store to write to.
+        records (TrackedRecords): The records being changed.
+        journal (Journal): Write-ahead journal of the saves. Defaults
+        to None.
+        delay (float): Seconds to wait for more changes. Defaults to
+        FLUSH_DELAY.
+        batch_size (int): Pending changes written without waiting.
+        Defaults to FLUSH_SIZE.
+    """
+
+    def __init__(self, store, records, journal=None, delay=FLUSH_DELAY,
+                 batch_size=FLUSH_SIZE):
+        self.store = store
+        self.records = records
+        self.journal = journal
+        self.delay = delay
+        self.batch_size = batch_size
+        self.lock = threading.RLock()
+        self._wakeup = threading.Condition(self.lock)
+        self._thread = None
+        self._stopping = False
+        # Time the oldest unsaved change was made, None if all saved
+        self._changed_at = None
+        self._retry_at = None
+        self._backoff = BACKOFF_START
+        self.flushing = False
+        self._conflicts = []
+        self.error = None
+        self.saves = 0
+
+    def start(self):
+        """
+        Start the writer thread.
+        """
+        self._thread = threading.Thread(
+            target=self._run, name='sync-queue', daemon=True
+        )
+        self._thread.start()
+
+    def changed(self):
+        """
+        Tell the writer the records changed. Returns at once.
+        """
+        with self._wakeup:
+            if self._changed_at is None:
+                self._changed_at = time.monotonic()
+            self.error = None
+            self._wakeup.notify()
+
+    def flush(self, timeout=None):
+        """
+        Write the pending changes now and wait until they are saved.
+
+        Args:
+            timeout (float): Seconds to wait at most. Defaults to None,
+            no limit.
+
+        Returns:
+            bool: True if nothing is left to write.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._wakeup:
+            # Try at once, even if a failed write is waiting to retry
+            self._retry_at = None
+            self.error = None
+            if self.records.has_changes:
+                self._changed_at = float('-inf')
+            self._wakeup.notify()
+            while self._unsaved() and self.error is None:
+                remaining = (
+                    None if deadline is None else deadline - time.monotonic()
+                )
+                if remaining is not None and remaining <= 0:
+                    break
+                self._wakeup.wait(remaining)
+            return not self._unsaved()
+
+    def _unsaved(self):
+        """
+        Check whether changes are pending or being written.
+        """
+        return self.flushing or self.records.has_changes
+
+    def close(self, timeout=None):
+        """
+        Write what is pending and stop the writer.
+
+        Args:
+            timeout (float): Seconds to wait for the last write at
+            most. Defaults to None, no limit.
+
+        Returns:
+            bool: True if nothing was left unsaved.
+        """
+        saved = self.flush(timeout)
+        with self._wakeup:
+            self._stopping = True
+            self._wakeup.notify()
+        return saved
+
+    def take_conflicts(self):
+        """
+        Get the conflicts merged by the background saves, once.
+
+        Returns:
+            list: List of Conflict since the last call.
+        """
+        with self.lock:
+            conflicts, self._conflicts = self._conflicts, []
+        return conflicts
+
+    def status(self):
+        """
+        Describe the state of the background saves for the screen.
+
+        Returns:
+            str: One line, e.g. "3 change(s) waiting to be saved".
+        """
+        if self.flushing:
+            return "Saving changes..."
+        if self.error is not None:
+            if self._retry_at is not None:
+                seconds = max(0, round(self._retry_at - time.monotonic()))
+                return f"Save failed ({self.error}), retrying in {seconds}s"
+            return f"Not saved: {self.error}"
+        if self._changed_at is not None:
+            return (
+                f"{self.records.change_count} change(s) waiting to be saved"
+            )
+        if self.saves:
+            return "All changes saved"
+        return ""
+
+    def _due(self):
+        """
+        Get the seconds until the next write, 0 if it is due now.
+        """
+        now = time.monotonic()
+        if self._retry_at is not None:
+            return max(0.0, self._retry_at - now)
+        if self.records.change_count >= self.batch_size:
+            return 0.0
+        return max(0.0, self._changed_at + self.delay - now)
+
+    def _run(self):
+        """
+        Wait for changes and write them, until close() is called.
+        """
+        with self._wakeup:
+            while not self._stopping:
+                if self._changed_at is None or (
+                    self.error is not None and self._retry_at is None
+                ):
+                    # Nothing to write, or a save that needs the user
+                    self._wakeup.wait()
+                    continue
+                wait = self._due()
+                if wait > 0:
+                    self._wakeup.wait(wait)
+                    continue
+                self._write()
+                self._wakeup.notify_all()
+
+    def _write(self):
+        """
+        Save the pending changes once, scheduling a retry on failure.
+
+        Called with the lock held. The changes are taken off the records
+        and journaled with the lock held, then written with it released,
+        so the menu can go on changing the records. Afterwards the
+        changes made meanwhile are merged with what was written, and
+        whatever was not written is pending again.
+        """
+        if not self.records.has_changes:
+            self._changed_at = None
+            return
+        self.flushing = True
+        taken = self.records.take_changes()
+        try:
+            number = journal_save(self.store, taken, self.journal)
+            self.lock.release()
+            try:
+                conflicts = save(
+                    self.store, taken, self.journal, number=number
+                )
+            finally:
+                self.lock.acquire()
+        except ConflictError as error:
+            # Retrying cannot help, the user has to load the records
+            self.error = error
+            self._retry_at = None
+            return
+        except Exception as error:
+            if not is_backend_error(error):
+                # A bug, a bad record or a permanent refusal, trying
+                # again cannot help
+                self.error = error
+                self._retry_at = None
+                return
+            code = status_code(error)
+            self.error = f"HTTP {code}" if code else error
+            # Wait longer after each failure, with some jitter
+            self._retry_at = time.monotonic() + self._backoff * (
+                1 + random.random() / 2
+            )
+            self._backoff = min(self._backoff * 2, BACKOFF_MAX)
+            return
+        finally:
+            self.flushing = False
+            self._conflicts.extend(self.records.merge_changes(taken))
+        self._conflicts.extend(conflicts)
+        # Changes made during the write wait for the next one
+        self._changed_at = (
+            time.monotonic() if self.records.has_changes else None
+        )
+        self._retry_at = None
+        self._backoff = BACKOFF_START
+        self.error = None
+        self.saves += 1
@@ -0,0 +1,93 @@
+import re  # Library for regular expressions, to read A1 cell names
+from collections import Counter  # Count the API calls by method
+
+
+def _cell(a1):
+    """
+    Turn an A1 cell name into 1-based (row, column).
+    """
+    letters, digits = re.fullmatch(r'([A-Z]+)(\d+)', a1).groups()
+    column = 0
+    for letter in letters:
+        column = column * 26 + ord(letter) - ord('A') + 1
+    return int(digits), column
+
+
+class FakeWorksheet:
+    """
+    Local stand-in for a gspread.Worksheet, keeping the cells in a list
+    of rows and counting every request that would reach Google.
+
+    Only the methods the record writers use are provided. Like a real
+    worksheet, it refuses writes past the last row of the grid.
+
+    Args:
+        values (list): The rows the worksheet starts with. Defaults to
+        an empty worksheet.
+        row_count (int): Rows in the grid. Defaults to the number of
+        rows given.
+
+    Attributes:
+        calls (Counter): Number of requests made, by method name.
+    """
+
+    def __init__(self, values=(), row_count=None):
+        self.values = [[str(value) for value in row] for row in values]
+        self.row_count = len(self.values) if row_count is None \
+            else row_count
+        self.calls = Counter()
+
+    def _write(self, first_row, rows):
+        """
+        Write rows from a 1-based row on, growing the list of rows.
+        """
+        last_row = first_row + len(rows) - 1
+        if last_row > self.row_count:
+            raise ValueError(
+                f"Row {last_row} is past the grid of {self.row_count}"
+            )
+        while len(self.values) < last_row:
+            self.values.append([])
+        for row_number, row in enumerate(rows, start=first_row):
+            self.values[row_number - 1] = [str(value) for value in row]
+
+    def get_all_values(self):
+        self.calls['get_all_values'] += 1
+        return [list(row) for row in self.values]
+
+    def row_values(self, row):
+        self.calls['row_values'] += 1
+        return list(self.values[row - 1]) if row <= len(self.values) else []
+
+    def update(self, range_name, values):
+        self.calls['update'] += 1
+        first_row, _ = _cell(range_name.split(':')[0])
+        self._write(first_row, values)
+
+    def batch_update(self, data):
+        self.calls['batch_update'] += 1
+        for value_range in data:
+            first_row, _ = _cell(value_range['range'].split(':')[0])
+            self._write(first_row, value_range['values'])
+
+    def append_rows(self, values):
+        self.calls['append_rows'] += 1
+        self.row_count = max(self.row_count, len(self.values) + len(values))
+        self._write(len(self.values) + 1, values)
+
+    def append_row(self, values):
+        self.calls['append_row'] += 1
+        self.row_count = max(self.row_count, len(self.values) + 1)
+        self._write(len(self.values) + 1, [values])
+
+    def resize(self, rows=None, cols=None):
+        self.calls['resize'] += 1
+        if rows is not None:
+            self.row_count = rows
+            del self.values[rows:]
+
+    def delete_rows(self, start_index, end_index=None):
+        self.calls['delete_rows'] += 1
+        end_index = end_index or start_index
+        del self.values[start_index - 1:end_index]
+        self.row_count -= end_index - start_index + 1
@@ -0,0 +1,73 @@
+import datetime  # Import datetime module for the report day
+import unittest  # Standard library test framework
+from reports import ReportIndex, group_report
+from tracked_records import TrackedRecords
+from tests.test_sheet_writer import make_record
+
+TODAY = datetime.date(2026, 10, 18)
+
+
+class ReportIndexTest(unittest.TestCase):
+    """
+    Tests that reports from a ReportIndex match reports counted from
+    scratch as the records change.
+    """
+
+    def setUp(self):
+        self.records = TrackedRecords(
+            make_record(number) for number in range(6)
+        )
+        for number, record in enumerate(self.records):
+            record['department'] = ("IT", "HR")[number % 2]
+            record['salary'] = 1000.0 * number
+        self.records.add_index('report', ReportIndex())
+
+    def assertSameReport(self, group_by=('department',)):
+        self.assertEqual(
+            group_report(self.records, group_by, TODAY),
+            group_report(list(self.records), group_by, TODAY)
+        )
+
+    def test_built_from_records(self):
+        report = group_report(self.records, ('department',), TODAY)
+
+        self.assertEqual([row['group'] for row in report], [("HR",), ("IT",)])
+        self.assertEqual(report[1]['salary']['sum'], 6000)
+        self.assertEqual(report[1]['age']['median'], 36)
+        self.assertSameReport(('department', 'job_position'))
+        self.assertSameReport(())
+
+    def test_follows_changes(self):
+        record = self.records[1].copy()
+        record['department'] = "Sales"
+        record['salary'] = 9000.0
+        self.records[1] = record
+        del self.records[2]
+        self.records.append(make_record(6))
+        self.records[0]['date_of_birth'] = datetime.date(2000, 5, 1)
+        self.records.mark_updated(0)
+
+        self.assertSameReport()
+
+    def test_empty_group_dropped(self):
+        for index in (4, 2, 0):
+            del self.records[index]
+
+        report = group_report(self.records, ('department',), TODAY)
+
+        self.assertEqual([row['group'] for row in report], [("HR",)])
+
+    def test_bad_cell_not_counted(self):
+        record = self.records[0].copy()
+        record['salary'] = "n/a"
+        self.records[0] = record
+
+        report = group_report(self.records, ('department',), TODAY)
+
+        self.assertEqual(report[1]['headcount'], 3)
+        self.assertEqual(report[1]['salary']['count'], 2)
+        self.assertSameReport()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,151 @@
+import json  # Import json module to build request bodies
+import sqlite3  # Import sqlite3 module to fail a write for good
+import unittest  # Standard library test framework
+from contextlib import redirect_stderr  # Keep logged errors quiet
+from http import HTTPStatus  # Standard HTTP status codes
+from io import StringIO  # Swallow the logged tracebacks
+from service import HRISService
+from sqlite_store import SQLiteRecordStore
+
+# A valid record as sent by a client
+ANNA = {
+    'first_name': "Anna",
+    'last_name': "Smith",
+    'date_of_birth': "01-02-1990",
+    'address': "1 Main Street",
+    'email': "anna@example.com",
+    'job_position': "Developer",
+    'department': "IT",
+    'salary': "5200",
+    'hire_date': "01-02-2015",
+}
+
+
+class ServiceTest(unittest.IsolatedAsyncioTestCase):
+    """
+    Tests of the HTTP/JSON service against an in-memory SQLite store.
+    """
+
+    async def asyncSetUp(self):
+        self.store = SQLiteRecordStore(':memory:')
+        self.service = HRISService(self.store)
+        await self.service.load()
+
+    async def request(self, method, target, body=None):
+        """
+        Send a request to the service, without a network connection.
+        """
+        data = b'' if body is None else json.dumps(body).encode('utf-8')
+        return await self.service.dispatch(method, target, data)
+
+    async def test_add_and_get(self):
+        status, added = await self.request('POST', '/records', ANNA)
+
+        self.assertEqual(status, HTTPStatus.CREATED)
+        self.assertEqual(added['version'], 1)
+        status, found = await self.request(
+            'GET', f"/records/{added['employee_id']}"
+        )
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(found, added)
+        self.assertEqual(len(self.store.load()), 1)
+
+    async def test_duplicate_email(self):
+        await self.request('POST', '/records', ANNA)
+
+        status, data = await self.request(
+            'POST', '/records', dict(ANNA, first_name="Hanna")
+        )
+
+        self.assertEqual(status, HTTPStatus.CONFLICT)
+        self.assertEqual(data['errors'][0]['field'], 'email')
+
+    async def test_invalid_record(self):
+        status, data = await self.request(
+            'POST', '/records', dict(ANNA, email="not an email")
+        )
+
+        self.assertEqual(status, HTTPStatus.UNPROCESSABLE_ENTITY)
+        self.assertEqual(data['errors'][0]['field'], 'email')
+
+    async def test_update_at_stale_version(self):
+        _, added = await self.request('POST', '/records', ANNA)
+        target = f"/records/{added['employee_id']}"
+
+        status, updated = await self.request(
+            'PATCH', target, {'salary': "6000", 'version': 1}
+        )
+        self.assertEqual(status, HTTPStatus.OK)
+        self.assertEqual(updated['version'], 2)
+        status, _ = await self.request(
+            'PATCH', target, {'salary': "7000", 'version': 1}
+        )
+        self.assertEqual(status, HTTPStatus.CONFLICT)
+        self.assertEqual(self.store.load()[0]['salary'], 6000)
+
+    async def test_delete(self):
+        _, added = await self.request('POST', '/records', ANNA)
+        target = f"/records/{added['employee_id']}"
+
+        status, _ = await self.request('DELETE', target)
+
+        self.assertEqual(status, HTTPStatus.OK)
+        status, _ = await self.request('GET', target)
+        self.assertEqual(status, HTTPStatus.NOT_FOUND)
+        self.assertEqual(len(self.store.load()), 0)
+
+    async def test_backend_down_keeps_change_pending(self):
+        sync = self.store.sync
+
+        def unreachable(records, progress=None):
+            raise ConnectionError("backend unreachable")
+
+        self.store.sync = unreachable
+        status, data = await self.request('POST', '/records', ANNA)
+        self.assertEqual(status, HTTPStatus.ACCEPTED)
+        self.assertTrue(data['pending'])
+
+        # The next write takes the pending record with it
+        self.store.sync = sync
+        status, _ = await self.request(
+            'POST', '/records',
+            dict(ANNA, first_name="Hanna", email="hanna@example.com")
+        )
+        self.assertEqual(status, HTTPStatus.CREATED)
+        self.assertEqual(len(self.store.load()), 2)
+
+    async def test_refused_write_is_rolled_back(self):
+        def refuse(records, progress=None):
+            raise sqlite3.IntegrityError("constraint failed")
+
+        self.store.sync = refuse
+        with redirect_stderr(StringIO()):
+            status, _ = await self.request('POST', '/records', ANNA)
+
+        self.assertEqual(status, HTTPStatus.INTERNAL_SERVER_ERROR)
+        # Not kept in memory, so a retry is not a duplicate
+        status, data = await self.request('GET', '/health')
+        self.assertEqual(data, {'records': 0})
+
+    async def test_handler_error_answers_500(self):
+        async def broken(params, body):
+            raise KeyError('bug')
+
+        self.service.routes.insert(
+            0, ('GET', self.service.routes[0][1], broken)
+        )
+        with redirect_stderr(StringIO()):
+            status, data = await self.request('GET', '/health')
+
+        self.assertEqual(status, HTTPStatus.INTERNAL_SERVER_ERROR)
+        self.assertEqual(data, {'error': "Internal server error"})
+
+    async def test_unknown_route(self):
+        status, _ = await self.request('GET', '/nowhere')
+        self.assertEqual(status, HTTPStatus.NOT_FOUND)
+        status, _ = await self.request('POST', '/health')
+        self.assertEqual(status, HTTPStatus.METHOD_NOT_ALLOWED)
+
+
+if __name__ == '__main__':
+    unittest.main()
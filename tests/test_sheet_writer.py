@@ -0,0 +1,133 @@
+import unittest  # Standard library test framework
+from employee import FIELDNAMES, Employee
+from sheet_writer import write_changes, write_records
+from tracked_records import TrackedRecords
+from tests.fake_worksheet import FakeWorksheet
+
+HEADER = [fieldname.upper() for fieldname in FIELDNAMES]
+
+
+def make_record(number):
+    """
+    Build a valid record told apart by its number.
+    """
+    return Employee(
+        employee_id=f'E{number:012d}',
+        first_name=f'Name{number}',
+        last_name='Smith',
+        date_of_birth='01-01-1990',
+        address='1 Main Street',
+        email=f'name{number}@example.com',
+        job_position='Developer',
+        department='IT',
+        salary='1000',
+        hire_date='01-01-2015',
+        version='1',
+    )
+
+
+def cells(records):
+    """
+    Get the rows of records as the worksheet cells hold them.
+    """
+    return [[str(value) for value in record.to_row()] for record in records]
+
+
+def sheet_of(records):
+    """
+    Build a worksheet already holding records under the header.
+    """
+    return FakeWorksheet([HEADER] + [record.to_row() for record in records])
+
+
+class WriteRecordsTest(unittest.TestCase):
+    """
+    Tests of write_records(), the full rewrite.
+    """
+
+    def test_single_range_write(self):
+        records = [make_record(number) for number in range(3)]
+        worksheet = FakeWorksheet(row_count=4)
+
+        written = write_records(worksheet, records)
+
+        self.assertEqual(written, 4)
+        self.assertEqual(worksheet.calls, {'update': 1})
+        self.assertEqual(worksheet.values[0], HEADER)
+        self.assertEqual(worksheet.values[1:], cells(records))
+
+    def test_trims_leftover_rows(self):
+        worksheet = sheet_of([make_record(number) for number in range(5)])
+        records = [make_record(number) for number in range(2)]
+
+        write_records(worksheet, records)
+
+        self.assertEqual(worksheet.calls, {'resize': 1, 'update': 1})
+        self.assertEqual(worksheet.row_count, 3)
+        self.assertEqual(len(worksheet.values), 3)
+
+    def test_grows_grid(self):
+        worksheet = FakeWorksheet(row_count=1)
+
+        write_records(worksheet, [make_record(number) for number in range(3)])
+
+        self.assertEqual(worksheet.calls, {'resize': 1, 'update': 1})
+        self.assertEqual(len(worksheet.values), 4)
+
+
+class WriteChangesTest(unittest.TestCase):
+    """
+    Tests of write_changes(), the write of the changed rows only.
+    """
+
+    def setUp(self):
+        self.records = TrackedRecords(
+            make_record(number) for number in range(5)
+        )
+        self.worksheet = sheet_of(self.records)
+
+    def test_updates_in_one_batch(self):
+        for index in (1, 3):
+            record = self.records[index].copy()
+            record['salary'] = 2000
+            self.records[index] = record
+
+        written = write_changes(self.worksheet, self.records)
+
+        self.assertEqual(written, 2)
+        self.assertEqual(self.worksheet.calls, {'batch_update': 1})
+        self.assertEqual(self.worksheet.values[1:], cells(self.records))
+
+    def test_appends_in_one_request(self):
+        self.records.extend(make_record(number) for number in range(5, 8))
+
+        write_changes(self.worksheet, self.records)
+
+        self.assertEqual(self.worksheet.calls, {'append_rows': 1})
+        self.assertEqual(len(self.worksheet.values), 9)
+
+    def test_deletes_contiguous_rows_together(self):
+        del self.records[3]
+        del self.records[2]
+        del self.records[0]
+
+        write_changes(self.worksheet, self.records)
+
+        self.assertEqual(self.worksheet.calls, {'delete_rows': 2})
+        self.assertEqual(self.worksheet.values[1:], cells(self.records))
+
+    def test_nothing_to_write(self):
+        self.assertEqual(write_changes(self.worksheet, self.records), 0)
+        self.assertEqual(self.worksheet.calls, {})
+
+    def test_reordered_falls_back_to_one_write(self):
+        self.records.reverse()
+
+        write_changes(self.worksheet, self.records)
+
+        self.assertEqual(self.worksheet.calls, {'update': 1})
+        self.assertEqual(self.worksheet.values[1:], cells(self.records))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,402 @@
+from bisect import bisect_left  # Binary search in a sorted list
+from conflicts import rebase_changes
+from employee import SYSTEM_FIELDS
+
+
+class TrackedRecords(list):
+    """
+    List of records that remembers what changed since the last sync.
+
+    Rows are identified by their position at the last sync (the "origin"
+    index), so deletions do not shift the indices that still have to be
+    written. New records can only be added at the end of the list, which
+    keeps the surviving rows in their original order. Any operation that
+    reorders rows marks the whole list for a full rewrite.
+
+    Indexes added with add_index() are kept up to date on every change.
+    An index provides rebuild(records), add(record), remove(record),
+    update(record) and clear(). The position of each record is kept by
+    id() for position_of(): appending or replacing a record updates it,
+    and changes that shift positions drop it until the next lookup.
+
+    Attributes:
+        dirty (set): Origin indices of rows updated in place.
+        deleted (set): Origin indices of rows deleted.
+        reordered (bool): True if the rows must be rewritten in full.
+        base_count (int): Number of rows at the last sync.
+        rebased (bool): True once rebase() replaced the rows.
+        indexes (dict): Indexes over the records, by name.
+    """
+
+    def __init__(self, records=()):
+        super().__init__(records)
+        self.indexes = {}
+        self.rebased = False
+        # Position of each record by id(), built on the next lookup
+        self._positions = None
+        self.mark_synced()
+
+    def add_index(self, name, index):
+        """
+        Build an index over the records and keep it up to date.
+
+        Args:
+            name (str): Name to find the index by in self.indexes.
+            index: The index to build.
+        """
+        index.rebuild(self)
+        self.indexes[name] = index
+
+    def mark_synced(self):
+        """
+        Forget all changes, the list now matches the worksheet.
+        """
+        self._origin = list(range(len(self)))
+        self.base_count = len(self)
+        self._new_count = 0
+        self.dirty = set()
+        self.deleted = set()
+        self.reordered = False
+
+    def rebase(self, records, updated=None, deleted=(), inserted=()):
+        """
+        Replace the records with a fresh copy of the stored ones and
+        apply the pending changes to it again.
+
+        Used when another user saved first: the fresh records become the
+        rows of the last sync, so the changes are written at the rows
+        where they are now stored. The indexes are rebuilt.
+
+        Args:
+            records (list): The records as now stored.
+            updated (dict): Records to write, by position in records.
+            Defaults to None, no updates.
+            deleted (iterable): Positions in records to delete.
+            inserted (iterable): New records to add at the end.
+        """
+        super().clear()
+        super().extend(records)
+        self.mark_synced()
+        for index, record in (updated or {}).items():
+            super().__setitem__(index, record)
+            self.dirty.add(index)
+        for index in sorted(deleted, reverse=True):
+            super().__delitem__(index)
+            del self._origin[index]
+            self.deleted.add(index)
+        for record in inserted:
+            super().append(record)
+            self._origin.append(None)
+            self._new_count += 1
+        for record_index in self.indexes.values():
+            record_index.rebuild(self)
+        self._positions = None
+        self.rebased = True
+
+    def take_changes(self):
+        """
+        Move the pending changes to a copy of the list, to write them
+        while this list keeps changing.
+
+        The copy holds the pending changes, with copies of the records
+        to write: the store sets their system fields and merges them in
+        place. This list then tracks only the changes made after,
+        against the copy, as if the copy had been saved. Once the copy
+        is written, or the write failed, hand it back with
+        merge_changes(). Until then the records must not be changed in
+        place, replace them instead.
+
+        Returns:
+            TrackedRecords: The copy, without indexes.
+        """
+        taken = TrackedRecords(self)
+        taken._origin = self._origin
+        taken.base_count = self.base_count
+        taken._new_count = self._new_count
+        taken.dirty = self.dirty
+        taken.deleted = self.deleted
+        taken.reordered = self.reordered
+        # The rows the changes made from now on are tracked against
+        taken._base = list(self)
+        taken._written = taken._positions_to_write()
+        for index in taken._written:
+            list.__setitem__(taken, index, taken[index].copy())
+        self.mark_synced()
+        return taken
+
+    def _positions_to_write(self):
+        """
+        Get the current positions of the records the next sync writes.
+        """
+        if self.reordered:
+            return list(range(len(self)))
+        return [
+            self.current_index(origin) for origin in sorted(self.dirty)
+        ] + list(self.inserted_indices())
+
+    def merge_changes(self, taken):
+        """
+        Take back the copy made by take_changes(), keeping the changes
+        made to this list since.
+
+        What the copy could not write stays pending here, in front of
+        the newer changes. If the write merged the copy with another
+        user's changes, the newer changes are merged into its rows too.
+
+        Args:
+            taken (TrackedRecords): The copy, after the write.
+
+        Returns:
+            list: List of Conflict, the newer changes that were merged
+            with another user's.
+        """
+        if taken.rebased:
+            updated, deleted, inserted, conflicts = rebase_changes(
+                taken._base, self, list(taken)
+            )
+            for index, record in updated.items():
+                taken[index] = record
+            for index in sorted(deleted, reverse=True):
+                del taken[index]
+            taken.extend(inserted)
+            super().clear()
+            super().extend(taken)
+            self._origin = taken._origin
+            self.base_count = taken.base_count
+            self._new_count = taken._new_count
+            self.dirty = taken.dirty
+            self.deleted = taken.deleted
+            self.reordered = taken.reordered
+            for record_index in self.indexes.values():
+                record_index.rebuild(self)
+            self._positions = None
+            return conflicts
+        if not taken.has_changes:
+            # Written as it was, so already tracked against what is
+            # saved. Only the new IDs and versions are taken over.
+            for position in taken._written:
+                index = self.current_index(position)
+                if index < self.synced_count and \
+                        self._origin[index] == position:
+                    self._take_system_fields(index, taken[position])
+            return []
+        # Position in the copy -> origin of the row at the last sync
+        origins = taken._origin
+        dirty = set(taken.dirty)
+        deleted = set(taken.deleted)
+        for position in self.dirty:
+            if origins[position] is not None:
+                dirty.add(origins[position])
+        for position in self.deleted:
+            if origins[position] is not None:
+                dirty.discard(origins[position])
+                deleted.add(origins[position])
+        self._origin = [
+            None if position is None else origins[position]
+            for position in self._origin
+        ]
+        self._new_count = self._origin.count(None)
+        self.base_count = taken.base_count
+        self.dirty = dirty
+        self.deleted = deleted
+        self.reordered = self.reordered or taken.reordered
+        return []
+
+    def _take_system_fields(self, index, written):
+        """
+        Give the record at a position the ID and version it was written
+        with.
+        """
+        record = self[index]
+        new_id = record['employee_id'] != written['employee_id']
+        for field in SYSTEM_FIELDS:
+            setattr(record, field, getattr(written, field))
+        if new_id:
+            for record_index in self.indexes.values():
+                record_index.update(record)
+
+    def mark_updated(self, index):
+        """
+        Mark the record at a position as changed in place. While a copy
+        from take_changes() is written, replace the record instead.
+
+        Args:
+            index (int): Current position of the record.
+        """
+        for record_index in self.indexes.values():
+            record_index.update(self[index])
+        self._mark_dirty(index)
+
+    def _mark_dirty(self, index):
+        """
+        Remember that the row at a position has to be rewritten.
+        """
+        origin = self._origin[index]
+        # New rows are written in full anyway
+        if origin is not None:
+            self.dirty.add(origin)
+
+    def mark_reordered(self):
+        """
+        Mark the whole list for a full rewrite.
+        """
+        self.reordered = True
+
+    @property
+    def has_changes(self):
+        """
+        bool: True if there is anything to write.
+        """
+        return bool(
+            self.reordered or self.dirty or self.deleted or self._new_count
+        )
+
+    @property
+    def change_count(self):
+        """
+        int: Number of rows to write, each counted once however often
+        it changed.
+        """
+        if self.reordered:
+            return len(self)
+        return len(self.dirty) + len(self.deleted) + self._new_count
+
+    @property
+    def synced_count(self):
+        """
+        int: Number of rows from the last sync still in the list.
+        """
+        return len(self._origin) - self._new_count
+
+    def inserted_indices(self):
+        """
+        Get the current positions of records added since the last sync.
+
+        Returns:
+            range: Positions of the new records, always at the end.
+        """
+        return range(self.synced_count, len(self))
+
+    def current_index(self, origin):
+        """
+        Get the current position of a row from the last sync.
+
+        Args:
+            origin (int): Position of the row at the last sync.
+
+        Returns:
+            int: Current position of the row.
+        """
+        # Surviving origins stay in ascending order, so bisect finds them
+        return bisect_left(self._origin, origin, 0, self.synced_count)
+
+    def position_of(self, record):
+        """
+        Get the current position of a record, the record itself and not
+        an equal one.
+
+        Args:
+            record (dict): The record.
+
+        Returns:
+            int: Its position, or None if it is not in the list.
+        """
+        if self._positions is None:
+            self._positions = {
+                id(stored): position for position, stored in enumerate(self)
+            }
+        return self._positions.get(id(record))
+
+    def append(self, record):
+        super().append(record)
+        if self._positions is not None:
+            self._positions[id(record)] = len(self) - 1
+        self._origin.append(None)
+        self._new_count += 1
+        for record_index in self.indexes.values():
+            record_index.add(record)
+
+    def extend(self, records):
+        for record in records:
+            self.append(record)
+
+    def __iadd__(self, records):
+        self.extend(records)
+        return self
+
+    def __delitem__(self, index):
+        removed = self[index] if isinstance(index, slice) else [self[index]]
+        for record_index in self.indexes.values():
+            for record in removed:
+                record_index.remove(record)
+        self._positions = None
+        if isinstance(index, slice):
+            super().__delitem__(index)
+            del self._origin[index]
+            self._new_count = self._origin.count(None)
+            self.mark_reordered()
+            return
+        if index < 0:
+            index += len(self)
+        super().__delitem__(index)
+        origin = self._origin.pop(index)
+        if origin is None:
+            self._new_count -= 1
+        else:
+            self.dirty.discard(origin)
+            self.deleted.add(origin)
+
+    def pop(self, index=-1):
+        record = self[index]
+        del self[index]
+        return record
+
+    def remove(self, record):
+        position = self.position_of(record)
+        del self[self.index(record) if position is None else position]
+
+    def __setitem__(self, index, value):
+        removed = self[index] if isinstance(index, slice) else [self[index]]
+        super().__setitem__(index, value)
+        added = self[index] if isinstance(index, slice) else [value]
+        for record_index in self.indexes.values():
+            for record in removed:
+                record_index.remove(record)
+            for record in added:
+                record_index.add(record)
+        if isinstance(index, slice):
+            self._positions = None
+            self.mark_reordered()
+        else:
+            if self._positions is not None:
+                self._positions.pop(id(removed[0]), None)
+                self._positions[id(value)] = index % len(self)
+            self._mark_dirty(index)
+
+    def insert(self, index, record):
+        super().insert(index, record)
+        self._origin.insert(index, None)
+        self._new_count += 1
+        self._positions = None
+        self.mark_reordered()
+        for record_index in self.indexes.values():
+            record_index.add(record)
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._positions = None
+        self.mark_reordered()
+
+    def reverse(self):
+        super().reverse()
+        self._positions = None
+        self.mark_reordered()
+
+    def clear(self):
+        for record_index in self.indexes.values():
+            record_index.clear()
+        super().clear()
+        self._positions = None
+        self._origin = []
+        self._new_count = 0
+        self.mark_reordered()
@@ -0,0 +1,367 @@
+import re  # Library for regular expressions
+import datetime  # Import datetime module for working with dates and times
+from employee import DATE_FORMAT, Employee, calculate_age
+
+# Precompiled patterns, shared by every validation
+NAME_INVALID_PATTERN = re.compile(r'\d|\W')
+ADDRESS_PATTERN = re.compile(r'^[a-zA-Z0-9\s.,#-]{5,}$')
+EMAIL_PATTERN = re.compile(r'^[\w\.-]+@[\w\.-]+\.\w+$')
+
+valid_job_positions = [
+    "Manager", "Developer",
+    "Analyst", "Designer"]  # Example list of valid job positions
+
+valid_departments = [
+    "Sales", "Marketing",
+    "Finance", "HR", "IT"]  # Example list of valid departments
+
+# Minimum age for employment in years
+MIN_AGE = 18
+
+# Error codes returned by the validators
+INVALID_NAME = 'invalid_name'
+INVALID_AMOUNT = 'invalid_amount'
+NEGATIVE_AMOUNT = 'negative_amount'
+INVALID_DATE = 'invalid_date'
+FUTURE_DATE = 'future_date'
+DATE_BEFORE_1970 = 'date_before_1970'
+UNDER_MIN_AGE = 'under_min_age'
+INVALID_ADDRESS = 'invalid_address'
+INVALID_EMAIL = 'invalid_email'
+INVALID_JOB = 'invalid_job'
+INVALID_DEPARTMENT = 'invalid_department'
+INVALID_CONFIRMATION = 'invalid_confirmation'
+INVALID_RECORD_NUMBER = 'invalid_record_number'
+DUPLICATE_EMAIL = 'duplicate_email'
+DUPLICATE_PERSON = 'duplicate_person'
+
+# User-facing message of each error code
+MESSAGES = {
+    INVALID_NAME: "Invalid input! Please enter at least 2 characters "
+                  "that are not numbers or special characters.",
+    INVALID_AMOUNT: "Invalid input! Enter a positive amount using only "
+                    "numbers(5000) and/or the decimal point '.' "
+                    "(e.g: 4500.80).",
+    NEGATIVE_AMOUNT: "Invalid input! Enter a positive amount using "
+                     "only numbers and the decimal point (e.g., 4500.80).",
+    INVALID_DATE: "Invalid date format! "
+                  "Please enter a valid date (DD-MM-YYYY).",
+    FUTURE_DATE: "Invalid date! Please enter a date before today.",
+    DATE_BEFORE_1970: "Invalid date! Please enter a date after 1970.",
+    UNDER_MIN_AGE: "Invalid date! The employee does not meet "
+                   "the age requirement. The minimum age for employment "
+                   "is 18 years.",
+    INVALID_ADDRESS: "Invalid address format! Please enter a valid "
+                     "address. The address should contain at least "
+                     "5 characters.",
+    INVALID_EMAIL: "Invalid email address! "
+                   "Please enter a valid email address.",
+    INVALID_JOB: "Invalid job position. "
+                 "Please choose from the following options:",
+    INVALID_DEPARTMENT: "Invalid department. "
+                        "Please choose from the following options:",
+    INVALID_CONFIRMATION: "Invalid input! "
+                          "Please enter 'y' for Yes or 'n' for No.",
+    INVALID_RECORD_NUMBER: "Invalid input! "
+                           "Please enter a valid record number.",
+    DUPLICATE_EMAIL: "Another employee already has this email address.",
+    DUPLICATE_PERSON: "An employee with the same name and date of birth "
+                      "already exists.",
+}
+
+# Case-insensitive lookups of the valid choices
+_JOB_LOOKUP = {job.lower(): job for job in valid_job_positions}
+_DEPARTMENT_LOOKUP = {
+    department.lower(): department for department in valid_departments
+}
+
+
+def validate_name(value):
+    """
+    Validate a first or last name.
+
+    Args:
+        value (str): The name.
+
+    Returns:
+        tuple: (capitalized name, None) or (None, error code).
+    """
+    if len(value) >= 2 and not NAME_INVALID_PATTERN.search(value):
+        return value.capitalize(), None
+    return None, INVALID_NAME
+
+
+def validate_amount(value):
+    """
+    Validate a positive amount, e.g. a salary.
+
+    Args:
+        value: The amount as text or a number.
+
+    Returns:
+        tuple: (float amount, None) or (None, error code).
+    """
+    try:
+        amount = float(value)
+    except (TypeError, ValueError):
+        return None, INVALID_AMOUNT
+    if amount >= 0:
+        return amount, None
+    return None, NEGATIVE_AMOUNT
+
+
+def validate_date(value, today=None):
+    """
+    Validate a date in the format (DD-MM-YYYY), not in the future and
+    not before 1970.
+
+    Args:
+        value (str): The date.
+        today (datetime.date): The current date. Defaults to None,
+        today's date.
+
+    Returns:
+        tuple: (datetime.date, None) or (None, error code).
+    """
+    try:
+        date = datetime.datetime.strptime(value, DATE_FORMAT).date()
+    except (TypeError, ValueError):
+        return None, INVALID_DATE
+    if date > (today or datetime.date.today()):
+        return None, FUTURE_DATE
+    if date.year < 1970:
+        return None, DATE_BEFORE_1970
+    return date, None
+
+
+def validate_dob(value, min_age=None, today=None):
+    """
+    Validate a date of birth with an optional minimum age.
+
+    Args:
+        value (str): The date in the format (DD-MM-YYYY).
+        min_age (int): The minimum age in years. Defaults to None.
+        today (datetime.date): The current date. Defaults to None,
+        today's date.
+
+    Returns:
+        tuple: (datetime.date, None) or (None, error code).
+    """
+    today = today or datetime.date.today()
+    date, error = validate_date(value, today)
+    if error is None and min_age is not None and \
+            date > today - datetime.timedelta(days=365 * min_age):
+        return None, UNDER_MIN_AGE
+    return date, error
+
+
+def validate_hire_date(value, min_date=None, today=None):
+    """
+    Validate a hire date with an optional earliest date.
+
+    Args:
+        value (str): The date in the format (DD-MM-YYYY).
+        min_date (datetime.date): The earliest valid date.
+        Defaults to None.
+        today (datetime.date): The current date. Defaults to None,
+        today's date.
+
+    Returns:
+        tuple: (datetime.date, None) or (None, error code).
+    """
+    date, error = validate_date(value, today)
+    if error is None and min_date is not None and date < min_date:
+        return None, UNDER_MIN_AGE
+    return date, error
+
+
+def min_hire_date(date_of_birth):
+    """
+    Get the earliest hire date, 18 years after the date of birth.
+
+    Args:
+        date_of_birth (datetime.date): The date of birth.
+
+    Returns:
+        datetime.date: The earliest valid hire date.
+    """
+    return date_of_birth + datetime.timedelta(days=365 * MIN_AGE)
+
+
+def validate_address(value):
+    """
+    Validate an address of at least 5 characters.
+
+    Returns:
+        tuple: (address, None) or (None, error code).
+    """
+    if ADDRESS_PATTERN.match(value):
+        return value, None
+    return None, INVALID_ADDRESS
+
+
+def validate_email(value):
+    """
+    Validate an email address.
+
+    Returns:
+        tuple: (email, None) or (None, error code).
+    """
+    if EMAIL_PATTERN.match(value):
+        return value, None
+    return None, INVALID_EMAIL
+
+
+def validate_job(value):
+    """
+    Validate a job position against valid_job_positions.
+
+    Returns:
+        tuple: (job position as listed, None) or (None, error code).
+    """
+    job_position = _JOB_LOOKUP.get(value.lower())
+    if job_position is None:
+        return None, INVALID_JOB
+    return job_position, None
+
+
+def validate_department(value):
+    """
+    Validate a department against valid_departments.
+
+    Returns:
+        tuple: (department as listed, None) or (None, error code).
+    """
+    department = _DEPARTMENT_LOOKUP.get(value.lower())
+    if department is None:
+        return None, INVALID_DEPARTMENT
+    return department, None
+
+
+def validate_confirmation(value):
+    """
+    Validate a y/n answer.
+
+    Returns:
+        tuple: ('y' or 'n', None) or (None, error code).
+    """
+    answer = value.lower()
+    if answer in ('y', 'n'):
+        return answer, None
+    return None, INVALID_CONFIRMATION
+
+
+def validate_record_number(value, count):
+    """
+    Validate a 1-based record number.
+
+    Args:
+        value: The record number as text or an int.
+        count (int): Number of records.
+
+    Returns:
+        tuple: (int record number, None) or (None, error code).
+    """
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        return None, INVALID_RECORD_NUMBER
+    if 1 <= number <= count:
+        return number, None
+    return None, INVALID_RECORD_NUMBER
+
+
+def format_errors(errors):
+    """
+    Turn (field, error code) pairs into readable messages.
+
+    Args:
+        errors (list): List of (field, error code) tuples.
+
+    Returns:
+        list: List of "field: message" strings.
+    """
+    return [f"{field}: {MESSAGES[code]}" for field, code in errors]
+
+
+class RecordValidator:
+    """
+    Validate whole records without prompting, e.g. for a bulk import.
+
+    The current date and the latest valid date of birth are computed
+    once per validator, and parsed dates are remembered, as the same
+    dates repeat across the rows of a batch.
+
+    Args:
+        today (datetime.date): The current date. Defaults to None,
+        today's date.
+    """
+
+    def __init__(self, today=None):
+        self.today = today or datetime.date.today()
+        self.latest_birth_date = \
+            self.today - datetime.timedelta(days=365 * MIN_AGE)
+        self._dates = {}
+
+    def _date(self, value):
+        """
+        Validate a date, reusing the result for a date seen before.
+        """
+        result = self._dates.get(value)
+        if result is None:
+            result = self._dates[value] = validate_date(value, self.today)
+        return result
+
+    def validate(self, values):
+        """
+        Validate the raw field values of one record.
+
+        Args:
+            values (dict): Raw field values, keyed by field name.
+
+        Returns:
+            tuple: (Employee, []) if valid, otherwise (None, list of
+            (field, error code) tuples).
+        """
+        def value_of(field):
+            value = values.get(field)
+            return '' if value is None else str(value).strip()
+
+        fields = {}
+        errors = []
+
+        checks = (
+            ('first_name', validate_name),
+            ('last_name', validate_name),
+            ('address', validate_address),
+            ('email', validate_email),
+            ('job_position', validate_job),
+            ('department', validate_department),
+            ('salary', validate_amount),
+        )
+        for field, validator in checks:
+            fields[field], error = validator(value_of(field))
+            if error is not None:
+                errors.append((field, error))
+
+        dob, error = self._date(value_of('date_of_birth'))
+        if error is None and dob > self.latest_birth_date:
+            dob, error = None, UNDER_MIN_AGE
+        if error is not None:
+            errors.append(('date_of_birth', error))
+
+        hire_date, error = self._date(value_of('hire_date'))
+        if error is None and dob is not None and \
+                hire_date < min_hire_date(dob):
+            error = UNDER_MIN_AGE
+        if error is not None:
+            errors.append(('hire_date', error))
+
+        if errors:
+            return None, errors
+        return Employee(
+            date_of_birth=dob,
+            age=calculate_age(dob, self.today),
+            hire_date=hire_date,
+            **fields
+        ), []